@@ -0,0 +1,271 @@
+# AI and navigation in a worker process
+#
+# Optional (ESCAPEN_AI_WORKER=1). Chaser steering is computed in a separate
+# process so pathfinding never competes with rendering for the main
+# interpreter. The two sides share one multiprocessing.shared_memory block:
+#
+#   control   input sequence, published result buffer, stop flag
+#   input     player position and every agent's position / chasing flag,
+#             written by the game each tick
+#   results   two buffers of per-agent unit steering vectors
+#   grid      walkability, one byte per NAV_CELL block of the map, written
+#             once by the game (rasterized from the walkable polygon)
+#
+# Both directions use sequence numbers instead of locks (odd = being
+# written). The worker skips a tick if the input changed while it was being
+# copied; the game keeps its previous steering if a result buffer changed
+# while it was being read. Results are double-buffered: the worker fills the
+# buffer that is not published, then flips the published index, so the game
+# reads a complete set without ever waiting on the worker. Agents without a
+# result yet are steered inline by the game, as before.
+#
+# The worker keeps a flow field: a breadth-first distance map over the
+# walkability grid from the player's block, rebuilt only when the player
+# enters a different block. Each chaser heads for its neighbouring block
+# closest to the player, or straight at the player once it is near or off
+# the grid.
+#
+# The buffers are packed with struct (no NumPy dependency).
+
+import math
+import multiprocessing
+import os
+import struct
+import time
+from array import array
+from collections import deque
+from multiprocessing import shared_memory
+
+import pygame
+
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+AI_WORKER_ENABLED = os.environ.get("ESCAPEN_AI_WORKER") == "1"
+NAV_CELL = 32        # World pixels per walkability block
+MAX_AGENTS = 64      # Agents the shared buffers have room for
+AI_TICK_MS = 16      # Worker tick
+DIRECT_RANGE = 2     # Blocks from the player within which agents steer straight at them
+
+CONTROL = struct.Struct("<QQB7x")    # input sequence, published buffer, stop
+PLAYER = struct.Struct("<ddQ")       # player x, y, agent count
+AGENT = struct.Struct("<ddB7x")      # x, y, chasing
+RESULT_HEADER = struct.Struct("<QQ") # sequence, agent count
+STEERING = struct.Struct("<dd")      # unit direction x, y
+
+INPUT_OFFSET = CONTROL.size
+RESULTS_OFFSET = INPUT_OFFSET + PLAYER.size + AGENT.size * MAX_AGENTS
+RESULT_SIZE = RESULT_HEADER.size + STEERING.size * MAX_AGENTS
+GRID_OFFSET = RESULTS_OFFSET + 2 * RESULT_SIZE
+
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class FlowField:
+    """Distances to the player's block over the walkability grid"""
+
+    def __init__(self, walkable, width, height, cell=NAV_CELL):
+        self.walkable = walkable
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.distance = array("i", [-1]) * (width * height)
+        self.target = None
+        self.rebuilds = 0
+
+    def cell_of(self, x, y):
+        column = int(x // self.cell)
+        row = int(y // self.cell)
+        if 0 <= column < self.width and 0 <= row < self.height:
+            return column, row
+        return None
+
+    def update(self, x, y):
+        """Rebuild the field if the target entered a different block"""
+        target = self.cell_of(x, y)
+        if target == self.target:
+            return
+        self.target = target
+        self.rebuilds += 1
+        width, height, walkable = self.width, self.height, self.walkable
+        distance = array("i", [-1]) * (width * height)
+        self.distance = distance
+        if target is None or not walkable[target[1] * width + target[0]]:
+            return
+
+        start = target[1] * width + target[0]
+        distance[start] = 0
+        queue = deque((start,))
+        while queue:
+            index = queue.popleft()
+            step = distance[index] + 1
+            column = index % width
+            for neighbour, ok in ((index - 1, column > 0), (index + 1, column < width - 1),
+                                  (index - width, index >= width), (index + width, index < len(distance) - width)):
+                if ok and walkable[neighbour] and distance[neighbour] < 0:
+                    distance[neighbour] = step
+                    queue.append(neighbour)
+
+    def steer(self, x, y, target_x, target_y):
+        """Unit direction for an agent at (x, y) chasing (target_x, target_y)"""
+        aim_x, aim_y = target_x, target_y
+        here = self.cell_of(x, y)
+        if here is not None:
+            width, distance, walkable = self.width, self.distance, self.walkable
+            current = distance[here[1] * width + here[0]]
+            if current > DIRECT_RANGE:
+                best = None
+                for dx, dy in NEIGHBOURS:
+                    column, row = here[0] + dx, here[1] + dy
+                    if not (0 <= column < width and 0 <= row < self.height):
+                        continue
+                    # No cutting corners: both sides of a diagonal step must be open
+                    if dx and dy and not (walkable[here[1] * width + column] and
+                                          walkable[row * width + here[0]]):
+                        continue
+                    value = distance[row * width + column]
+                    if 0 <= value < current and (best is None or value < best[0]):
+                        best = (value, column, row)
+                if best is not None:
+                    aim_x = (best[1] + 0.5) * self.cell
+                    aim_y = (best[2] + 0.5) * self.cell
+        dx = aim_x - x
+        dy = aim_y - y
+        length = math.hypot(dx, dy)
+        if length == 0:
+            return 0.0, 0.0
+        return dx / length, dy / length
+
+
+def rasterize(polygon, map_width, map_height, cell=NAV_CELL):
+    """Walkability grid of a polygon: (bytes, width, height), 1 = walkable"""
+    width = -(-map_width // cell)
+    height = -(-map_height // cell)
+    grid = pygame.Surface((width, height), 0, 8)
+    grid.fill(0)
+    pygame.draw.polygon(grid, 1, [(x / cell, y / cell) for x, y in polygon])
+    return pygame.image.tobytes(grid, "P"), width, height
+
+
+def _read_input(buffer):
+    """Consistent copy of the game's input, or None if it is being written"""
+    sequence = CONTROL.unpack_from(buffer, 0)[0]
+    if sequence % 2:
+        return None
+    player_x, player_y, count = PLAYER.unpack_from(buffer, INPUT_OFFSET)
+    count = min(count, MAX_AGENTS)
+    agents = [AGENT.unpack_from(buffer, INPUT_OFFSET + PLAYER.size + i * AGENT.size) for i in range(count)]
+    if CONTROL.unpack_from(buffer, 0)[0] != sequence:
+        return None
+    return player_x, player_y, agents
+
+
+def run_worker(name, width, height, cell):
+    """Worker process entry point"""
+    memory = shared_memory.SharedMemory(name=name)
+    buffer = memory.buf
+    try:
+        walkable = bytes(buffer[GRID_OFFSET:GRID_OFFSET + width * height])
+        field = FlowField(walkable, width, height, cell)
+        parent = multiprocessing.parent_process()
+        result_sequence = 0
+        while True:
+            start = time.perf_counter()
+            _, published, stop = CONTROL.unpack_from(buffer, 0)
+            if stop or (parent is not None and not parent.is_alive()):
+                break
+
+            state = _read_input(buffer)
+            if state is not None:
+                player_x, player_y, agents = state
+                field.update(player_x, player_y)
+
+                # Fill the buffer the game is not reading, then publish it
+                back = 1 - published
+                offset = RESULTS_OFFSET + back * RESULT_SIZE
+                result_sequence += 2
+                RESULT_HEADER.pack_into(buffer, offset, result_sequence - 1, len(agents))
+                for i, (x, y, chasing) in enumerate(agents):
+                    steering = field.steer(x, y, player_x, player_y) if chasing else (0.0, 0.0)
+                    STEERING.pack_into(buffer, offset + RESULT_HEADER.size + i * STEERING.size, *steering)
+                RESULT_HEADER.pack_into(buffer, offset, result_sequence, len(agents))
+                struct.pack_into("<Q", buffer, 8, back)
+
+            elapsed = (time.perf_counter() - start) * 1000
+            if elapsed < AI_TICK_MS:
+                time.sleep((AI_TICK_MS - elapsed) / 1000)
+    finally:
+        del buffer
+        memory.close()
+
+
+class AIWorker:
+    """Game-side handle of the worker process and its shared buffers"""
+
+    def __init__(self, polygon, map_width, map_height, cell=NAV_CELL):
+        grid, self.width, self.height = rasterize(polygon, map_width, map_height, cell)
+        self.memory = shared_memory.SharedMemory(create=True, size=GRID_OFFSET + len(grid))
+        self.buffer = self.memory.buf
+        self.buffer[:GRID_OFFSET] = bytes(GRID_OFFSET)
+        self.buffer[GRID_OFFSET:GRID_OFFSET + len(grid)] = grid
+        self.input_sequence = 0
+        self.steering = []        # Last complete results, index = agent
+        self.result_sequence = 0
+        self.stale_reads = 0
+
+        # spawn: the worker must not inherit the game's pygame state
+        context = multiprocessing.get_context("spawn")
+        self.process = context.Process(target=run_worker, name="ai-worker", daemon=True,
+                                       args=(self.memory.name, self.width, self.height, cell))
+        self.process.start()
+        log.info("AI worker started (pid %d, %dx%d nav grid)", self.process.pid, self.width, self.height)
+
+    @classmethod
+    def create(cls, polygon, map_width, map_height):
+        """Start the worker, or return None (inline steering) if it cannot run here"""
+        try:
+            return cls(polygon, map_width, map_height)
+        except (OSError, ValueError) as e:
+            log.warning("AI worker unavailable, steering inline: %s", e)
+            return None
+
+    def publish(self, player_x, player_y, agents):
+        """Write this tick's world state; agents are (x, y, chasing) tuples"""
+        buffer = self.buffer
+        agents = agents[:MAX_AGENTS]
+        self.input_sequence += 1
+        struct.pack_into("<Q", buffer, 0, self.input_sequence)
+        PLAYER.pack_into(buffer, INPUT_OFFSET, player_x, player_y, len(agents))
+        for i, (x, y, chasing) in enumerate(agents):
+            AGENT.pack_into(buffer, INPUT_OFFSET + PLAYER.size + i * AGENT.size, x, y, chasing)
+        self.input_sequence += 1
+        struct.pack_into("<Q", buffer, 0, self.input_sequence)
+
+    def results(self):
+        """Latest steering vectors (possibly from an earlier tick); never blocks"""
+        buffer = self.buffer
+        published = CONTROL.unpack_from(buffer, 0)[1]
+        offset = RESULTS_OFFSET + published * RESULT_SIZE
+        sequence, count = RESULT_HEADER.unpack_from(buffer, offset)
+        if sequence == self.result_sequence or sequence % 2:
+            return self.steering
+        steering = [STEERING.unpack_from(buffer, offset + RESULT_HEADER.size + i * STEERING.size)
+                    for i in range(count)]
+        if RESULT_HEADER.unpack_from(buffer, offset)[0] != sequence:
+            self.stale_reads += 1   # Overwritten while reading: keep the previous results
+            return self.steering
+        self.result_sequence = sequence
+        self.steering = steering
+        return steering
+
+    def close(self):
+        """Stop the worker and free the shared memory"""
+        struct.pack_into("<B", self.buffer, 16, 1)
+        self.process.join(timeout=1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.buffer.release()
+        self.memory.close()
+        self.memory.unlink()
+        log.info("AI worker stopped")
@@ -1,6 +1,10 @@
 import pygame
 import os
 from constants import BLACK
+from game_log import get_logger
+from memory_tracker import track
+
+log = get_logger(__name__)
 
 class Asselya:
     """Класс для NPC Асели, которая проверяет социальные сети"""
@@ -35,50 +39,51 @@ class Asselya:
         try:
             # Получаем абсолютный путь к текущей директории
             current_dir = os.path.dirname(os.path.abspath(__file__))
-            print(f"Current directory: {current_dir}")
+            log.debug("Current directory: %s", current_dir)
             
             # Загрузка спрайтов стояния
             standing_path = os.path.join(current_dir, sprite_path, "standing")
-            print(f"Standing path: {standing_path}")
+            log.debug("Standing path: %s", standing_path)
             if os.path.exists(standing_path):
                 files = sorted(os.listdir(standing_path))
-                print(f"Found standing files: {files}")
+                log.debug("Found standing files: %s", files)
                 for file in files:
                     if file.endswith(".png"):
                         full_path = os.path.join(standing_path, file)
-                        print(f"Loading standing sprite: {full_path}")
+                        log.debug("Loading standing sprite: %s", full_path)
                         sprite = pygame.image.load(full_path).convert_alpha()
                         sprite = pygame.transform.scale(sprite, (self.width, self.height))
-                        self.sprites["standing"].append(sprite)
+                        self.sprites["standing"].append(track(sprite, "Asselya", file))
             else:
-                print(f"Standing path does not exist: {standing_path}")
+                log.warning("Standing path does not exist: %s", standing_path)
             
             # Загрузка спрайтов бега
             running_path = os.path.join(current_dir, sprite_path, "running")
-            print(f"Running path: {running_path}")
+            log.debug("Running path: %s", running_path)
             if os.path.exists(running_path):
                 files = sorted(os.listdir(running_path))
-                print(f"Found running files: {files}")
+                log.debug("Found running files: %s", files)
                 for file in files:
                     if file.endswith(".png"):
                         full_path = os.path.join(running_path, file)
-                        print(f"Loading running sprite: {full_path}")
+                        log.debug("Loading running sprite: %s", full_path)
                         sprite = pygame.image.load(full_path).convert_alpha()
                         sprite = pygame.transform.scale(sprite, (self.width, self.height))
-                        self.sprites["running"].append(sprite)
+                        self.sprites["running"].append(track(sprite, "Asselya", file))
             else:
-                print(f"Running path does not exist: {running_path}")
+                log.warning("Running path does not exist: %s", running_path)
             
-            print(f"Loaded {len(self.sprites['standing'])} standing sprites and {len(self.sprites['running'])} running sprites")
+            log.info("Loaded %d standing sprites and %d running sprites", len(self.sprites["standing"]), len(self.sprites["running"]))
             
             if not self.sprites["standing"] or not self.sprites["running"]:
                 raise Exception("No sprites loaded!")
             
         except Exception as e:
-            print(f"Ошибка загрузки спрайтов Асели: {e}")
+            log.error("Ошибка загрузки спрайтов Асели: %s", e)
             # Создаем заглушку если спрайты не загрузились
             surface = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
             pygame.draw.rect(surface, (150, 0, 150), (0, 0, self.width, self.height))
+            track(surface, "Asselya", "placeholder")
             self.sprites["standing"] = [surface]
             self.sprites["running"] = [surface]
         
@@ -93,13 +98,13 @@ class Asselya:
     
     def start_chase(self):
         """Начать преследование игрока"""
-        print("Аселя начала преследование!")
+        log.info("Аселя начала преследование!")
         self.is_chasing = True
         self.current_frame = 0  # Сбрасываем анимацию
     
     def stop_chase(self):
         """Остановить преследование игрока"""
-        print("Аселя вернулась на базу")
+        log.info("Аселя вернулась на базу")
         self.is_chasing = False
         self.world_x = self.base_x
         self.world_y = self.base_y
@@ -113,10 +118,12 @@ class Asselya:
         delay = self.ANIMATION_DELAY if self.is_chasing else self.STANDING_DELAY
         
         if self.animation_timer >= delay:
+            # После пропущенных обновлений (LOD) продвигаемся на несколько кадров сразу
+            steps = int(self.animation_timer // delay)
             self.animation_timer = 0
             sprites = self.sprites["running" if self.is_chasing else "standing"]
             if sprites:  # Проверяем, что есть спрайты
-                self.current_frame = (self.current_frame + 1) % len(sprites)
+                self.current_frame = (self.current_frame + steps) % len(sprites)
     
     def draw(self, screen, camera):
         """
@@ -134,7 +141,7 @@ class Asselya:
         if not sprites:
             return
             
-        current_sprite = sprites[self.current_frame]
+        current_sprite = camera.zoom_sprite(sprites[self.current_frame])
         
         # Получаем экранные координаты
         screen_x, screen_y = camera.apply(self.world_x, self.world_y)
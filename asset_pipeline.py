@@ -0,0 +1,239 @@
+# Storage format selection for flat-color art
+#
+# optimize() looks at a loaded (and already scaled) image and builds the
+# lossless storage variants that make sense for it:
+# - "convert":        display pixel format (per-pixel alpha kept if present)
+# - "rle_alpha":      display format with per-pixel alpha, RLE accelerated
+# - "rle_colorkey":   display format, fully transparent pixels become an RLE
+#                     colorkey (only when there is no partial alpha)
+# - "palette":        8-bit palettized, for images with at most 256 colors
+# The colorkey is a color no opaque pixel of the image uses (magenta unless
+# the art has it); rle_colorkey is skipped when none of KEY_CANDIDATES is free.
+# Each variant is blitted a few times onto a scratch surface and the fastest
+# one is kept; the palettized variant wins ties within PALETTE_TOLERANCE
+# because it needs a quarter of the memory. The measured memory and
+# blit-time gain of every asset is kept for report().
+#
+# The choice is remembered per asset name together with a CRC of the
+# pixels: loading the same image again (task sprites come back after every
+# memory budget eviction) builds only the chosen variant, without the
+# analysis and timing. An edited image has a different CRC and is measured
+# again.
+#
+# Uniform panels (e.g. the dark UI backgrounds) come from solid_panel(),
+# which caches one surface per size and uses surface alpha instead of
+# per-pixel alpha.
+
+import sys
+import time
+import zlib
+
+import pygame
+
+from game_log import get_logger
+from memory_tracker import track
+
+log = get_logger(__name__)
+
+PALETTE_MAX_PIXELS = 256 * 256   # Colors are only counted for images this small
+PALETTE_TOLERANCE = 1.25         # Palette kept if at most this much slower than the fastest
+BLIT_SAMPLES = 3                 # Timed blits per variant
+KEY_CANDIDATES = ((255, 0, 255), (0, 255, 255), (255, 255, 0), (1, 254, 1))
+
+stats = {}          # name -> (size, choice, {variant: (bytes, blit_us)})
+_choices = {}       # name -> (CRC of the RGBA pixels, choice)
+_panels = {}
+
+
+def analyze(surface):
+    """Return (colors, transparent fraction, has partial alpha).
+
+    colors is the number of distinct RGBA values (fully transparent pixels
+    count as one), or None for images above PALETTE_MAX_PIXELS.
+    """
+    width, height = surface.get_size()
+    pixels = width * height
+    if not pixels:
+        return 0, 0.0, False
+
+    has_alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+    if has_alpha:
+        visible = pygame.mask.from_surface(surface, 0).count()
+        opaque = pygame.mask.from_surface(surface, 254).count()
+        transparent = (pixels - visible) / pixels
+        partial = visible != opaque
+    else:
+        transparent = 0.0
+        partial = False
+
+    colors = None
+    if pixels <= PALETTE_MAX_PIXELS:
+        values = set(memoryview(pygame.image.tobytes(surface, "RGBA")).cast("I"))
+        # Fully transparent pixels keep whatever RGB they had; fold them into one
+        hidden = sum(1 for value in values if not value.to_bytes(4, sys.byteorder)[3])
+        colors = len(values) - hidden + (1 if hidden else 0)
+    return colors, transparent, partial
+
+
+def _free_key(surface):
+    """First of KEY_CANDIDATES no opaque pixel uses, or None"""
+    opaque = pygame.mask.from_surface(surface, 254)
+    for key in KEY_CANDIDATES:
+        matches = pygame.mask.from_threshold(surface, key + (255,), (1, 1, 1, 255))
+        if not matches.overlap_area(opaque, (0, 0)):
+            return key
+    return None
+
+
+def _palettize(surface):
+    """Build an 8-bit copy; fully transparent pixels share a colorkey index"""
+    width, height = surface.get_size()
+    data = memoryview(pygame.image.tobytes(surface, "RGBA")).cast("I")
+
+    # One palette entry per distinct opaque color, the pixels are then
+    # mapped through a dict by map() instead of a Python loop
+    palette = []
+    index_of = {}
+    transparent = []
+    for value in set(data):
+        rgba = tuple(value.to_bytes(4, sys.byteorder))
+        if rgba[3]:
+            index_of[value] = len(palette)
+            palette.append(rgba[:3])
+        else:
+            transparent.append(value)
+    key = None
+    if transparent:
+        # 257 distinct candidates, so one is free of the (at most 256) colors
+        used = set(palette)
+        key = next(color for color in ((255, i & 0xFF, 255 - (i >> 8)) for i in range(257))
+                   if color not in used)
+        for value in transparent:
+            index_of[value] = len(palette)
+        palette.append(key)
+
+    result = pygame.image.frombytes(bytes(map(index_of.__getitem__, data)), (width, height), "P")
+    result.set_palette(palette)
+    if key is not None:
+        result.set_colorkey(key, pygame.RLEACCEL)
+    return result
+
+
+def _rle_colorkey(surface, key):
+    """Display-format copy where fully transparent pixels become a colorkey"""
+    result = pygame.Surface(surface.get_size()).convert()
+    result.fill(key)
+    result.blit(surface, (0, 0))
+    result.set_colorkey(key, pygame.RLEACCEL)
+    return result
+
+
+def _variants(surface, colors, transparent, partial):
+    has_alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+    if has_alpha:
+        converted = surface.convert_alpha()
+        variants = {"convert": converted}
+        rle = converted.copy()
+        rle.set_alpha(255, pygame.RLEACCEL)
+        variants["rle_alpha"] = rle
+        if not partial and transparent > 0:
+            key = _free_key(surface)
+            if key is not None:
+                variants["rle_colorkey"] = _rle_colorkey(converted, key)
+    else:
+        variants = {"convert": surface.convert()}
+    if colors is not None and colors <= 256 and not partial:
+        variants["palette"] = _palettize(surface)
+    return variants
+
+
+def _build(surface, choice):
+    """Only the `choice` variant of a surface, or None if it no longer applies"""
+    has_alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+    if choice == "convert":
+        return surface.convert_alpha() if has_alpha else surface.convert()
+    if choice == "rle_alpha" and has_alpha:
+        rle = surface.convert_alpha()
+        rle.set_alpha(255, pygame.RLEACCEL)
+        return rle
+    if choice == "rle_colorkey" and has_alpha:
+        key = _free_key(surface)
+        return _rle_colorkey(surface.convert_alpha(), key) if key is not None else None
+    if choice == "palette":
+        return _palettize(surface)
+    return None
+
+
+def _blit_us(surface, target):
+    """Best-of-BLIT_SAMPLES blit time in microseconds (first blit builds RLE data)"""
+    target.blit(surface, (0, 0))
+    best = None
+    for _ in range(BLIT_SAMPLES):
+        start = time.perf_counter()
+        target.blit(surface, (0, 0))
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1e6
+
+
+def optimize(surface, name):
+    """Return the fastest lossless storage variant of a loaded image"""
+    if surface is None or pygame.display.get_surface() is None:
+        return surface
+
+    # Same pixels as last time: build just the variant chosen then
+    crc = zlib.crc32(pygame.image.tobytes(surface, "RGBA"))
+    known = _choices.get(name)
+    if known is not None and known[0] == crc:
+        result = _build(surface, known[1])
+        if result is not None:
+            return result
+
+    colors, transparent, partial = analyze(surface)
+    variants = _variants(surface, colors, transparent, partial)
+
+    # Scratch target in the display format, clipped to the screen size
+    screen_width, screen_height = pygame.display.get_surface().get_size()
+    width, height = surface.get_size()
+    target = pygame.Surface((min(width, screen_width), min(height, screen_height))).convert()
+
+    measured = {}
+    for variant, candidate in variants.items():
+        measured[variant] = (candidate.get_pitch() * candidate.get_height(), _blit_us(candidate, target))
+
+    choice = min(measured, key=lambda variant: measured[variant][1])
+    if "palette" in measured and measured["palette"][1] <= measured[choice][1] * PALETTE_TOLERANCE:
+        choice = "palette"
+
+    stats[name] = ((width, height), choice, measured)
+    _choices[name] = (crc, choice)
+    base_bytes, base_us = measured["convert"]
+    log.debug("%s: %s (%d -> %d bytes, %.1f -> %.1f us)", name, choice,
+              base_bytes, measured[choice][0], base_us, measured[choice][1])
+    return variants[choice]
+
+
+def solid_panel(size, color, alpha):
+    """Cached uniform panel using surface alpha instead of per-pixel alpha"""
+    key = (size, color, alpha)
+    panel = _panels.get(key)
+    if panel is None:
+        panel = pygame.Surface(size).convert()
+        panel.fill(color)
+        panel.set_alpha(alpha, pygame.RLEACCEL)
+        _panels[key] = track(panel, "solid_panel", "%dx%d" % size)
+    return panel
+
+
+def report():
+    """Log the chosen format and memory / blit-time gain of every asset"""
+    lines = ["Asset formats (%d assets)" % len(stats)]
+    for name, ((width, height), choice, measured) in stats.items():
+        base_bytes, base_us = measured["convert"]
+        chosen_bytes, chosen_us = measured[choice]
+        lines.append("  %-40s %5dx%-5d %-12s %9d -> %9d bytes  %9.1f -> %9.1f us (%.1fx)" % (
+            name, width, height, choice, base_bytes, chosen_bytes, base_us, chosen_us,
+            base_us / chosen_us if chosen_us else 0.0))
+    log.info("\n".join(lines))
+    return stats
@@ -0,0 +1,264 @@
+# Headless benchmark harness for full scenes
+#
+# Runs Game or LectionGame for a fixed number of ticks without a display
+# (SDL_VIDEODRIVER=dummy) and without a frame cap, driven by scripted or
+# replayed input, and reports frame-time statistics split into update and
+# draw as JSON that CI can diff.
+#
+# Usage:
+#   python benchmark.py --scene game --ticks 600 --tasks 40 --npcs 20 --chasers 5
+#   python benchmark.py --scene lection --replay session.bin --output bench.json
+#   python benchmark.py --renderer compare   # surface vs texture backend, same run twice
+#   ESCAPEN_PIPELINE=1 python benchmark.py   # draw on the render thread, overlapped with updates
+#
+# Each tick calls the scene's own frame() (what the frame driver calls), so
+# the quality controller, the frame profiler and deep profiler hooks run as
+# in the game; the driver's idle wait is left out and its work_ms is fed the
+# measured frame time. "frame" is the wall time of frame(); "update" and
+# "draw" add up the frame profiler's sections (profiled without its
+# overlay). With the pipeline the profiler follows the render thread, so
+# "draw" is the render thread's composite and "update" is left empty.
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# Must be set before pygame creates a window
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("ESCAPEN_LOG", "warning")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # Keep stdout pure JSON
+
+import pygame
+
+from collections import deque
+
+from constants import FPS
+from frame_profiler import SECTIONS
+from input_replay import InputReplayer, ReplayKeys
+
+BENCH_SEED = 1234
+UPDATE_SECTIONS = SECTIONS[:SECTIONS.index("update") + 1]  # Profiler sections of the simulation
+
+# (ticks, held keys) segments the scripted input cycles through
+SCRIPT = (
+    (90, (pygame.K_d,)),
+    (60, (pygame.K_d, pygame.K_LSHIFT)),
+    (45, (pygame.K_w,)),
+    (90, (pygame.K_a,)),
+    (60, (pygame.K_s, pygame.K_a, pygame.K_LSHIFT)),
+    (30, ()),
+)
+
+
+class ScriptedInput:
+    """Deterministic input that walks and runs around the map in a loop"""
+
+    deterministic = False  # Quality tiers adapt as in a live session
+
+    def __init__(self, script=SCRIPT, delta_time=1000 // FPS):
+        self.segments = [(ticks, ReplayKeys(keys)) for ticks, keys in script]
+        self.delta_time = delta_time
+        self.segment = 0
+        self.remaining = self.segments[0][0]
+
+    def next_tick(self, delta_time):
+        pygame.event.pump()
+        if self.remaining == 0:
+            self.segment = (self.segment + 1) % len(self.segments)
+            self.remaining = self.segments[self.segment][0]
+        self.remaining -= 1
+        return [], self.segments[self.segment][1], self.delta_time
+
+    def close(self):
+        pass
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples):
+    """Mean and p50/p95/p99 in milliseconds"""
+    ordered = sorted(samples)
+    mean = sum(ordered) / len(ordered) if ordered else 0.0
+    return {
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(percentile(ordered, 0.50), 4),
+        "p95_ms": round(percentile(ordered, 0.95), 4),
+        "p99_ms": round(percentile(ordered, 0.99), 4),
+        "max_ms": round(ordered[-1], 4) if ordered else 0.0,
+    }
+
+
+def scale_game(game, tasks, npcs, chasers):
+    """Add extra tasks, NPCs and chasers to a Game scene"""
+    from task_manager import Task, TaskStatus
+    from npc import NPC
+    from asselya import Asselya
+
+    rng = random.Random(BENCH_SEED)
+    start_x = game.character.world_x
+    start_y = game.character.world_y
+
+    templates = list(game.task_manager.tasks.values())
+    for i in range(tasks):
+        template = templates[i % len(templates)]
+        task = Task({
+            "id": f"bench-{i}",
+            "title": template.title,
+            "description": template.description,
+            "sprite_before": template.sprite_before_path,
+            "sprite_after": template.sprite_after_path,
+            "world_x": rng.randint(200, 5900),
+            "world_y": rng.randint(1740, 1880),  # Main corridor
+            "width": template.width,
+            "height": template.height,
+            "reward_users": template.reward_users,
+            "reward_money": template.reward_money,
+            "status": TaskStatus.ACTIVE,
+        })
+        game.task_manager.tasks[task.id] = task
+        game.task_manager.active_tasks.append(task.id)
+
+    for i in range(npcs):
+        if i % 2:
+            npc = NPC(0, 0, "npc/bernar/bernar", 75, 5)
+        else:
+            npc = NPC(0, 0, "npc/bakhredin/bahr", 90, 7)
+        npc.world_x = start_x + rng.randint(-900, 900)
+        npc.world_y = start_y + rng.randint(-60, 60)
+        game.npcs.append(npc)
+
+    for i in range(chasers):
+        chaser = Asselya(rng.randint(200, 5900), rng.randint(1740, 1880), "./asselya")
+        chaser.is_active = True
+        chaser.is_chasing = True
+        game.chasers.append(chaser)
+
+    # Keep the full workload running for the whole benchmark, without side effects
+    game.god_mode = True
+    game.autosave_enabled = False
+
+
+def create_scene(scene, input_source, tasks, npcs, chasers, renderer=None):
+    if scene == "game":
+        from game import Game
+        game = Game(renderer)
+        game.input = input_source
+        if input_source.deterministic:
+            game.quality.pin("input replay")
+        scale_game(game, tasks, npcs, chasers)
+    else:
+        from lection_game import LectionGame
+        game = LectionGame(input_source)
+    return game
+
+
+def run_benchmark(scene="game", ticks=600, warmup=60, replay=None, tasks=0, npcs=0, chasers=0,
+                  renderer=None):
+    """Run one scene headless and return the report dict"""
+    random.seed(BENCH_SEED)
+    pygame.init()
+    input_source = InputReplayer(replay) if replay else ScriptedInput()
+    game = create_scene(scene, input_source, tasks, npcs, chasers, renderer)
+
+    # Section timings for every frame, without the overlay
+    game.profiler.set_enabled(True, overlay=False)
+    game.profiler.history = deque(maxlen=warmup + ticks)
+
+    frame_samples = []
+    minimap_samples = []
+    timer = time.perf_counter
+
+    for tick in range(warmup + ticks):
+        frame_start = timer()
+        running = game.frame(1000 // FPS)
+        frame_ms = (timer() - frame_start) * 1000
+        game.driver.work_ms = frame_ms
+
+        if not running:
+            break
+        if tick >= warmup:
+            frame_samples.append(frame_ms)
+            if scene == "game":
+                minimap_samples.append(game.minimap.last_ms)
+
+    pipeline = scene == "game" and game.pipeline is not None
+    if pipeline:
+        game.stop_pipeline()  # Nothing appends to the profiler history any more
+    update_samples = []
+    draw_samples = []
+    for _, sections in list(game.profiler.history)[warmup:]:
+        update_ms = sum(ms for name, ms in sections.items() if name in UPDATE_SECTIONS)
+        update_samples.append(update_ms)
+        draw_samples.append(sum(sections.values()) - update_ms)
+
+    report = {
+        "scene": scene,
+        "ticks": len(frame_samples),
+        "warmup": warmup,
+        "input": "replay" if replay else "scripted",
+        "scenario": {"tasks": tasks, "npcs": npcs, "chasers": chasers} if scene == "game" else {},
+        "frame": summarize(frame_samples),
+        "update": {} if pipeline else summarize(update_samples),
+        "draw": summarize(draw_samples),
+        "minimap": summarize(minimap_samples) if scene == "game" else {},
+        "renderer": game.render_backend.name if scene == "game" else "surface",
+        "pipeline": pipeline,
+        "quality": game.quality.tier.name if scene == "game" else None,
+        "environment": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "sdl": ".".join(str(part) for part in pygame.get_sdl_version()),
+            "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        },
+    }
+
+    if scene == "game":
+        game.shutdown()
+    pygame.quit()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless scene benchmark")
+    parser.add_argument("--scene", choices=("game", "lection"), default="game")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--warmup", type=int, default=60)
+    parser.add_argument("--replay", help="input log recorded with ESCAPEN_RECORD")
+    parser.add_argument("--tasks", type=int, default=0, help="extra active tasks")
+    parser.add_argument("--npcs", type=int, default=0, help="extra NPCs")
+    parser.add_argument("--chasers", type=int, default=0, help="extra chasing Asselyas")
+    parser.add_argument("--renderer", choices=("surface", "texture", "compare"),
+                        help="render backend (game scene; default: ESCAPEN_RENDERER); "
+                             "compare runs both and reports them side by side")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.renderer == "compare":
+        report = {renderer: run_benchmark(args.scene, args.ticks, args.warmup, args.replay,
+                                          args.tasks, args.npcs, args.chasers, renderer)
+                  for renderer in ("surface", "texture")}
+    else:
+        report = run_benchmark(args.scene, args.ticks, args.warmup, args.replay,
+                               args.tasks, args.npcs, args.chasers, args.renderer)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
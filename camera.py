@@ -1,21 +1,71 @@
 import pygame
 from constants import WIDTH, HEIGHT, BG_WIDTH, BG_HEIGHT
+from mipmap import zoom_sprite
+
+MIN_ZOOM = 0.125  # Smallest mip level is 1/8
+MAX_ZOOM = 4.0
 
 class Camera:
-    def __init__(self):
+    def __init__(self, map_width=BG_WIDTH, map_height=BG_HEIGHT):
         self.x = 0
         self.y = 0
+        self.map_width = map_width
+        self.map_height = map_height
         
+        # Zoom (screen pixels per world pixel); 1.0 keeps the original integer math
+        self.zoom = 1.0
+        self.view_width = WIDTH
+        self.view_height = HEIGHT
+    
+    def set_zoom(self, zoom):
+        """Set the zoom level; call update() afterwards to re-center"""
+        self.zoom = max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+        if abs(self.zoom - 1.0) < 1e-6:
+            self.zoom = 1.0
+        self.view_width = WIDTH / self.zoom
+        self.view_height = HEIGHT / self.zoom
+    
     def update(self, target_x, target_y):
         """Update camera position to follow target"""
-        # Center camera on target
-        self.x = target_x - WIDTH // 2
-        self.y = target_y - HEIGHT // 2
-        
-        # Clamp camera to background boundaries
-        self.x = max(0, min(self.x, BG_WIDTH - WIDTH))
-        self.y = max(0, min(self.y, BG_HEIGHT - HEIGHT))
+        if self.zoom == 1.0:
+            # Center camera on target
+            self.x = target_x - WIDTH // 2
+            self.y = target_y - HEIGHT // 2
+            
+            # Clamp camera to background boundaries
+            self.x = max(0, min(self.x, BG_WIDTH - WIDTH))
+            self.y = max(0, min(self.y, BG_HEIGHT - HEIGHT))
+            return
         
+        # Same centering for the zoomed view; a view larger than the map is centered on it
+        self.x = self._clamp(target_x - self.view_width / 2, self.view_width, self.map_width)
+        self.y = self._clamp(target_y - self.view_height / 2, self.view_height, self.map_height)
+    
+    @staticmethod
+    def _clamp(position, view_size, map_size):
+        if view_size >= map_size:
+            return (map_size - view_size) / 2
+        return max(0, min(position, map_size - view_size))
+    
     def apply(self, x, y):
         """Apply camera offset to world coordinates"""
-        return x - self.x, y - self.y
\ No newline at end of file
+        if self.zoom == 1.0:
+            return x - self.x, y - self.y
+        return (x - self.x) * self.zoom, (y - self.y) * self.zoom
+    
+    # World-to-screen transform (apply() is kept as the short name)
+    world_to_screen = apply
+    
+    def screen_to_world(self, screen_x, screen_y):
+        """Inverse of apply(): world coordinates under a screen position"""
+        return screen_x / self.zoom + self.x, screen_y / self.zoom + self.y
+    
+    def scale(self, length):
+        """Convert a world length (radius, size) to screen pixels"""
+        return length * self.zoom
+    
+    def zoom_sprite(self, sprite):
+        """Sprite at the current zoom, scaled from its nearest mip level"""
+        if self.zoom == 1.0:
+            return sprite
+        return zoom_sprite(sprite, self.zoom)
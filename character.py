@@ -2,6 +2,10 @@ import pygame
 import os
 from constants import *
 from utils import check_polygon_collision
+from memory_tracker import track
+from game_log import get_logger
+
+log = get_logger(__name__)
 
 class Character:
     def __init__(self, x, y):
@@ -42,9 +46,9 @@ class Character:
                 scale_factor = 1.5 / 1.3  # 1.15x total scaling
                 new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
                 sprite = pygame.transform.scale(sprite, new_size)
-                self.standing_sprites.append(sprite)
+                self.standing_sprites.append(track(sprite, "Character", sprite_file))
             except pygame.error as e:
-                print(f"Could not load sprite {sprite_path}: {e}")
+                log.error("Could not load sprite %s: %s", sprite_path, e)
     
     def load_walking_sprites(self):
         """Load walking animation sprites"""
@@ -59,9 +63,9 @@ class Character:
                 scale_factor = 1.5 / 1.3  # 1.15x total scaling
                 new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
                 sprite = pygame.transform.scale(sprite, new_size)
-                self.walking_sprites.append(sprite)
+                self.walking_sprites.append(track(sprite, "Character", sprite_file))
             except pygame.error as e:
-                print(f"Could not load sprite {sprite_path}: {e}")
+                log.error("Could not load sprite %s: %s", sprite_path, e)
     
     def load_running_sprites(self):
         """Load running animation sprites"""
@@ -76,9 +80,9 @@ class Character:
                 scale_factor = 1.5 / 1.3  # 1.15x total scaling
                 new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
                 sprite = pygame.transform.scale(sprite, new_size)
-                self.running_sprites.append(sprite)
+                self.running_sprites.append(track(sprite, "Character", sprite_file))
             except pygame.error as e:
-                print(f"Could not load sprite {sprite_path}: {e}")
+                log.error("Could not load sprite %s: %s", sprite_path, e)
     
     def update(self, keys):
         """Update character position and animation"""
@@ -151,7 +155,8 @@ class Character:
             pygame.draw.rect(screen, (0, 255, 0), (screen_x, screen_y, self.width, self.height))
             return
         
-        # Flip sprite if facing left
+        # Scale to the camera zoom (no-op at zoom 1), then flip if facing left
+        sprite = camera.zoom_sprite(sprite)
         if not self.facing_right:
             sprite = pygame.transform.flip(sprite, True, False)
         
@@ -1,6 +1,10 @@
 import pygame
 import os
 from constants import ANIMATION_SPEED
+from game_log import get_logger
+from memory_tracker import track
+
+log = get_logger(__name__)
 
 class ClickableCharacter:
     def __init__(self, x, y, sprite_path, target_width=70, target_height=100):
@@ -20,6 +24,7 @@ class ClickableCharacter:
         self.message_timer = 0
         self.message_duration = 90  # frames (1.5 seconds at 60 FPS)
         self.message = "ГО В МАССАЖКУ"
+        self.message_surface = None  # Rendered on first show, reused every frame
         
         # Load sprite
         self.sprite = None
@@ -36,28 +41,28 @@ class ClickableCharacter:
                 self.sprite = pygame.image.load(self.sprite_path).convert_alpha()
                 # Scale to match asselya size (70x100)
                 self.sprite = pygame.transform.scale(self.sprite, (self.width, self.height))
-                print(f"Clickable character sprite loaded: {self.sprite_path}")
+                track(self.sprite, "ClickableCharacter", self.sprite_path)
+                log.info("Clickable character sprite loaded: %s", self.sprite_path)
             except pygame.error as e:
-                print(f"Error loading sprite {self.sprite_path}: {e}")
+                log.error("Error loading sprite %s: %s", self.sprite_path, e)
         else:
-            print(f"Sprite file not found: {self.sprite_path}")
+            log.warning("Sprite file not found: %s", self.sprite_path)
     
     def load_sound(self):
         """Load the massazh sound"""
         try:
             self.sound = pygame.mixer.Sound("massazh.mp3")
-            print("Massazh sound loaded successfully")
+            log.info("Massazh sound loaded successfully")
         except pygame.error as e:
-            print(f"Error loading massazh.mp3: {e}")
+            log.warning("Error loading massazh.mp3: %s", e)
     
     def check_click(self, mouse_pos, camera):
         """Check if the character was clicked"""
-        screen_x, screen_y = camera.apply(self.world_x, self.world_y)
-        mouse_x, mouse_y = mouse_pos
+        mouse_x, mouse_y = camera.screen_to_world(*mouse_pos)
         
-        # Check if click is within character bounds
-        if (screen_x <= mouse_x <= screen_x + self.width and
-            screen_y <= mouse_y <= screen_y + self.height):
+        # Check if click is within character bounds (in world space, so zoom doesn't matter)
+        if (self.world_x <= mouse_x <= self.world_x + self.width and
+            self.world_y <= mouse_y <= self.world_y + self.height):
             return True
         return False
     
@@ -69,13 +74,13 @@ class ClickableCharacter:
         # Play sound
         if self.sound:
             self.sound.play()
-            print("Playing massazh sound")
+            log.debug("Playing massazh sound")
     
-    def update(self):
-        """Update character state"""
+    def update(self, ticks=1):
+        """Update character state by `ticks` frames (more than one when catching up)"""
         # Update message timer
         if self.show_message:
-            self.message_timer += 1
+            self.message_timer += ticks
             if self.message_timer >= self.message_duration:
                 self.show_message = False
                 self.message_timer = 0
@@ -86,15 +91,16 @@ class ClickableCharacter:
         
         # Draw sprite
         if self.sprite:
-            screen.blit(self.sprite, (screen_x, screen_y))
+            screen.blit(camera.zoom_sprite(self.sprite), (screen_x, screen_y))
         else:
             # Fallback rectangle if no sprite
             pygame.draw.rect(screen, (255, 0, 255), (screen_x, screen_y, self.width, self.height))
         
         # Draw message if active
         if self.show_message:
-            font = pygame.font.Font(None, 48)
-            text_surface = font.render(self.message, True, (255, 255, 255))
+            if self.message_surface is None:
+                self.message_surface = pygame.font.Font(None, 48).render(self.message, True, (255, 255, 255))
+            text_surface = self.message_surface
             text_rect = text_surface.get_rect()
             
             # Position text above character
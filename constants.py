@@ -27,9 +27,24 @@ LIGHT_GRAY = (192, 192, 192)
 # Horror lighting constants
 LIGHT_RADIUS = 150  # Radius of light around character
 DARKNESS_ALPHA = 240  # Transparency of darkness (0-255, higher = darker)
+FOG_SCALE = 16  # World pixels per block of the explored-area map
+FOG_EXPLORED_ALPHA = 215  # Darkness over explored areas outside the light (lower than DARKNESS_ALPHA)
+FLICKER_RANGE = 900  # Asselya starts making the lights flicker within this distance
+FLICKER_DEPTH = 0.85  # Largest fraction of the light removed by a flicker (Asselya on top of the player)
+FLICKER_STEP_MS = 40  # Time per entry of the flicker noise table
 
 # Startup metrics constants
 USERS_COLOR = LIGHT_BLUE
 MONEY_COLOR = GOLD
 BAR_BG_COLOR = GRAY
-BAR_BORDER_COLOR = WHITE
\ No newline at end of file
+BAR_BORDER_COLOR = WHITE
+
+# Save-game constants
+SAVE_PATH = "saves/autosave.json"
+AUTOSAVE_INTERVAL = 30 * 1000  # Milliseconds between autosaves
+
+# Data pipeline constants
+DATA_CACHE_DIR = ".cache"  # Compiled (pickled) data files
+
+# Memory budget for tracked surfaces (override with ESCAPEN_MEMORY_BUDGET, in MB)
+MEMORY_BUDGET_MB = 1024
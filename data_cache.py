@@ -0,0 +1,158 @@
+# Compiled cache for JSON data files
+#
+# JSON data files (tasks.json and friends) are validated against a small
+# schema once, then stored as a pickle under DATA_CACHE_DIR. The cache entry
+# is keyed by the source file's mtime/size and the SHA-1 of its contents:
+# - mtime and size unchanged   -> load the pickle without reading the JSON
+# - touched but same contents  -> hash matches, reuse the pickle
+# - contents changed           -> parse, validate, compile and rewrite
+# Results are also memoized in-process, so rebuilding a TaskManager is free.
+
+import hashlib
+import json
+import os
+import pickle
+
+from constants import DATA_CACHE_DIR
+from game_log import get_logger
+from save_game import atomic_write
+
+log = get_logger(__name__)
+
+CACHE_VERSION = 1
+
+# Field name -> (accepted types, required, default)
+TASK_SCHEMA = {
+    "id": (str, True, None),
+    "title": (str, True, None),
+    "description": (str, True, None),
+    "sprite_before": (str, True, None),
+    "sprite_after": (str, True, None),
+    "world_x": ((int, float), True, None),
+    "world_y": ((int, float), True, None),
+    "width": (int, True, None),
+    "height": (int, True, None),
+    "reward_users": (int, True, None),
+    "reward_money": (int, True, None),
+    "status": (str, True, None),
+    "is_social": (bool, False, False),
+}
+
+TASK_STATUSES = ("inactive", "active", "completed")
+
+_memo = {}  # path -> (stamp, compiled data)
+
+
+def validate_record(record, schema, where):
+    """Check one record against a schema and fill in defaults"""
+    if not isinstance(record, dict):
+        raise ValueError(f"{where}: expected an object")
+
+    result = {}
+    for field, (types, required, default) in schema.items():
+        if field not in record:
+            if required:
+                raise ValueError(f"{where}: missing field '{field}'")
+            result[field] = default
+            continue
+        value = record[field]
+        # bool is a subclass of int; don't accept it for numeric fields
+        if not isinstance(value, types) or (isinstance(value, bool) and types is not bool):
+            raise ValueError(f"{where}: field '{field}' has invalid value {value!r}")
+        result[field] = value
+
+    unknown = set(record) - set(schema)
+    if unknown:
+        log.warning("%s: unknown fields %s", where, sorted(unknown))
+    return result
+
+
+def compile_tasks(data):
+    """Validate tasks.json contents and return a list of normalized task dicts"""
+    if not isinstance(data, dict) or not isinstance(data.get("tasks"), list):
+        raise ValueError("tasks.json: expected an object with a 'tasks' list")
+
+    tasks = []
+    seen = set()
+    for index, record in enumerate(data["tasks"]):
+        task = validate_record(record, TASK_SCHEMA, f"tasks[{index}]")
+        if task["id"] in seen:
+            raise ValueError(f"tasks[{index}]: duplicate id '{task['id']}'")
+        if task["status"] not in TASK_STATUSES:
+            raise ValueError(f"tasks[{index}]: unknown status '{task['status']}'")
+        seen.add(task["id"])
+        tasks.append(task)
+    return {"tasks": tasks}
+
+
+def _cache_path(path):
+    name = os.path.abspath(path).replace(os.sep, "_").replace(":", "_")
+    return os.path.join(DATA_CACHE_DIR, name + ".pickle")
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "rb") as file:
+            entry = pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning("Discarding unreadable cache %s: %s", cache_path, e)
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != CACHE_VERSION:
+        return None
+    return entry
+
+
+def _write_cache(cache_path, entry):
+    try:
+        atomic_write(cache_path, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL))
+    except OSError as e:
+        # A read-only install still works, it just recompiles every time
+        log.warning("Could not write cache %s: %s", cache_path, e)
+
+
+def load_compiled(path, compiler):
+    """Load a JSON data file through the compiled cache.
+
+    Args:
+        path: JSON file to load
+        compiler: function that validates the parsed JSON and returns the
+            compiled form (raises ValueError on invalid data)
+
+    Raises:
+        FileNotFoundError, ValueError (invalid JSON or schema violation)
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+
+    memo = _memo.get(path)
+    if memo is not None and memo[0] == stamp:
+        return memo[1]
+
+    cache_path = _cache_path(path)
+    entry = _read_cache(cache_path)
+    if entry is not None and entry["stamp"] == stamp:
+        _memo[path] = (stamp, entry["data"])
+        return entry["data"]
+
+    with open(path, "rb") as file:
+        raw = file.read()
+    digest = hashlib.sha1(raw).hexdigest()
+
+    if entry is not None and entry["sha1"] == digest:
+        # File was touched but not changed: refresh the stamp only
+        log.debug("%s touched, reusing compiled cache", path)
+        data = entry["data"]
+    else:
+        log.debug("Compiling %s", path)
+        data = compiler(json.loads(raw.decode("utf-8")))
+
+    _write_cache(cache_path, {"version": CACHE_VERSION, "stamp": stamp, "sha1": digest, "data": data})
+    _memo[path] = (stamp, data)
+    return data
+
+
+def load_tasks_data(path):
+    """Load tasks.json as a validated, compiled dict"""
+    return load_compiled(path, compile_tasks)
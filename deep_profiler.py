@@ -0,0 +1,276 @@
+# On-demand deep profiling capture
+#
+# Press F8 (or start with ESCAPEN_PROFILE=<frames>) to profile the next
+# PROFILE_FRAMES frames of a scene. Two modes (ESCAPEN_PROFILE_MODE):
+# - "sample" (default): a background thread samples the stacks of every
+#   thread (main, render pipeline, workers) every SAMPLE_INTERVAL seconds.
+#   The speedscope file has one profile per thread; in the pstats file each
+#   thread's stacks hang under a "<thread>" root (call counts are sample
+#   counts).
+# - "cprofile": deterministic cProfile capture of the main thread. Writes the
+#   pstats file and a speedscope file whose stacks are rebuilt from the
+#   caller edges (each function's self time split over its callers in
+#   proportion to their cumulative time), so both formats exist either way.
+# Each capture also writes a .meta.json with the scene and its entity counts.
+# Files are named <scene>-<date>-<time>-<ms>, with a counter if that exists.
+#
+# Outside a capture tick() is a no-op and no thread or profiler exists.
+
+import cProfile
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+PROFILE_DIR = "profiles"
+PROFILE_FRAMES = 300
+SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+MIN_PATH_WEIGHT = 50e-6  # Seconds; rebuilt cProfile stacks are not split finer
+MAX_PATH_DEPTH = 64      # Frames a rebuilt cProfile stack goes up at most
+
+
+def _noop():
+    pass
+
+
+class _StackSampler(threading.Thread):
+    """Samples the Python stacks of all other threads at a fixed interval"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.samples = []  # (thread name, stack tuple root-first, weight seconds)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        own = threading.get_ident()
+        last = time.perf_counter()
+        while not self.stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                if stack:
+                    self.samples.append((names.get(thread_id, str(thread_id)), tuple(stack), now - last))
+            last = now
+
+
+def samples_to_speedscope(samples, name):
+    """Convert (thread, stack, weight) samples to a speedscope document, one 'sampled' profile per thread"""
+    frame_index = {}
+    frames = []
+    profiles = {}  # Thread name -> (stacks, weights)
+    for thread, stack, weight in samples:
+        indices = []
+        for key in stack:
+            index = frame_index.get(key)
+            if index is None:
+                index = frame_index[key] = len(frames)
+                frames.append({"name": key[2], "file": key[0], "line": key[1]})
+            indices.append(index)
+        stacks, weights = profiles.setdefault(thread, ([], []))
+        stacks.append(indices)
+        weights.append(round(weight * 1000, 4))
+
+    # The main thread first, it is the one speedscope opens
+    order = sorted(profiles, key=lambda thread: thread != "MainThread")
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "escapen.deep_profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{name} [{thread}]",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(profiles[thread][1]), 4),
+            "samples": profiles[thread][0],
+            "weights": profiles[thread][1],
+        } for thread in order],
+    }
+
+
+def pstats_to_samples(stats, thread="MainThread"):
+    """Rebuild approximate (thread, stack, weight) samples from a cProfile stats dict.
+
+    cProfile only keeps caller edges, so each function's self time is split
+    over its callers in proportion to their cumulative time, recursively up
+    to the roots. The total time is kept: a path stops splitting at
+    recursion, MAX_PATH_DEPTH or shares below MIN_PATH_WEIGHT.
+    """
+    samples = []
+
+    def expand(stack, weight):  # stack is leaf-first
+        callers = stats[stack[-1]][4]
+        total = sum(edge[3] for caller, edge in callers.items() if caller in stats)
+        if total <= 0 or len(stack) >= MAX_PATH_DEPTH or weight < MIN_PATH_WEIGHT:
+            samples.append((thread, tuple(reversed(stack)), weight))
+            return
+        for caller, edge in callers.items():
+            if caller not in stats or not edge[3]:
+                continue
+            share = weight * edge[3] / total
+            if caller in stack:
+                samples.append((thread, tuple(reversed(stack)), share))
+            else:
+                expand(stack + [caller], share)
+
+    for key, (_, _, own, _, _) in stats.items():
+        if own > 0:
+            expand([key], own)
+    return samples
+
+
+def samples_to_pstats(samples):
+    """Build a marshal-able pstats dict from (thread, stack, weight) samples.
+
+    Self time comes from the innermost frame, cumulative time from every
+    function on the stack (counted once per sample); call counts are the
+    number of samples a function appeared in. Each thread's stacks start at
+    a ("<thread>", 0, name) root.
+    """
+    stats = {}
+
+    def entry(key):
+        value = stats.get(key)
+        if value is None:
+            value = stats[key] = [0, 0, 0.0, 0.0, {}]
+        return value
+
+    for thread, stack, weight in samples:
+        stack = (("<thread>", 0, thread),) + stack
+        seen = set()
+        for depth, key in enumerate(stack):
+            func = entry(key)
+            if key not in seen:
+                seen.add(key)
+                func[0] += 1
+                func[1] += 1
+                func[3] += weight
+            if depth > 0:
+                caller = stack[depth - 1]
+                edge = func[4].get(caller, (0, 0, 0.0, 0.0))
+                own = weight if depth == len(stack) - 1 else 0.0
+                func[4][caller] = (edge[0] + 1, edge[1] + 1, edge[2] + own, edge[3] + weight)
+        entry(stack[-1])[2] += weight
+
+    return {key: (cc, nc, tt, ct, callers) for key, (cc, nc, tt, ct, callers) in stats.items()}
+
+
+class DeepProfiler:
+    """Profiles the next N frames of a scene on request"""
+
+    def __init__(self, scene, entity_counts, frames=PROFILE_FRAMES):
+        """
+        Args:
+            scene: scene name used to tag the capture
+            entity_counts: zero-argument callable returning a dict of counts
+            frames: number of frames each capture covers
+        """
+        self.scene = scene
+        self.entity_counts = entity_counts
+        self.frames = frames
+        self.mode = os.environ.get("ESCAPEN_PROFILE_MODE", "sample")
+        self.active = False
+        self.tick = _noop
+
+        startup_frames = os.environ.get("ESCAPEN_PROFILE")
+        if startup_frames:
+            try:
+                frames = int(startup_frames)
+            except ValueError:
+                log.warning("ESCAPEN_PROFILE=%r is not a frame count, profiling %d frames",
+                            startup_frames, self.frames)
+                frames = self.frames
+            self.start(frames)
+
+    def start(self, frames=None):
+        """Begin a capture of the next `frames` frames"""
+        if self.active:
+            return
+        self.remaining = frames or self.frames
+        self.captured_frames = self.remaining
+        self.start_time = time.perf_counter()
+        self.active = True
+        self.tick = self._tick
+
+        if self.mode == "cprofile":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.sampler = _StackSampler()
+            self.sampler.start()
+        log.info("Deep profiling %s for %d frames (%s)", self.scene, self.remaining, self.mode)
+
+    def _tick(self):
+        """Count one frame; finishes the capture when done"""
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.stop()
+
+    def stop(self):
+        """End the capture and write it to PROFILE_DIR"""
+        if not self.active:
+            return
+        duration = time.perf_counter() - self.start_time
+        self.active = False
+        self.tick = _noop
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        now = time.time()
+        base = os.path.join(PROFILE_DIR, "%s-%s-%03d" % (
+            self.scene, time.strftime("%Y%m%d-%H%M%S", time.localtime(now)), int(now % 1 * 1000)))
+        stem, count = base, 1
+        while os.path.exists(base + ".meta.json"):
+            count += 1
+            base = f"{stem}-{count}"
+
+        name = f"{self.scene} ({self.captured_frames} frames)"
+        if self.mode == "cprofile":
+            self.profile.disable()
+            self.profile.dump_stats(base + ".pstats")
+            self.profile.create_stats()
+            samples = pstats_to_samples(self.profile.stats)
+            self.profile = None
+            files = [base + ".pstats"]
+        else:
+            self.sampler.stop_event.set()
+            self.sampler.join()
+            samples = self.sampler.samples
+            self.sampler = None
+            if samples:
+                with open(base + ".pstats", "wb") as file:
+                    marshal.dump(samples_to_pstats(samples), file)
+                files = [base + ".pstats"]
+            else:
+                files = []
+        with open(base + ".speedscope.json", "w", encoding="utf-8") as file:
+            json.dump(samples_to_speedscope(samples, name), file)
+        files.insert(0, base + ".speedscope.json")
+
+        meta = {
+            "scene": self.scene,
+            "mode": self.mode,
+            "frames": self.captured_frames,
+            "duration_s": round(duration, 4),
+            "entities": self.entity_counts(),
+        }
+        with open(base + ".meta.json", "w", encoding="utf-8") as file:
+            json.dump(meta, file, indent=2, sort_keys=True)
+        log.info("Profile written: %s", ", ".join(files))
@@ -0,0 +1,245 @@
+# NPC dialogues with a typewriter reveal
+#
+# Dialogue scripts are JSON files next to the NPC's dialogue art:
+#   {"speaker": "...", "panel": "dialogues/<npc>/dialogue1.png",
+#    "text_rect": [x, y, width, height], "lines": ["...", "..."]}
+# "panel" and "text_rect" are optional; without a panel a plain box is drawn
+# at the bottom of the screen.
+#
+# Nothing here blocks: the reveal is driven by the delta time of the normal
+# game tick. Text is word-wrapped once per line, and glyphs are rendered only
+# when they are revealed: each row keeps the runs rendered so far (one
+# surface per newly revealed chunk, replaced by a single surface once the
+# row is complete), so a frame only blits surfaces that already exist.
+
+import json
+
+import pygame
+
+from constants import WIDTH, HEIGHT, WHITE
+from game_log import get_logger
+from memory_tracker import track
+from asset_pipeline import optimize, solid_panel
+
+log = get_logger(__name__)
+
+CHARS_PER_SECOND = 40
+TEXT_SIZE = 40
+SPEAKER_SIZE = 44
+LINE_SPACING = 6
+TALK_RANGE = 400           # Dialogue closes when the player walks farther away
+BOX_SIZE = (1000, 220)     # Plain box for NPCs without dialogue art
+BOX_COLOR = (15, 15, 15)
+BOX_ALPHA = 220
+SPEAKER_COLOR = (200, 60, 60)
+HINT_COLOR = (150, 150, 150)
+
+
+def wrap_text(text, font, width):
+    """Split text into rows that fit `width` pixels"""
+    rows = []
+    row = ""
+    for word in text.split():
+        candidate = f"{row} {word}" if row else word
+        if row and font.size(candidate)[0] > width:
+            rows.append(row)
+            row = word
+        else:
+            row = candidate
+    if row:
+        rows.append(row)
+    return rows
+
+
+class Typewriter:
+    """Time-based reveal of one block of text, rendered incrementally"""
+
+    def __init__(self, text, font, width, color=WHITE, chars_per_second=CHARS_PER_SECOND):
+        self.font = font
+        self.color = color
+        self.chars_per_second = chars_per_second
+        self.rows = wrap_text(text, font, width)
+        self.total = sum(len(row) for row in self.rows)
+        self.revealed = 0.0
+        self.rendered = [0] * len(self.rows)        # Characters rendered per row
+        self.runs = [[] for _ in self.rows]         # (surface, x offset) per row
+        self.line_height = font.get_linesize() + LINE_SPACING
+
+    @property
+    def done(self):
+        return self.revealed >= self.total
+
+    def update(self, delta_time):
+        if not self.done:
+            self.revealed = min(self.total, self.revealed + delta_time * self.chars_per_second / 1000)
+            self._render()
+
+    def finish(self):
+        """Reveal the rest of the text at once"""
+        self.revealed = self.total
+        self._render()
+
+    def _render(self):
+        remaining = int(self.revealed)
+        for index, row in enumerate(self.rows):
+            visible = min(len(row), remaining)
+            remaining -= visible
+            done = self.rendered[index]
+            if visible > done:
+                if visible == len(row):
+                    # Whole row: one surface instead of its runs
+                    self.runs[index] = [(self.font.render(row, True, self.color), 0)]
+                else:
+                    offset = self.font.size(row[:done])[0]
+                    chunk = self.font.render(row[done:visible], True, self.color)
+                    self.runs[index].append((chunk, offset))
+                self.rendered[index] = visible
+            if remaining <= 0:
+                break
+
+    def draw(self, screen, x, y):
+        for index, runs in enumerate(self.runs):
+            row_y = y + index * self.line_height
+            for surface, offset in runs:
+                screen.blit(surface, (x + offset, row_y))
+
+
+class DialogueScript:
+    """Speaker, lines and (optional) panel art of one NPC dialogue"""
+
+    def __init__(self, path, data):
+        self.path = path
+        self.speaker = data.get("speaker", "")
+        self.lines = list(data["lines"])
+        self.panel_path = data.get("panel")
+        self.text_rect = pygame.Rect(data["text_rect"]) if "text_rect" in data else None
+        self.panel = None  # Loaded on first use
+        self.panel_position = (0, 0)
+
+    @classmethod
+    def load(cls, path):
+        """Load a dialogue script, or None if it is missing or invalid"""
+        try:
+            with open(path, encoding="utf-8") as file:
+                return cls(path, json.load(file))
+        except FileNotFoundError:
+            log.error("Dialogue script %s not found", path)
+        except (ValueError, KeyError, TypeError) as e:
+            log.error("Invalid dialogue script %s: %s", path, e)
+        return None
+
+    def load_panel(self):
+        if self.panel is None and self.panel_path:
+            try:
+                panel = pygame.image.load(self.panel_path).convert_alpha()
+                # The art is screen-sized but mostly transparent: keep only the visible part
+                bounds = panel.get_bounding_rect()
+                self.panel_position = bounds.topleft
+                panel = panel.subsurface(bounds).copy()
+                self.panel = track(optimize(panel, self.panel_path), "DialogueScript", self.panel_path)
+            except (pygame.error, FileNotFoundError) as e:
+                log.warning("Could not load dialogue panel %s: %s", self.panel_path, e)
+                self.panel_path = None
+        return self.panel
+
+
+class DialogueSystem:
+    """Dialogues of the scene's NPCs; at most one is open at a time"""
+
+    def __init__(self):
+        self.scripts = []          # (npc, script)
+        self.npc = None
+        self.script = None
+        self.line_index = 0
+        self.typewriter = None
+        self.text_font = pygame.font.Font(None, TEXT_SIZE)
+        self.speaker_font = pygame.font.Font(None, SPEAKER_SIZE)
+        self.speaker_surface = None
+        self.hint_surface = self.text_font.render("ЛКМ / пробел", True, HINT_COLOR)
+
+    @property
+    def active(self):
+        return self.script is not None
+
+    def register(self, npc, path):
+        script = DialogueScript.load(path)
+        if script is not None:
+            self.scripts.append((npc, script))
+        return script
+
+    def npc_at(self, world_x, world_y):
+        """Script of the NPC under a world position, if any"""
+        for npc, script in self.scripts:
+            if npc.world_x <= world_x <= npc.world_x + npc.width and \
+                    npc.world_y <= world_y <= npc.world_y + npc.height:
+                return npc, script
+        return None
+
+    def start(self, npc, script):
+        self.npc = npc
+        self.script = script
+        self.line_index = 0
+        script.load_panel()
+        self.speaker_surface = self.speaker_font.render(script.speaker, True, SPEAKER_COLOR)
+        self._show_line()
+        log.debug("Dialogue with %s started", script.speaker)
+
+    def close(self):
+        self.npc = None
+        self.script = None
+        self.typewriter = None
+
+    def _uses_panel(self):
+        return self.script.panel is not None and self.script.text_rect is not None
+
+    @staticmethod
+    def _box():
+        box = pygame.Rect((0, 0), BOX_SIZE)
+        box.midbottom = (WIDTH // 2, HEIGHT - 40)
+        return box
+
+    def _text_area(self):
+        if self._uses_panel():
+            return self.script.text_rect
+        box = self._box()
+        return pygame.Rect(box.x + 30, box.y + 70, box.width - 60, box.height - 90)
+
+    def _show_line(self):
+        self.typewriter = Typewriter(self.script.lines[self.line_index], self.text_font,
+                                     self._text_area().width)
+
+    def advance(self):
+        """Finish the current line, or go to the next one (closing after the last)"""
+        if not self.typewriter.done:
+            self.typewriter.finish()
+        elif self.line_index + 1 < len(self.script.lines):
+            self.line_index += 1
+            self._show_line()
+        else:
+            self.close()
+
+    def update(self, delta_time, player):
+        if not self.active:
+            return
+        dx = self.npc.world_x - player.world_x
+        dy = self.npc.world_y - player.world_y
+        if dx * dx + dy * dy > TALK_RANGE * TALK_RANGE:
+            self.close()
+            return
+        self.typewriter.update(delta_time)
+
+    def draw(self, screen):
+        if not self.active:
+            return
+        area = self._text_area()
+        if self._uses_panel():
+            screen.blit(self.script.panel, self.script.panel_position)
+        else:
+            box = self._box()
+            screen.blit(solid_panel(BOX_SIZE, BOX_COLOR, BOX_ALPHA), box)
+            pygame.draw.rect(screen, SPEAKER_COLOR, box, 2)
+            screen.blit(self.speaker_surface, (area.x, box.y + 20))
+        self.typewriter.draw(screen, area.x, area.y)
+        if self.typewriter.done:
+            screen.blit(self.hint_surface, (area.right - self.hint_surface.get_width(),
+                                            area.bottom - self.hint_surface.get_height()))
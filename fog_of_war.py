@@ -0,0 +1,144 @@
+# Fog of war: which parts of the map the player has already seen
+#
+# The explored map is one byte per FOG_SCALE x FOG_SCALE block of the world
+# (384x192 = 72 KB for the 6144x3072 map instead of 18 MB at full size).
+# reveal() marks the area lit by the player light; it only does work when
+# the player enters a different block, and then only rasterizes the small
+# region around the light (the light's visibility polygon if there is one).
+#
+# composite() brightens explored blocks inside the camera view from the
+# ambient darkness to the explored level. Rows of explored blocks are found
+# as byte runs and filled as rectangles, so its cost depends on the visible
+# window only, never on the map size.
+#
+# to_snapshot() / load_snapshot() store the map zlib-compressed and base64
+# encoded, so it fits in the JSON save.
+
+import base64
+import math
+import re
+import zlib
+
+import pygame
+
+from constants import BG_WIDTH, BG_HEIGHT, FOG_SCALE, FOG_EXPLORED_ALPHA
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+EXPLORED = 1
+EXPLORED_RUN = re.compile(b"\x01+")
+
+
+class FogOfWar:
+    """Explored-area bitmap at 1/FOG_SCALE of the map resolution"""
+
+    def __init__(self, map_width=BG_WIDTH, map_height=BG_HEIGHT, scale=FOG_SCALE,
+                 explored_alpha=FOG_EXPLORED_ALPHA):
+        self.scale = scale
+        self.width = -(-map_width // scale)
+        self.height = -(-map_height // scale)
+        self.explored_alpha = explored_alpha
+        self.cells = bytearray(self.width * self.height)
+        self.last_cell = None
+
+    def clear(self):
+        self.cells = bytearray(self.width * self.height)
+        self.last_cell = None
+
+    def reveal(self, x, y, radius, polygon=None):
+        """Mark the area lit from (x, y) as explored (polygon: visible region in world space)"""
+        scale = self.scale
+        cell = (int(x // scale), int(y // scale))
+        if cell == self.last_cell:
+            return
+        self.last_cell = cell
+
+        # Small region around the light, in blocks
+        reach = math.ceil(radius / scale) + 1
+        left = max(0, cell[0] - reach)
+        top = max(0, cell[1] - reach)
+        right = min(self.width, cell[0] + reach + 1)
+        bottom = min(self.height, cell[1] + reach + 1)
+        if right <= left or bottom <= top:
+            return
+
+        region = pygame.Surface((right - left, bottom - top), 0, 8)
+        region.fill(0)
+        if polygon is not None:
+            points = [(px / scale - left, py / scale - top) for px, py in polygon]
+            pygame.draw.polygon(region, EXPLORED, points)
+        else:
+            pygame.draw.circle(region, EXPLORED, (x / scale - left, y / scale - top), radius / scale)
+
+        # OR each row of the region into the map
+        data = pygame.image.tobytes(region, "P")
+        span = right - left
+        cells = self.cells
+        for row in range(bottom - top):
+            new = data[row * span:(row + 1) * span]
+            if not any(new):
+                continue
+            start = (top + row) * self.width + left
+            old = cells[start:start + span]
+            cells[start:start + span] = (int.from_bytes(old, "big") | int.from_bytes(new, "big")).to_bytes(span, "big")
+
+    def explored_fraction(self):
+        return self.cells.count(EXPLORED) / len(self.cells)
+
+    def composite(self, target, camera, pixel_scale, color):
+        """Fill explored blocks in view with `color`.
+
+        target is in screen space divided by pixel_scale (1 for the screen,
+        the lightmap scale for a lightmap).
+        """
+        scale = self.scale
+        factor = camera.zoom / pixel_scale
+        first_col = max(0, int(camera.x // scale))
+        last_col = min(self.width, math.ceil((camera.x + camera.view_width) / scale))
+        first_row = max(0, int(camera.y // scale))
+        last_row = min(self.height, math.ceil((camera.y + camera.view_height) / scale))
+        if last_col <= first_col or last_row <= first_row:
+            return
+
+        cells = self.cells
+        width = self.width
+        origin_x = camera.x
+        for row in range(first_row, last_row):
+            start = row * width
+            line = cells[start + first_col:start + last_col]
+            if EXPLORED not in line:
+                continue
+            top = round((row * scale - camera.y) * factor)
+            height = round(((row + 1) * scale - camera.y) * factor) - top
+            for run in EXPLORED_RUN.finditer(line):
+                left = round(((first_col + run.start()) * scale - origin_x) * factor)
+                right = round(((first_col + run.end()) * scale - origin_x) * factor)
+                target.fill(color, (left, top, right - left, height))
+
+    def to_snapshot(self):
+        """Compressed explored map as plain values for the save file"""
+        return {
+            "scale": self.scale,
+            "width": self.width,
+            "height": self.height,
+            "cells": base64.b64encode(zlib.compress(bytes(self.cells), 6)).decode("ascii"),
+        }
+
+    def load_snapshot(self, snapshot):
+        """Restore the map from to_snapshot(); a mismatching map is ignored"""
+        if (snapshot.get("scale"), snapshot.get("width"), snapshot.get("height")) != \
+                (self.scale, self.width, self.height):
+            log.warning("Ignoring fog of war saved for a different map size")
+            return False
+        try:
+            cells = zlib.decompress(base64.b64decode(snapshot["cells"]))
+        except (KeyError, ValueError, zlib.error) as e:
+            log.error("Could not decode saved fog of war: %s", e)
+            return False
+        if len(cells) != len(self.cells):
+            log.warning("Ignoring fog of war with %d cells (expected %d)", len(cells), len(self.cells))
+            return False
+        self.cells = bytearray(cells)
+        self.last_cell = None
+        return True
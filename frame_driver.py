@@ -0,0 +1,164 @@
+# Frame driver on an asyncio event loop
+#
+# A scene's run() hands its per-frame function to FrameDriver.run(), which
+# calls it once per frame from a coroutine. Instead of sleeping off the rest
+# of the frame in Clock.tick(), the driver awaits the next frame's start, so
+# coroutines started with spawn() run in the idle time between frames: file
+# polling today, autosave, telemetry, asset loading or networking later,
+# without a thread each.
+#
+# The frame always wins: background code only runs while the frame
+# coroutine is waiting, and background coroutines wait with driver.sleep()
+# or driver.slice(), which return only while the idle window still has time
+# left (otherwise they hold the coroutine until the next window). Coroutines
+# are cooperative, so a single step that runs past the deadline still makes
+# the next frame start late; that lateness is measured.
+#
+# Every step of a background coroutine is timed. stats_line() shows the
+# background ms per frame and the frames' lateness, and the totals per
+# coroutine are logged when the driver stops.
+
+import asyncio
+import time
+from collections import deque
+
+from constants import FPS
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+HISTORY_FRAMES = FPS   # Frames averaged by stats_line()
+
+
+class _TimedSteps:
+    """Awaitable that runs a coroutine step by step, charging each step to its name"""
+
+    def __init__(self, coroutine, driver, name):
+        self.coroutine = coroutine
+        self.driver = driver
+        self.name = name
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is None:
+                    future = self.coroutine.send(value)
+                else:
+                    future = self.coroutine.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.driver.charge(self.name, time.perf_counter() - start)
+            try:
+                value, error = (yield future), None
+            except BaseException as e:  # Cancellation goes on to the coroutine
+                value, error = None, e
+
+
+class FrameDriver:
+    """Calls a frame function at a fixed rate and runs background coroutines between frames"""
+
+    def __init__(self, fps=FPS, name="scene"):
+        self.period = 1.0 / fps
+        self.name = name
+        self.pending = []          # (name, coroutine) spawned before run()
+        self.tasks = []
+        self.usage = {}            # Coroutine name -> total ms
+        self.history = deque(maxlen=HISTORY_FRAMES)  # (background ms, late ms) per frame
+        self.frame_background = 0.0
+        self.frames = 0
+        self.work_ms = 0.0         # Time the previous frame function took
+        self.frame_start = 0.0
+        self.deadline = 0.0        # Start of the next frame
+        self.next_window = None    # Future resolved when the next idle window opens
+
+    def spawn(self, coroutine, name):
+        """Run a coroutine in the idle time between frames"""
+        if self.next_window is None:
+            self.pending.append((name, coroutine))
+        else:
+            self._start(name, coroutine)
+
+    def _start(self, name, coroutine):
+        self.usage.setdefault(name, 0.0)
+        self.tasks.append(asyncio.ensure_future(self._background(name, coroutine)))
+
+    async def _background(self, name, coroutine):
+        try:
+            await _TimedSteps(coroutine, self, name)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error("Background task %s failed: %s", name, e)
+
+    def charge(self, name, seconds):
+        ms = seconds * 1000
+        self.usage[name] += ms
+        self.frame_background += ms
+
+    async def slice(self):
+        """Yield, then wait for an idle window with time left; call between chunks of background work"""
+        await asyncio.sleep(0)
+        while time.perf_counter() >= self.deadline:
+            await self.next_window
+
+    async def sleep(self, seconds):
+        """asyncio.sleep() that resumes only within an idle window"""
+        await asyncio.sleep(seconds)
+        await self.slice()
+
+    def run(self, frame):
+        """Call frame(delta_ms) once per frame until it returns False"""
+        asyncio.run(self._run(frame))
+
+    async def _run(self, frame):
+        self.next_window = asyncio.get_running_loop().create_future()
+        for name, coroutine in self.pending:
+            self._start(name, coroutine)
+        self.pending = []
+        self.frame_start = self.deadline = time.perf_counter()
+        delta_ms = round(self.period * 1000)
+        try:
+            while frame(delta_ms):
+                self.frames += 1
+                delta_ms = await self._next_frame()
+        finally:
+            await self._stop()
+
+    async def _next_frame(self):
+        """Idle until the next frame is due; returns the ms since the previous frame started"""
+        now = time.perf_counter()
+        self.work_ms = (now - self.frame_start) * 1000
+        # Frames start on a fixed grid (timer slack does not add up); one that ran over starts right away
+        self.deadline = max(self.deadline + self.period, now)
+
+        window, self.next_window = self.next_window, asyncio.get_running_loop().create_future()
+        window.set_result(None)
+        await asyncio.sleep(self.deadline - now)
+
+        start = time.perf_counter()
+        self.history.append((self.frame_background, max(0.0, start - self.deadline) * 1000))
+        self.frame_background = 0.0
+        delta_ms = round((start - self.frame_start) * 1000)
+        self.frame_start = start
+        return delta_ms
+
+    async def _stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.next_window = None
+        if self.usage:
+            log.info("Background work in %s over %d frames: %s", self.name, self.frames,
+                     ", ".join("%s %.1f ms" % item for item in sorted(self.usage.items())))
+
+    def stats_line(self):
+        count = len(self.history)
+        if not count:
+            return "background idle"
+        background = sum(ms for ms, _ in self.history) / count
+        late = sum(ms for _, ms in self.history) / count
+        return "background %.2f ms/frame (%d tasks), frames late %.2f ms" % (background, len(self.tasks), late)
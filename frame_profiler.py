@@ -0,0 +1,175 @@
+# In-game frame profiler with overlay
+#
+# The game loop calls begin_frame() once per frame and mark(section) at the
+# end of each section; the time since the previous mark is charged to that
+# section (repeated marks in one frame accumulate). While the overlay is
+# disabled, begin_frame/mark/end_frame are bound to a no-op, so the
+# instrumentation costs one empty call per mark.
+#
+# A frame belongs to the thread that began it: marks from other threads
+# (the simulation while the pipeline renders on its own thread) are ignored.
+#
+# F10 toggles the overlay, F11 exports the recorded history to CSV. The
+# benchmark enables timing without the overlay and reads `history`.
+
+import csv
+import os
+import threading
+import time
+from collections import deque
+
+import pygame
+
+from constants import FPS, WHITE
+from game_log import get_logger
+from memory_tracker import track
+
+log = get_logger(__name__)
+
+HISTORY_SECONDS = 10                # Frames kept for the graph and CSV export
+GRAPH_WIDTH = 240
+GRAPH_HEIGHT = 80
+GRAPH_MAX_MS = 50.0                 # Frame time at the top of the graph
+TEXT_REFRESH_FRAMES = 15            # Re-render the breakdown text this often
+CSV_PATH = "logs/frame_profile.csv"
+
+# Sections in display order
+SECTIONS = ("events", "character", "asselya", "tasks", "update", "background",
+            "entities", "particles", "lighting", "hud", "minimap", "overlay", "flip")
+
+
+def _noop(*args):
+    pass
+
+
+class FrameProfiler:
+    """Scoped per-section frame timer with a rolling history"""
+
+    def __init__(self, sections=SECTIONS, history_frames=HISTORY_SECONDS * FPS):
+        self.sections = sections
+        self.history = deque(maxlen=history_frames)  # (frame ms, {section: ms})
+        self.enabled = False
+        self.overlay = True         # Draw the graph and breakdown while enabled
+        self.current = {}
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.thread = None
+        self.skip_frame = False     # First frame after enabling began while disabled
+
+        self.graph = track(pygame.Surface((GRAPH_WIDTH, GRAPH_HEIGHT), pygame.SRCALPHA), "FrameProfiler", "graph")
+        self.font = None
+        self.text_surfaces = []
+        self.frames_since_text = TEXT_REFRESH_FRAMES
+        self.extra_lines = []
+        self.set_enabled(False)
+
+    def set_enabled(self, enabled, overlay=True):
+        """Enable or disable timing; disabled markers are no-ops"""
+        self.enabled = enabled
+        self.overlay = overlay
+        if enabled:
+            self.begin_frame = self._begin_frame
+            self.mark = self._mark
+            self.end_frame = self._end_frame
+            self.skip_frame = True
+            self.graph.fill((0, 0, 0, 160))
+            self.frames_since_text = TEXT_REFRESH_FRAMES
+        else:
+            self.begin_frame = _noop
+            self.mark = _noop
+            self.end_frame = _noop
+
+    def toggle(self):
+        self.set_enabled(not self.enabled)
+        log.info("Frame profiler %s", "enabled" if self.enabled else "disabled")
+
+    def _begin_frame(self):
+        self.skip_frame = False
+        now = time.perf_counter()
+        self.frame_start = now
+        self.last_mark = now
+        self.current = {}
+        self.thread = threading.get_ident()
+
+    def _mark(self, section):
+        if threading.get_ident() != self.thread:
+            return
+        now = time.perf_counter()
+        self.current[section] = self.current.get(section, 0.0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def _end_frame(self):
+        if self.skip_frame:
+            # Enabled mid-frame: its start and marks were never recorded
+            self.skip_frame = False
+            return
+        frame_ms = (time.perf_counter() - self.frame_start) * 1000
+        self.history.append((frame_ms, self.current))
+        self._scroll_graph(frame_ms)
+
+    def _scroll_graph(self, frame_ms):
+        """Shift the graph left by one pixel and draw the newest column"""
+        self.graph.scroll(-1, 0)
+        x = GRAPH_WIDTH - 1
+        pygame.draw.line(self.graph, (0, 0, 0, 160), (x, 0), (x, GRAPH_HEIGHT - 1))
+        height = min(GRAPH_HEIGHT, int(frame_ms / GRAPH_MAX_MS * GRAPH_HEIGHT))
+        budget = 1000.0 / FPS
+        color = (80, 220, 80) if frame_ms <= budget else (240, 200, 60) if frame_ms <= budget * 2 else (240, 60, 60)
+        if height > 0:
+            pygame.draw.line(self.graph, color, (x, GRAPH_HEIGHT - height), (x, GRAPH_HEIGHT - 1))
+        # Budget line
+        budget_y = GRAPH_HEIGHT - int(budget / GRAPH_MAX_MS * GRAPH_HEIGHT)
+        self.graph.set_at((x, budget_y), (255, 255, 255))
+
+    def averages(self, frames=FPS):
+        """Average frame ms and per-section ms over the last `frames` frames"""
+        recent = list(self.history)[-frames:]
+        if not recent:
+            return 0.0, {}
+        totals = {}
+        for _, sections in recent:
+            for name, ms in sections.items():
+                totals[name] = totals.get(name, 0.0) + ms
+        count = len(recent)
+        return sum(frame for frame, _ in recent) / count, {name: ms / count for name, ms in totals.items()}
+
+    def draw(self, screen, x=10, y=420):
+        """Draw the graph and section breakdown"""
+        if not self.enabled or not self.overlay:
+            return
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, 22)
+
+        # Text is re-rendered a few times per second, not every frame
+        self.frames_since_text += 1
+        if self.frames_since_text >= TEXT_REFRESH_FRAMES:
+            self.frames_since_text = 0
+            frame_ms, sections = self.averages()
+            lines = [f"frame {frame_ms:6.2f} ms ({1000 / frame_ms if frame_ms else 0:5.1f} fps)"]
+            for name in self.sections:
+                if name in sections:
+                    lines.append(f"{name:<11}{sections[name]:6.2f} ms")
+            lines.extend(self.extra_lines)
+            self.text_surfaces = [self.font.render(line, True, WHITE) for line in lines]
+
+        panel_height = GRAPH_HEIGHT + 8 + len(self.text_surfaces) * 18
+        panel = pygame.Rect(x - 4, y - 4, GRAPH_WIDTH + 8, panel_height + 4)
+        screen.fill((0, 0, 0), panel)
+        screen.blit(self.graph, (x, y))
+        for i, surface in enumerate(self.text_surfaces):
+            screen.blit(surface, (x, y + GRAPH_HEIGHT + 6 + i * 18))
+
+    def export_csv(self, path=CSV_PATH):
+        """Write the recorded history (last HISTORY_SECONDS) to CSV"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(("frame", "frame_ms") + self.sections)
+            for index, (frame_ms, sections) in enumerate(self.history):
+                writer.writerow([index, f"{frame_ms:.4f}"] +
+                                [f"{sections.get(name, 0.0):.4f}" for name in self.sections])
+        log.info("Exported %d frames to %s", len(self.history), path)
+        return len(self.history)
@@ -1,20 +1,121 @@
+import copy
+import math
+import time
 import pygame
 import sys
-from constants import (WIDTH, HEIGHT, BG_WIDTH, BG_HEIGHT, FPS, WHITE, LIGHT_RADIUS, DARKNESS_ALPHA,
-                      USERS_COLOR, MONEY_COLOR, BAR_BG_COLOR, BAR_BORDER_COLOR, BLACK, GREEN, RED, ORANGE)
+from constants import (WIDTH, HEIGHT, BG_WIDTH, BG_HEIGHT, FPS, WHITE, LIGHT_RADIUS,
+                      USERS_COLOR, MONEY_COLOR, BAR_BG_COLOR, BAR_BORDER_COLOR, GREEN, RED, ORANGE,
+                      SAVE_PATH, AUTOSAVE_INTERVAL, FLICKER_RANGE, FLICKER_DEPTH, FLICKER_STEP_MS)
 from utils import set_polygon_boundaries
 from camera import Camera
+from mipmap import MipChain
+from minimap import Minimap
+from lighting import LightingEngine, Light, FLICKER_NOISE
+from visibility import VisibilityIndex
+from fog_of_war import FogOfWar
+from particles import Emitter, ParticleSystem
 from character import Character
 from asselya import Asselya  # Temporarily disabled for safe environment
 from npc import NPC
-from task_manager import TaskManager
+from task_manager import TaskManager, TaskStatus
 from clickable_character import ClickableCharacter
+from dialogue import DialogueSystem
+from render_backend import create_backend
+from lod import UpdateScheduler
+from ai_worker import AI_WORKER_ENABLED, AIWorker
+from quality import QualityController
+from pipeline import PIPELINE_ENABLED, FramePipeline
+from frame_driver import FrameDriver
+from game_log import get_logger, dump_ring, DUMP_PATH
+from save_game import SaveManager, load_snapshot
+from hot_reload import HOT_RELOAD_ENABLED, TaskHotReloader
+from input_replay import create_input_source
+from frame_profiler import FrameProfiler
+from deep_profiler import DeepProfiler
+import memory_tracker
+from memory_tracker import track
+import asset_pipeline
+from asset_pipeline import optimize, solid_panel
+
+log = get_logger(__name__)
+
+# Walkable area of the map (polygon boundaries for collision detection)
+MAP_POLYGON = [
+    (0, 1725),      # 0:1150 * 1.5
+    (258, 1724),    # 172:1149 * 1.5
+    (260, 1368),    # 173:912 * 1.5
+    (420, 1385),    # 280:923 * 1.5
+    (450, 1727),    # 300:1151 * 1.5
+    (2600, 1727),   # 1733:1151 * 1.5
+    (2604, 1383),   # 1736:922 * 1.5
+    (2694, 1370),   # 1796:913 * 1.5
+    (1620, 1212),   # 1080:808 * 1.5
+    (3117, 1215),   # 2078:810 * 1.5
+    (3113, 1368),   # 2075:912 * 1.5
+    (3225, 1377),   # 2150:918 * 1.5
+    (3225, 1725),   # 2150:1150 * 1.5
+    (3630, 1725),   # 2420:1150 * 1.5
+    (3645, 1335),   # 2430:890 * 1.5
+    (3840, 1335),   # 2560:890 * 1.5
+    (3840, 1725),   # 2560:1150 * 1.5
+    (4245, 1725),   # 2830:1150 * 1.5
+    (4245, 1364),   # 2830:909 * 1.5
+    (4350, 1370),   # 2900:913 * 1.5
+    (4350, 1208),   # 2900:805 * 1.5
+    (4773, 1200),   # 3182:800 * 1.5
+    (4770, 1350),   # 3180:900 * 1.5
+    (4890, 1353),   # 3260:902 * 1.5
+    (4890, 1725),   # 3260:1150 * 1.5
+    (5625, 1725),   # 3750:1150 * 1.5
+    (5625, 1455),   # 3750:970 * 1.5
+    (5706, 1455),   # 3804:970 * 1.5
+    (5700, 1725),   # 3800:1150 * 1.5
+    (6144, 1725),   # 4096:1150 * 1.5
+    (6144, 1905),   # 4096:1270 * 1.5
+    (5745, 1905),   # 3830:1270 * 1.5
+    (5745, 2160),   # 3830:1440 * 1.5
+    (5625, 2160),   # 3750:1440 * 1.5
+    (5610, 1905),   # 3740:1270 * 1.5
+    (3900, 1905),   # 2600:1270 * 1.5
+    (3900, 2250),   # 2600:1500 * 1.5
+    (3581, 2250),   # 2387:1500 * 1.5
+    (3581, 1905),   # 2387:1270 * 1.5
+    (525, 1905),    # 350:1270 * 1.5
+    (525, 2250),    # 350:1500 * 1.5
+    (203, 2250),    # 135:1500 * 1.5
+    (203, 1905),    # 135:1270 * 1.5
+    (0, 1905),      # 0:1270 * 1.5
+]
+
+# Ceiling lamps along the main corridor (world coordinates)
+CEILING_LAMPS = [(x, 1815) for x in range(384, BG_WIDTH, 768)]
+LAMP_RADIUS = 160
+LAMP_INTENSITY = 0.3
+MONITOR_RADIUS = 70
+MONITOR_INTENSITY = 0.5
+FLASHLIGHT_RADIUS = 450
+FLASHLIGHT_INTENSITY = 0.8
+
+# Particle colors
+DUST_COLORS = [(120, 110, 95), (150, 140, 120)]
+SPARK_COLORS = [(255, 220, 120), (255, 170, 60), (255, 255, 200)]
+CHASE_COLORS = [(170, 0, 0), (100, 0, 0), (60, 0, 0)]
 
 class Game:
-    def __init__(self):
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Escapist Game - Horror Mode")
-        self.clock = pygame.time.Clock()
+    def __init__(self, renderer=None):
+        # Surface or texture compositing (default: ESCAPEN_RENDERER)
+        self.render_backend = create_backend((WIDTH, HEIGHT), "Escapist Game - Horror Mode", renderer)
+        self.screen = self.render_backend.screen
+        
+        # Frame pacing on an asyncio loop; background coroutines use the idle time
+        self.driver = FrameDriver(FPS, "game")
+        memory_tracker.set_scene("game")
+        
+        # Input source (live, recording or replaying a session)
+        self.input = create_input_source()
+        
+        # Frame profiler overlay (F10); markers are no-ops while it's off
+        self.profiler = FrameProfiler()
         
         # Initialize pygame mixer for sound
         pygame.mixer.init()
@@ -24,14 +125,16 @@ class Game:
             pygame.mixer.music.load("song.mp3")
             pygame.mixer.music.set_volume(0.3)  # Set volume to 30%
             pygame.mixer.music.play(-1)  # Play indefinitely
-            print("Background music loaded and playing")
+            log.info("Background music loaded and playing")
         except pygame.error as e:
-            print(f"Error loading background music: {e}")
+            log.warning("Error loading background music: %s", e)
         
         # Game state
         self.game_over = False
         self.game_over_timer = 0
         self.flicker_timer = 0
+        self.god_mode = False  # Chasers can't end the game (used by the benchmark)
+        self.teleport_pending = False  # Lection hall starts once the frame driver has stopped
         
         # Startup metrics
         self.users = 10  # Starting with 10 users
@@ -44,6 +147,7 @@ class Game:
         self.fade_speed = 3    # Speed of fade-in
         self.fade_surface = pygame.Surface((WIDTH, HEIGHT))
         self.fade_surface.fill((0, 0, 0))  # Black surface
+        track(self.fade_surface, "Game", "fade_surface")
         
         # Door coordinates (scaled for 1920x1080)
         self.door_x1 = 1800 * 1.5  # 2700
@@ -52,18 +156,22 @@ class Game:
         self.door_width = self.door_x2 - self.door_x1  # 405
         self.door_height = 50  # Door height for collision detection
         
-        # Create darkness overlay surface
-        self.darkness_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        
         # Load background image
         try:
             self.background = pygame.image.load("sprites/map/map.png")
             self.background = pygame.transform.scale(self.background, (BG_WIDTH, BG_HEIGHT))
         except pygame.error as e:
-            print(f"Ошибка загрузки фона: {e}")
+            log.error("Ошибка загрузки фона: %s", e)
             # Create a fallback background
             self.background = pygame.Surface((BG_WIDTH, BG_HEIGHT))
             self.background.fill((50, 50, 50))  # Dark gray
+        track(self.background, "Game", "background")
+        
+        # Reduced copies of the map for zoomed-out views (built on first zoom)
+        self.background_mips = MipChain(self.background, "map")
+        
+        # Minimap base is downscaled once here, never at runtime
+        self.minimap = Minimap(self.background)
         
         # Load start project image and UI
         try:
@@ -72,13 +180,17 @@ class Game:
             target_width = int((1994 - 1874) * 1.5)  # 180 pixels
             target_height = int((908 - 833) * 1.5)   # 112.5 pixels
             self.startproject_img = pygame.transform.scale(self.startproject_img, (target_width, target_height))
+            self.startproject_img = optimize(self.startproject_img, "assets/startproject.png")
+            track(self.startproject_img, "Game", "startproject_img")
             self.startproject_x = int(1874 * 1.5)  # 2811
             self.startproject_y = int(833 * 1.5)   # 1249.5
-            print(f"Start project image loaded and positioned at ({self.startproject_x}, {self.startproject_y})")
+            log.info("Start project image loaded and positioned at (%d, %d)", self.startproject_x, self.startproject_y)
             
             # Load start game window
             self.startgame_window = pygame.image.load("assets/startthegame.png")
             self.startgame_window = pygame.transform.scale(self.startgame_window, (WIDTH, HEIGHT))
+            self.startgame_window = optimize(self.startgame_window, "assets/startthegame.png")
+            track(self.startgame_window, "Game", "startgame_window")
             
             # Define clickable button area within the window
             self.button_width = 400  # Adjust as needed
@@ -90,7 +202,7 @@ class Game:
             self.show_start_window = False
             
         except pygame.error as e:
-            print(f"Could not load start game assets: {e}")
+            log.error("Could not load start game assets: %s", e)
             self.startproject_img = None
             self.startgame_window = None
         
@@ -98,55 +210,8 @@ class Game:
         self.camera = Camera()
         
         # Set polygon boundaries for collision detection
-        polygon_coordinates = [
-            (0, 1725),      # 0:1150 * 1.5
-            (258, 1724),    # 172:1149 * 1.5
-            (260, 1368),    # 173:912 * 1.5
-            (420, 1385),    # 280:923 * 1.5
-            (450, 1727),    # 300:1151 * 1.5
-            (2600, 1727),   # 1733:1151 * 1.5
-            (2604, 1383),   # 1736:922 * 1.5
-            (2694, 1370),   # 1796:913 * 1.5
-            (1620, 1212),   # 1080:808 * 1.5
-            (3117, 1215),   # 2078:810 * 1.5
-            (3113, 1368),   # 2075:912 * 1.5
-            (3225, 1377),   # 2150:918 * 1.5
-            (3225, 1725),   # 2150:1150 * 1.5
-            (3630, 1725),   # 2420:1150 * 1.5
-            (3645, 1335),   # 2430:890 * 1.5
-            (3840, 1335),   # 2560:890 * 1.5
-            (3840, 1725),   # 2560:1150 * 1.5
-            (4245, 1725),   # 2830:1150 * 1.5
-            (4245, 1364),   # 2830:909 * 1.5
-            (4350, 1370),   # 2900:913 * 1.5
-            (4350, 1208),   # 2900:805 * 1.5
-            (4773, 1200),   # 3182:800 * 1.5
-            (4770, 1350),   # 3180:900 * 1.5
-            (4890, 1353),   # 3260:902 * 1.5
-            (4890, 1725),   # 3260:1150 * 1.5
-            (5625, 1725),   # 3750:1150 * 1.5
-            (5625, 1455),   # 3750:970 * 1.5
-            (5706, 1455),   # 3804:970 * 1.5
-            (5700, 1725),   # 3800:1150 * 1.5
-            (6144, 1725),   # 4096:1150 * 1.5
-            (6144, 1905),   # 4096:1270 * 1.5
-            (5745, 1905),   # 3830:1270 * 1.5
-            (5745, 2160),   # 3830:1440 * 1.5
-            (5625, 2160),   # 3750:1440 * 1.5
-            (5610, 1905),   # 3740:1270 * 1.5
-            (3900, 1905),   # 2600:1270 * 1.5
-            (3900, 2250),   # 2600:1500 * 1.5
-            (3581, 2250),   # 2387:1500 * 1.5
-            (3581, 1905),   # 2387:1270 * 1.5
-            (525, 1905),    # 350:1270 * 1.5
-            (525, 2250),    # 350:1500 * 1.5
-            (203, 2250),    # 135:1500 * 1.5
-            (203, 1905),    # 135:1270 * 1.5
-            (0, 1905),      # 0:1270 * 1.5
-        ]
-        
-        set_polygon_boundaries(polygon_coordinates)
-        print(f"Set polygon boundaries with {len(polygon_coordinates)} coordinates")
+        set_polygon_boundaries(MAP_POLYGON)
+        log.debug("Set polygon boundaries with %d coordinates", len(MAP_POLYGON))
         
         # Start character in a safe area
         start_x = BG_WIDTH // 2
@@ -157,12 +222,18 @@ class Game:
         self.asselya = Asselya(3200, 1600, "./asselya")  # Исправляем путь к спрайтам
         self.asselya.is_active = True  # Включаем Аселю
         
+        # Everyone who can chase the player (the benchmark adds more)
+        self.chasers = [self.asselya]
+        
         # Create stationary NPC (Bernar) to the left of spawn point
         self.npc = NPC(start_x - 150, start_y, "npc/bernar/bernar", 75, 5)
         
         # Create stationary NPC (Bakhredin) to the right of spawn point
         self.bakhredin = NPC(start_x + 150, start_y, "npc/bakhredin/bahr", 90, 7)
         
+        # All NPCs that are updated and drawn each frame
+        self.npcs = [self.npc, self.bakhredin]
+        
         # Create clickable character with blink.png sprite near spawn point
         self.clickable_character = ClickableCharacter(
             start_x - 80,  # Position to the left of bernar
@@ -170,24 +241,101 @@ class Game:
             "sprites/blink.png"  # Path to blink.png
         )
         
+        # How often each entity is updated, by distance from the view
+        self.lod = UpdateScheduler()
+        
+        # Chaser steering computed in a worker process (optional)
+        self.ai_worker = AIWorker.create(MAP_POLYGON, BG_WIDTH, BG_HEIGHT) if AI_WORKER_ENABLED else None
+        
+        # NPC dialogues (click an NPC to talk, click or Space to continue)
+        self.dialogue = DialogueSystem()
+        self.dialogue.register(self.bakhredin, "dialogues/bakhredin/script.json")
+        self.dialogue.register(self.npc, "dialogues/bernar/script.json")
+        
         # Initialize task system
         self.task_manager = TaskManager()
         self.task_manager.set_asselya(self.asselya)  # Связываем TaskManager с Аселей
-        print("Task system initialized")
+        log.info("Task system initialized")
+        
+        # Lighting (needs the character and the tasks)
+        self.create_lights()
+        self.create_particles()
+        
+        # HUD text surfaces, re-rendered only when their text changes
+        self.hud_fonts = {}
+        self.hud_texts = {}
+        self.hud_frame = 0
+        self.hud_interval = 1
+        
+        # Quality tiers follow the frame time (or ESCAPEN_QUALITY pins one)
+        self.quality = QualityController()
+        if self.input.deterministic:
+            self.quality.pin("input recording/replay")
+        self.apply_quality(self.quality.tier)
+        
+        # Development builds reload tasks.json and task sprites on change
+        self.hot_reloader = TaskHotReloader(self.task_manager) if HOT_RELOAD_ENABLED else None
+        
+        # Save system (snapshots are written on a background thread)
+        self.save_manager = SaveManager(SAVE_PATH)
+        self.autosave_enabled = True
+        self.autosave_timer = 0
+        
+        # Deep profiling capture (F8 or ESCAPEN_PROFILE); inactive otherwise
+        self.deep_profiler = DeepProfiler("game", self.entity_counts)
+        
+        # Drawing on a render thread, one tick behind the simulation (optional)
+        self.pipeline = FramePipeline.create(self.render_backend, self.render_snapshot) if PIPELINE_ENABLED else None
+        
+        memory_tracker.report("game")
+        asset_pipeline.report()
+    
+    def apply_quality(self, tier):
+        """Switch lighting, HUD, entity LOD and particle settings to a quality tier"""
+        self.lighting.set_steps(tier.light_steps)
+        self.lighting.set_scale(tier.render_scale)
+        self.hud_interval = tier.hud_interval
+        self.lod.near_margin = tier.lod_margin
+        self.lod.reduced_interval = tier.lod_interval
+        self.particles.set_cap(tier.particle_cap)
+    
+    def hud_text(self, key, size, text, color=WHITE):
+        """Rendered HUD text; a change shows up within hud_interval frames"""
+        cached = self.hud_texts.get(key)
+        if cached is None or (cached[0] != (text, color) and self.hud_frame % self.hud_interval == 0):
+            font = self.hud_fonts.get(size)
+            if font is None:
+                font = self.hud_fonts[size] = pygame.font.Font(None, size)
+            cached = self.hud_texts[key] = ((text, color), font.render(text, True, color))
+        return cached[1]
+    
+    def entity_counts(self):
+        """Scene size, used to tag profiles and benchmarks"""
+        return {
+            "tasks": len(self.task_manager.tasks),
+            "active_tasks": len(self.task_manager.active_tasks),
+            "npcs": len(self.npcs),
+            "chasers": len(self.chasers),
+            "particles": self.particles.count(),
+        }
     
     def check_collision(self):
-        """Check if Asselya caught the player"""
-        if not self.asselya.is_chasing:
+        """Check if Asselya (or another chaser) caught the player"""
+        if self.god_mode:
             return False
-            
-        # Calculate distance between player and Asselya
-        dx = self.character.world_x - self.asselya.world_x
-        dy = self.character.world_y - self.asselya.world_y
-        distance = (dx * dx + dy * dy) ** 0.5
         
-        # If Asselya is close enough, game over
-        if distance < 50:  # 50 pixels collision radius
-            return True
+        for chaser in self.chasers:
+            if not chaser.is_chasing:
+                continue
+            
+            # Calculate distance between player and the chaser
+            dx = self.character.world_x - chaser.world_x
+            dy = self.character.world_y - chaser.world_y
+            distance = (dx * dx + dy * dy) ** 0.5
+            
+            # If the chaser is close enough, game over
+            if distance < 50:  # 50 pixels collision radius
+                return True
         return False
         
     def check_door_collision(self):
@@ -223,27 +371,38 @@ class Game:
         
     def teleport_to_lection(self):
         """Teleport player to lection hall (separate game environment)"""
-        print("Teleporting to lection hall...")
+        log.info("Teleporting to lection hall...")
         
         # Import and start the lection game
         from lection_game import LectionGame
         
+        # The lection hall exits the process when it ends, so this scene's
+        # full-size surfaces are dropped instead of staying resident
+        self.background = None
+        self.background_mips = None
+        self.minimap = None
+        self.startgame_window = None
+        self.lighting = None
+        self.fade_surface = None
+        
+        # The lection hall draws with plain surfaces into its own window
+        self.stop_pipeline()
+        self.render_backend.close()
+        
         # Quit current pygame instance
         pygame.quit()
         
         # Initialize pygame again for lection game
         pygame.init()
         
-        # Start lection game
-        lection_game = LectionGame()
+        # Start lection game (keeps recording/replaying the same input log, and closes it)
+        lection_game = LectionGame(self.input, owns_input=True)
         lection_game.run()
     
     def draw_game_over_screen(self):
         """Draw game over screen"""
         # Create semi-transparent overlay
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))  # Dark overlay
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(solid_panel((WIDTH, HEIGHT), (0, 0, 0), 180), (0, 0))  # Dark overlay
         
         # Game Over text
         font_large = pygame.font.Font(None, 120)
@@ -284,10 +443,11 @@ class Game:
         self.character.world_y = start_y
         self.character.is_running = False
         
-        # Reset Aselya
-        self.asselya.world_x = 3200
-        self.asselya.world_y = 1600
-        self.asselya.is_chasing = False
+        # Reset Aselya (and any extra chasers)
+        for chaser in self.chasers:
+            chaser.world_x = chaser.base_x
+            chaser.world_y = chaser.base_y
+            chaser.is_chasing = False
         
         # Reset stationary NPCs positions
         self.npc.world_x = start_x - 150
@@ -298,20 +458,104 @@ class Game:
         # Reset tasks
         self.task_manager.reset_all_tasks()
         
+        # Forget explored areas
+        self.fog.clear()
+        
+        # Drop live particles
+        self.particles.clear()
+        self.chase_started = False
+        
+        # Close any open dialogue
+        self.dialogue.close()
+        
+        # Drop time owed to off-screen entities
+        self.lod.clear()
+        
+        # Reset autosave
+        self.autosave_timer = 0
+        
         # Reset camera
         self.camera.update(self.character.world_x, self.character.world_y)
     
+    def make_snapshot(self):
+        """Collect mutable runtime state as plain values for saving"""
+        return {
+            "users": self.users,
+            "money": self.money,
+            "character": {
+                "x": self.character.world_x,
+                "y": self.character.world_y,
+                "facing_right": self.character.facing_right,
+            },
+            "asselya": {
+                "x": self.asselya.world_x,
+                "y": self.asselya.world_y,
+                "is_chasing": self.asselya.is_chasing,
+            },
+            "tasks": self.task_manager.get_runtime_state(),
+            "fog": self.fog.to_snapshot(),
+        }
+    
+    def apply_snapshot(self, snapshot):
+        """Restore runtime state from a snapshot made by make_snapshot()"""
+        self.set_users(snapshot.get("users", self.users))
+        self.set_money(snapshot.get("money", self.money))
+        
+        character = snapshot.get("character", {})
+        self.character.world_x = character.get("x", self.character.world_x)
+        self.character.world_y = character.get("y", self.character.world_y)
+        self.character.facing_right = character.get("facing_right", True)
+        
+        asselya = snapshot.get("asselya", {})
+        self.asselya.world_x = asselya.get("x", self.asselya.world_x)
+        self.asselya.world_y = asselya.get("y", self.asselya.world_y)
+        self.asselya.is_chasing = asselya.get("is_chasing", False)
+        
+        self.task_manager.apply_runtime_state(snapshot.get("tasks", {}))
+        if "fog" in snapshot:
+            self.fog.load_snapshot(snapshot["fog"])
+        self.camera.update(self.character.world_x, self.character.world_y)
+    
+    def save_game(self):
+        """Queue a snapshot for the background writer"""
+        self.save_manager.request_save(self.make_snapshot())
+        self.autosave_timer = 0
+    
+    def load_game(self):
+        """Load the last saved snapshot, if any"""
+        snapshot = load_snapshot(SAVE_PATH)
+        if snapshot is None:
+            log.info("No save found at %s", SAVE_PATH)
+            return False
+        self.game_over = False
+        self.apply_snapshot(snapshot)
+        log.info("Loaded save from %s", SAVE_PATH)
+        return True
+    
+    def get_asselya_distance_sq(self):
+        """Squared distance between the centers of the player and Asselya"""
+        dx = (self.asselya.world_x + self.asselya.width // 2) - (self.character.world_x + self.character.width // 2)
+        dy = (self.asselya.world_y + self.asselya.height // 2) - (self.character.world_y + self.character.height // 2)
+        return dx * dx + dy * dy
+    
     def get_asselya_distance(self):
-        """Get distance between player and Asselya - DISABLED"""
-        # Asselya disabled for safe environment
-        return 1000  # Return large distance to disable effects
+        """Get distance between player and Asselya"""
+        return math.sqrt(self.get_asselya_distance_sq())
     
     def apply_flicker_effect(self):
-        """Apply screen flicker effect based on Asselya proximity - DISABLED"""
-        # Asselya disabled for safe environment
-        return
-        
-        # All flicker effect code disabled
+        """Make the lights flicker as Asselya gets close to the player"""
+        start = time.perf_counter()
+        gain = 1.0
+        if self.asselya.is_active:
+            distance_sq = self.get_asselya_distance_sq()
+            range_sq = FLICKER_RANGE * FLICKER_RANGE
+            if distance_sq < range_sq:
+                # Squared falloff: no sqrt needed, and it ramps up fast near the end
+                proximity = 1.0 - distance_sq / range_sq
+                noise = FLICKER_NOISE[int(self.flicker_timer // FLICKER_STEP_MS) % len(FLICKER_NOISE)]
+                gain = 1.0 - FLICKER_DEPTH * proximity * noise
+        self.lighting.gain = gain
+        self.lighting.record("flicker", time.perf_counter() - start)
         
     def draw_polygon_boundaries(self, screen):
         """Draw polygon boundaries (optional - for debugging)"""
@@ -326,38 +570,90 @@ class Game:
         #         pygame.draw.polygon(screen, (255, 0, 0), points, 2)
         pass
     
-    def apply_horror_lighting(self):
-        """Apply horror lighting effect - darkness with light around character"""
-        # Fill darkness surface with semi-transparent black
-        self.darkness_surface.fill((0, 0, 0, DARKNESS_ALPHA))
-        
-        # Get character position on screen
-        char_screen_x, char_screen_y = self.camera.apply(
-            self.character.world_x + self.character.width // 2,  # Center of character
-            self.character.world_y + self.character.height // 2
-        )
+    def create_lights(self):
+        """Player light, flashlight, ceiling lamps and monitor glow at PC tasks"""
+        # Lights carried by the player stop at the walls of the walkable area
+        self.visibility = VisibilityIndex(MAP_POLYGON)
+        self.fog = FogOfWar()
+        self.lighting = LightingEngine((WIDTH, HEIGHT), occluder=self.visibility, fog=self.fog)
+        self.player_light = self.lighting.add_light(Light("player", 0, 0, LIGHT_RADIUS, occluded=True))
+        self.flashlight = self.lighting.add_light(
+            Light("flashlight", 0, 0, FLASHLIGHT_RADIUS, FLASHLIGHT_INTENSITY, shape="cone", occluded=True))
+        self.flashlight.enabled = False
         
-        # Create light circle around character
-        # We'll create a gradient light effect
-        for radius in range(LIGHT_RADIUS, 0, -5):
-            # Calculate alpha for gradient effect (more transparent in center)
-            alpha = int((LIGHT_RADIUS - radius) / LIGHT_RADIUS * DARKNESS_ALPHA)
-            
-            # Create temporary surface for this circle
-            circle_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(circle_surface, (0, 0, 0, alpha), (radius, radius), radius)
-            
-            # Blit with BLEND_RGBA_SUB to subtract darkness (create light)
-            circle_x = char_screen_x - radius
-            circle_y = char_screen_y - radius
-            
-            # Make sure circle is within screen bounds
-            if (circle_x < WIDTH and circle_x + radius * 2 > 0 and 
-                circle_y < HEIGHT and circle_y + radius * 2 > 0):
-                self.darkness_surface.blit(circle_surface, (circle_x, circle_y), special_flags=pygame.BLEND_RGBA_SUB)
+        for i, (lamp_x, lamp_y) in enumerate(CEILING_LAMPS):
+            self.lighting.add_light(Light(f"lamp-{i + 1}", lamp_x, lamp_y, LAMP_RADIUS, LAMP_INTENSITY))
         
-        # Apply the darkness overlay to the screen
-        self.screen.blit(self.darkness_surface, (0, 0))
+        # Tasks with a computer sprite glow once they appear on the map
+        self.monitor_lights = []
+        for task in self.task_manager.tasks.values():
+            if "_pc" in task.sprite_before_path:
+                light = Light(f"monitor-{task.id}", 0, 0, MONITOR_RADIUS, MONITOR_INTENSITY)
+                self.monitor_lights.append((task, self.lighting.add_light(light)))
+    
+    def create_particles(self):
+        """Dust behind the running player, task sparks and the chase effect"""
+        self.particles = ParticleSystem()
+        self.dust = self.particles.add(Emitter(
+            "dust", 48, DUST_COLORS, size=4, lifetime=(250, 500), speed=(0.01, 0.04),
+            angle=(math.pi + 0.3, 2 * math.pi - 0.3), gravity=0.0001, rate=40))
+        self.dust.attach(self.character, self.character.width // 2, self.character.height - 4)
+        self.sparks = self.particles.add(Emitter(
+            "sparks", 160, SPARK_COLORS, size=3, lifetime=(300, 700), speed=(0.1, 0.35),
+            gravity=0.0008))
+        self.chase_effect = self.particles.add(Emitter(
+            "chase", 120, CHASE_COLORS, size=6, lifetime=(600, 1200), speed=(0.05, 0.2),
+            screen_space=True))
+        self.chase_started = False
+    
+    def burst_chase_effect(self):
+        """Embers closing in from the screen edges when a chase starts"""
+        amount = self.chase_effect.capacity // 4
+        self.chase_effect.burst(amount, 0, HEIGHT / 2, spread_y=HEIGHT / 2, angle=(-0.4, 0.4))
+        self.chase_effect.burst(amount, WIDTH, HEIGHT / 2, spread_y=HEIGHT / 2, angle=(math.pi - 0.4, math.pi + 0.4))
+        self.chase_effect.burst(amount, WIDTH / 2, 0, spread_x=WIDTH / 2, angle=(math.pi / 2 - 0.4, math.pi / 2 + 0.4))
+        self.chase_effect.burst(amount, WIDTH / 2, HEIGHT, spread_x=WIDTH / 2, angle=(-math.pi / 2 - 0.4, -math.pi / 2 + 0.4))
+    
+    def update_lights(self):
+        """Move the lights that follow the player or tasks"""
+        center_x = self.character.world_x + self.character.width // 2
+        center_y = self.character.world_y + self.character.height // 2
+        self.player_light.x = center_x
+        self.player_light.y = center_y
+        self.flashlight.x = center_x
+        self.flashlight.y = center_y
+        self.flashlight.direction = 1 if self.character.facing_right else -1
+        
+        for task, light in self.monitor_lights:
+            light.enabled = task.status != TaskStatus.INACTIVE
+            light.x = task.world_x + task.width // 2
+            light.y = task.world_y + task.height // 2
+    
+    def minimap_entities(self):
+        """Centers of everything shown on the minimap, player last (on top)"""
+        entities = [(task.world_x + task.width // 2, task.world_y + task.height // 2, "task")
+                    for task in self.task_manager.get_active_tasks()]
+        for npc in self.npcs:
+            entities.append((npc.world_x + npc.width // 2, npc.world_y + npc.height // 2, "npc"))
+        for chaser in self.chasers:
+            if chaser.is_active:
+                entities.append((chaser.world_x + chaser.width // 2, chaser.world_y + chaser.height // 2, "asselya"))
+        entities.append((self.character.world_x + self.character.width // 2,
+                         self.character.world_y + self.character.height // 2, "player"))
+        return entities
+    
+    def apply_horror_lighting(self):
+        """Apply horror lighting effect - darkness with the player light and scene lights"""
+        self.update_lights()
+        self.apply_flicker_effect()
+        self.render_backend.draw_lighting(self.lighting, self.camera)
+        
+        # Per-light cost in the profiler overlay
+        if self.profiler.enabled:
+            self.profiler.extra_lines = ([self.quality.status_line()] + self.lighting.cost_lines() +
+                                         [self.lod.stats_line(), self.driver.stats_line()])
+            if self.pipeline:
+                self.profiler.extra_lines.append(self.pipeline.stats_line(self.driver.work_ms))
     
     def draw_startup_metrics(self):
         """Draw startup metrics bars (users and money)"""
@@ -379,9 +675,8 @@ class Game:
         pygame.draw.rect(self.screen, BAR_BORDER_COLOR, (bar_x, users_bar_y, bar_width, bar_height), 2)
         
         # Users text
-        font = pygame.font.Font(None, 28)
         users_text = f"Users: {self.users:,}"
-        users_surface = font.render(users_text, True, WHITE)
+        users_surface = self.hud_text("users", 28, users_text)
         self.screen.blit(users_surface, (bar_x, users_bar_y - 25))
         
         # Draw Money bar
@@ -397,43 +692,41 @@ class Game:
         
         # Money text
         money_text = f"Money: ${self.money:,}"
-        money_surface = font.render(money_text, True, WHITE)
+        money_surface = self.hud_text("money", 28, money_text)
         self.screen.blit(money_surface, (bar_x, money_bar_y - 25))
     
     def add_users(self, amount):
         """Add users to the startup"""
         self.users = min(self.users + amount, self.max_users)
-        print(f"Added {amount} users. Total: {self.users:,}")
+        log.debug("Added %d users. Total: %d", amount, self.users)
     
     def remove_users(self, amount):
         """Remove users from the startup"""
         self.users = max(self.users - amount, 0)
-        print(f"Removed {amount} users. Total: {self.users:,}")
+        log.debug("Removed %d users. Total: %d", amount, self.users)
     
     def add_money(self, amount):
         """Add money to the startup"""
         self.money = min(self.money + amount, self.max_money)
-        print(f"Added ${amount:,}. Total: ${self.money:,}")
+        log.debug("Added $%d. Total: $%d", amount, self.money)
     
     def remove_money(self, amount):
         """Remove money from the startup"""
         self.money = max(self.money - amount, 0)
-        print(f"Removed ${amount:,}. Total: ${self.money:,}")
+        log.debug("Removed $%d. Total: $%d", amount, self.money)
     
     def set_users(self, amount):
         """Set exact number of users"""
         self.users = min(max(amount, 0), self.max_users)
-        print(f"Set users to: {self.users:,}")
+        log.debug("Set users to: %d", self.users)
     
     def set_money(self, amount):
         """Set exact amount of money"""
         self.money = min(max(amount, 0), self.max_money)
-        print(f"Set money to: ${self.money:,}")
+        log.debug("Set money to: $%d", self.money)
 
     def draw_social_timer(self):
         """Отрисовка таймера для социальных заданий"""
-        font = pygame.font.Font(None, 36)
-        
         if self.task_manager.social_warning_active:
             # Отрисовка таймера предупреждения
             remaining = self.task_manager.get_remaining_warning_time()
@@ -445,16 +738,40 @@ class Game:
             text = f"До проверки соц. сетей: {int(remaining)} сек"
             color = WHITE
         
-        text_surface = font.render(text, True, color)
+        text_surface = self.hud_text("social_timer", 36, text, color)
         self.screen.blit(text_surface, (WIDTH - 400, 10))
 
-    def update_asselya(self):
-        """Обновление состояния Асели"""
-        if self.asselya.is_chasing:
+    def update_asselya(self, delta_time):
+        """Обновление состояния Асели (и остальных преследователей)"""
+        steering = ()
+        if self.ai_worker:
+            # Результаты прошлых тиков воркера; ждать его не нужно
+            steering = self.ai_worker.results()
+            self.ai_worker.publish(
+                self.character.world_x + self.character.width / 2,
+                self.character.world_y + self.character.height / 2,
+                [(chaser.world_x + chaser.width / 2, chaser.world_y + chaser.height / 2, chaser.is_chasing)
+                 for chaser in self.chasers])
+        
+        for i, chaser in enumerate(self.chasers):
+            self.update_chaser(chaser, delta_time, steering[i] if i < len(steering) else None)
+        
+        chasing = any(chaser.is_chasing for chaser in self.chasers)
+        if chasing and not self.chase_started:
+            self.burst_chase_effect()
+        self.chase_started = chasing
+    
+    def update_chaser(self, chaser, delta_time, steering=None):
+        """Обновление одного преследователя (steering - направление от AI-воркера)"""
+        if chaser.is_chasing:
             # Если Аселя в погоне, двигаем её к игроку
-            dx = self.character.world_x - self.asselya.world_x
-            dy = self.character.world_y - self.asselya.world_y
-            distance = (dx * dx + dy * dy) ** 0.5
+            if steering is not None and steering != (0.0, 0.0):
+                dx, dy = steering
+                distance = 1
+            else:
+                dx = self.character.world_x - chaser.world_x
+                dy = self.character.world_y - chaser.world_y
+                distance = (dx * dx + dy * dy) ** 0.5
             
             if distance > 0:
                 # Нормализуем вектор движения
@@ -462,210 +779,431 @@ class Game:
                 dy /= distance
                 
                 # Обновляем направление спрайта
-                self.asselya.facing_left = dx < 0
+                chaser.facing_left = dx < 0
                 
                 # Двигаем Аселю (скорость 1.5x от скорости игрока)
-                self.asselya.world_x += dx * self.character.speed * 1.5
-                self.asselya.world_y += dy * self.character.speed * 1.5
+                chaser.world_x += dx * self.character.speed * 1.5
+                chaser.world_y += dy * self.character.speed * 1.5
         else:
-            # Если Аселя не в погоне, она стоит на месте
-            self.asselya.world_x = 3200
-            self.asselya.world_y = 1600
+            # Если Аселя не в погоне, она стоит на базе
+            chaser.world_x = chaser.base_x
+            chaser.world_y = chaser.base_y
             
             # Поворачиваем Аселю к игроку даже когда она стоит
-            dx = self.character.world_x - self.asselya.world_x
-            self.asselya.facing_left = dx < 0
+            dx = self.character.world_x - chaser.world_x
+            chaser.facing_left = dx < 0
         
-        # Всегда обновляем анимацию
-        self.asselya.update_animation(self.clock.get_time())
+        # Анимация: в погоне всегда на полной частоте, иначе по LOD
+        if chaser.is_chasing:
+            chaser.update_animation(delta_time)
+        else:
+            due = self.lod.due(chaser, delta_time)
+            if due:
+                chaser.update_animation(due[1])
 
-    def run(self):
-        """Main game loop"""
+    def handle_events(self, events, keys_pressed):
+        """Process input events; returns False when the game should quit"""
         running = True
-        
-        while running:
-            # Get delta time
-            delta_time = self.clock.tick(FPS)
-            
-            # Process events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
                     running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    elif event.key == pygame.K_r and self.game_over:
-                        self.restart_game()
+                elif event.key == pygame.K_r and self.game_over:
+                    self.restart_game()
+                elif event.key == pygame.K_F6 and not self.game_over:
+                    self.save_game()
+                elif event.key == pygame.K_F9:
+                    self.load_game()
+                elif event.key == pygame.K_f:
+                    self.flashlight.enabled = not self.flashlight.enabled
+                elif event.key == pygame.K_m:
+                    self.minimap.toggle()
+                elif event.key == pygame.K_F8:
+                    self.deep_profiler.start()
+                elif event.key == pygame.K_F10:
+                    self.profiler.toggle()
+                elif event.key == pygame.K_F11 and self.profiler.enabled:
+                    self.profiler.export_csv()
+                elif event.key == pygame.K_F12:
+                    # Dump recent log records for bug reports
+                    count = dump_ring(DUMP_PATH)
+                    log.info("Dumped %d log records to %s", count, DUMP_PATH)
+                
+                # Test keys for startup metrics (only during gameplay)
+                if not self.game_over and not self.show_start_window:
+                    # Users control (1-5 keys)
+                    if event.key == pygame.K_1:
+                        if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
+                            self.remove_users(10)
+                        else:
+                            self.add_users(10)
+                    elif event.key == pygame.K_2:
+                        if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
+                            self.remove_users(100)
+                        else:
+                            self.add_users(100)
+                    elif event.key == pygame.K_3:
+                        if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
+                            self.remove_users(1000)
+                        else:
+                            self.add_users(1000)
+                    
+                    # Money control (6-9 keys)
+                    elif event.key == pygame.K_6:
+                        if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
+                            self.remove_money(100)
+                        else:
+                            self.add_money(100)
+                    elif event.key == pygame.K_7:
+                        if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
+                            self.remove_money(1000)
+                        else:
+                            self.add_money(1000)
+                    elif event.key == pygame.K_8:
+                        if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
+                            self.remove_money(10000)
+                        else:
+                            self.add_money(10000)
                     
-                    # Get pressed modifier keys
-                    keys_pressed = pygame.key.get_pressed()
+                    # Task management keys (F1-F5)
+                    elif event.key == pygame.K_F1:
+                        self.task_manager.activate_task("1")
+                    elif event.key == pygame.K_F2:
+                        self.task_manager.activate_task("2")
+                    elif event.key == pygame.K_F3:
+                        self.task_manager.activate_task("3")
+                    elif event.key == pygame.K_F4:
+                        self.task_manager.activate_task("4")
+                    elif event.key == pygame.K_F5:
+                        self.task_manager.activate_task("5")
                     
-                    # Test keys for startup metrics (only during gameplay)
-                    if not self.game_over and not self.show_start_window:
-                        # Users control (1-5 keys)
-                        if event.key == pygame.K_1:
-                            if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
-                                self.remove_users(10)
-                            else:
-                                self.add_users(10)
-                        elif event.key == pygame.K_2:
-                            if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
-                                self.remove_users(100)
-                            else:
-                                self.add_users(100)
-                        elif event.key == pygame.K_3:
-                            if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
-                                self.remove_users(1000)
-                            else:
-                                self.add_users(1000)
-                        
-                        # Money control (6-9 keys)
-                        elif event.key == pygame.K_6:
-                            if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
-                                self.remove_money(100)
-                            else:
-                                self.add_money(100)
-                        elif event.key == pygame.K_7:
-                            if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
-                                self.remove_money(1000)
-                            else:
-                                self.add_money(1000)
-                        elif event.key == pygame.K_8:
-                            if keys_pressed[pygame.K_LSHIFT] or keys_pressed[pygame.K_RSHIFT]:
-                                self.remove_money(10000)
-                            else:
-                                self.add_money(10000)
-                        
-                        # Task management keys (F1-F5)
-                        elif event.key == pygame.K_F1:
-                            self.task_manager.activate_task("1")
-                        elif event.key == pygame.K_F2:
-                            self.task_manager.activate_task("2")
-                        elif event.key == pygame.K_F3:
-                            self.task_manager.activate_task("3")
-                        elif event.key == pygame.K_F4:
-                            self.task_manager.activate_task("4")
-                        elif event.key == pygame.K_F5:
-                            self.task_manager.activate_task("5")
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left click
-                        if self.check_button_click(event.pos):
-                            self.teleport_to_lection()
+                    # Camera zoom (-/= to zoom out/in, 0 to reset)
+                    elif event.key in (pygame.K_MINUS, pygame.K_EQUALS, pygame.K_0):
+                        zoom = 1.0 if event.key == pygame.K_0 else \
+                            self.camera.zoom * (0.8 if event.key == pygame.K_MINUS else 1.25)
+                        self.camera.set_zoom(zoom)
+                        self.camera.update(self.character.world_x, self.character.world_y)
+                    
+                    # Dialogue (Space continues, like a click)
+                    elif event.key == pygame.K_SPACE and self.dialogue.active:
+                        self.dialogue.advance()
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Left click
+                    if self.check_button_click(event.pos):
+                        self.teleport_pending = True
+                        running = False
+                    elif not self.game_over and not self.show_start_window:
+                        # Continue an open dialogue
+                        if self.dialogue.active:
+                            self.dialogue.advance()
                         # Check click on clickable character
-                        elif not self.game_over and not self.show_start_window:
-                            if self.clickable_character.check_click(event.pos, self.camera):
-                                self.clickable_character.on_click()
+                        elif self.clickable_character.check_click(event.pos, self.camera):
+                            self.clickable_character.on_click()
+                        # Start talking to an NPC
+                        else:
+                            talker = self.dialogue.npc_at(*self.camera.screen_to_world(*event.pos))
+                            if talker:
+                                self.dialogue.start(*talker)
+        
+        return running
+    
+    def update(self, delta_time, keys_pressed):
+        """Advance the simulation by one tick"""
+        # Update game objects only if game is not over and start window is not shown
+        if not self.game_over and not self.show_start_window:
+            # Update character
+            self.character.update(keys_pressed)
+            self.profiler.mark("character")
             
-            # Get pressed keys for continuous input
-            keys_pressed = pygame.key.get_pressed()
+            # Entity update rates for this tick (camera is from the previous tick)
+            self.lod.begin(self.camera)
             
-            # Update game objects only if game is not over and start window is not shown
-            if not self.game_over and not self.show_start_window:
-                # Update character
-                self.character.update(keys_pressed)
-                
-                # Update Aselya
-                self.update_asselya()
-                
-                # Update task manager
-                self.task_manager.update(delta_time)
-                
-                # Update NPCs
-                self.npc.update()
-                self.bakhredin.update()
-                
-                # Update clickable character
-                self.clickable_character.update()
-                
-                # Update camera
-                self.camera.update(self.character.world_x, self.character.world_y)
-                
-                # Check if Aselya caught the player
-                if self.check_collision():
-                    self.game_over = True
-                    print("Game Over! Аселя поймала вас!")
-                
-                # Check task interactions
-                task_interaction = self.task_manager.check_task_interactions(
-                    self.character.world_x, self.character.world_y,
-                    self.character.width, self.character.height
-                )
-                
-                # Handle task completion (press E to complete)
-                if task_interaction and keys_pressed[pygame.K_e]:
-                    rewards = self.task_manager.complete_task(task_interaction)
-                    if rewards:
-                        # Apply rewards to player
-                        self.add_users(rewards["users"])
-                        self.add_money(rewards["money"])
+            # Update Aselya
+            self.update_asselya(delta_time)
+            self.flicker_timer += delta_time
+            self.profiler.mark("asselya")
+            
+            # Update task manager
+            self.task_manager.update(delta_time)
+            self.profiler.mark("tasks")
+            
+            # Autosave (only collects a snapshot, writing happens off-thread)
+            self.autosave_timer += delta_time
+            if self.autosave_enabled and self.autosave_timer >= AUTOSAVE_INTERVAL:
+                self.save_game()
             
-            # Draw everything
-            self.screen.fill(BLACK)  # Clear screen
+            # Update NPCs (off-screen ones less often, catching up later)
+            for npc in self.npcs:
+                due = self.lod.due(npc, delta_time)
+                if due:
+                    npc.update(due[0])
             
-            # Draw background with camera offset
-            bg_x, bg_y = self.camera.apply(0, 0)
-            self.screen.blit(self.background, (bg_x, bg_y))
+            # Update clickable character
+            due = self.lod.due(self.clickable_character, delta_time)
+            if due:
+                self.clickable_character.update(due[0])
             
-            # Debug: Print Aselya's state
-            # print(f"Aselya state: active={self.asselya.is_active}, chasing={self.asselya.is_chasing}, pos=({self.asselya.world_x}, {self.asselya.world_y})")
+            # Typewriter reveal of the open dialogue
+            self.dialogue.update(delta_time, self.character)
             
-            # Draw in correct order:
-            # 1. Tasks (including social media)
-            self.task_manager.draw_tasks(self.screen, self.camera)
+            # Particles
+            self.dust.emitting = self.character.is_running
+            self.particles.update(delta_time)
             
-            # 2. NPCs
-            self.npc.draw(self.screen, self.camera)
-            self.bakhredin.draw(self.screen, self.camera)
+            # Update camera
+            self.camera.update(self.character.world_x, self.character.world_y)
             
-            # 2.5. Clickable Character
-            self.clickable_character.draw(self.screen, self.camera)
+            # Check if Aselya caught the player
+            if self.check_collision():
+                self.game_over = True
+                log.info("Game Over! Аселя поймала вас!")
+            self.profiler.mark("update")
             
-            # 3. Aselya (make sure she's visible)
-            if self.asselya.is_active:
-                self.asselya.draw(self.screen, self.camera)
+            # Check task interactions
+            task_interaction = self.task_manager.check_task_interactions(
+                self.character.world_x, self.character.world_y,
+                self.character.width, self.character.height
+            )
+            
+            # Handle task completion (press E to complete)
+            if task_interaction and keys_pressed[pygame.K_e]:
+                rewards = self.task_manager.complete_task(task_interaction)
+                if rewards:
+                    task = self.task_manager.tasks[task_interaction]
+                    self.sparks.burst(40, task.world_x + task.width // 2, task.world_y + task.height // 2)
+                    
+                    # Apply rewards to player
+                    self.add_users(rewards["users"])
+                    self.add_money(rewards["money"])
+            self.profiler.mark("tasks")
+    
+    def prepare_draw(self):
+        """State changes that go with drawing a frame, done on the main thread before draw()
+        
+        With the pipeline, draw() runs on the render thread and only reads;
+        this runs while the render thread is idle.
+        """
+        # Evict over the memory budget; assets touched from here on are in use
+        memory_tracker.next_frame()
+        
+        # Reload evicted sprites of the tasks on screen
+        self.task_manager.prepare_visible(self.camera, *self.screen.get_size())
+        
+        # What the player light touches stays dimly visible afterwards
+        if not self.game_over:
+            center_x = self.character.world_x + self.character.width // 2
+            center_y = self.character.world_y + self.character.height // 2
+            self.fog.reveal(center_x, center_y, LIGHT_RADIUS,
+                            self.visibility.polygon_at(center_x, center_y, LIGHT_RADIUS))
+    
+    def draw(self):
+        """Draw the current frame to the screen (without flipping); call prepare_draw() first"""
+        # Draw everything
+        self.render_backend.begin_frame()  # Clear screen
+        
+        # Draw background with camera offset
+        self.render_backend.draw_background(self.background_mips, self.camera)
+        self.profiler.mark("background")
+        
+        # Debug: Print Aselya's state
+        # print(f"Aselya state: active={self.asselya.is_active}, chasing={self.asselya.is_chasing}, pos=({self.asselya.world_x}, {self.asselya.world_y})")
+        
+        # Draw in correct order:
+        # 1. Tasks (including social media)
+        self.task_manager.draw_tasks(self.screen, self.camera)
+        
+        # 2. NPCs
+        for npc in self.npcs:
+            npc.draw(self.screen, self.camera)
+        
+        # 2.5. Clickable Character
+        self.clickable_character.draw(self.screen, self.camera)
+        
+        # 3. Aselya and other chasers (make sure she's visible)
+        for chaser in self.chasers:
+            if chaser.is_active:
+                chaser.draw(self.screen, self.camera)
                 # Debug: Draw a red rectangle around Aselya's position
                 # screen_x, screen_y = self.camera.apply(self.asselya.world_x, self.asselya.world_y)
                 # pygame.draw.rect(self.screen, (255, 0, 0), 
                 #                (screen_x, screen_y, self.asselya.width, self.asselya.height), 2)
+        
+        # 4. Character (on top)
+        self.character.draw(self.screen, self.camera)
+        self.profiler.mark("entities")
+        
+        # 5. World-space particles (dust, sparks)
+        self.particles.draw_world(self.screen, self.camera)
+        self.profiler.mark("particles")
+        
+        # Draw darkness overlay; screen-space particles stay visible over it
+        if not self.game_over:
+            self.apply_horror_lighting()
+            self.particles.draw_screen(self.screen)
+        self.profiler.mark("lighting")
+        
+        # Draw UI elements
+        self.hud_frame += 1
+        if not self.game_over and not self.show_start_window:
+            # Draw existing UI elements
+            self.draw_startup_metrics()
+            self.task_manager.draw_tasks_ui(self.screen)
             
-            # 4. Character (on top)
-            self.character.draw(self.screen, self.camera)
-            
-            # Draw darkness overlay
-            if not self.game_over:
-                self.apply_horror_lighting()
+            # Draw social media timer
+            self.draw_social_timer()
             
-            # Draw UI elements
-            if not self.game_over and not self.show_start_window:
-                # Draw existing UI elements
-                self.draw_startup_metrics()
-                self.task_manager.draw_tasks_ui(self.screen)
-                
-                # Draw social media timer
-                self.draw_social_timer()
-                
-                # Debug: Draw task and timer info
-                font = pygame.font.Font(None, 24)
-                debug_info = [
-                    f"Social tasks active: {self.task_manager.social_tasks_active}",
-                    f"Warning active: {self.task_manager.social_warning_active}",
-                    f"Timer: {self.task_manager.social_timer/1000:.1f}s",
-                    f"Warning timer: {self.task_manager.social_warning_timer/1000:.1f}s"
-                ]
-                for i, text in enumerate(debug_info):
-                    surface = font.render(text, True, (255, 255, 255))
-                    self.screen.blit(surface, (10, 300 + i*20))
-            
-            # Draw game over screen if needed
-            if self.game_over:
-                self.draw_game_over_screen()
+            # Debug: Draw task and timer info
+            debug_info = [
+                f"Social tasks active: {self.task_manager.social_tasks_active}",
+                f"Warning active: {self.task_manager.social_warning_active}",
+                f"Timer: {self.task_manager.social_timer/1000:.1f}s",
+                f"Warning timer: {self.task_manager.social_warning_timer/1000:.1f}s"
+            ]
+            for i, text in enumerate(debug_info):
+                surface = self.hud_text(f"debug{i}", 24, text)
+                self.screen.blit(surface, (10, 300 + i*20))
             
-            # Draw start window if needed
-            if self.show_start_window:
-                self.screen.blit(self.startgame_window, (0, 0))
+            # Open NPC dialogue
+            self.dialogue.draw(self.screen)
+        
+        # Draw game over screen if needed
+        if self.game_over:
+            self.draw_game_over_screen()
+        
+        # Draw start window if needed
+        if self.show_start_window:
+            self.screen.blit(self.startgame_window, (0, 0))
+        self.profiler.mark("hud")
+        
+        # Minimap (M toggles)
+        if self.minimap.visible and not self.game_over and not self.show_start_window:
+            self.minimap.draw(self.screen, self.camera, self.minimap_entities)
+        else:
+            self.minimap.last_ms = 0.0
+        self.profiler.mark("minimap")
+        
+        # Frame profiler overlay
+        self.profiler.draw(self.screen)
+        self.profiler.mark("overlay")
+    
+    def frame_snapshot(self):
+        """Copy of the state draw() reads and the next tick changes; sprites and caches are shared"""
+        snapshot = copy.copy(self)
+        snapshot.camera = copy.copy(self.camera)
+        snapshot.character = copy.copy(self.character)
+        snapshot.chasers = [copy.copy(chaser) for chaser in self.chasers]
+        snapshot.asselya = snapshot.chasers[0]  # Asselya is always the first chaser
+        snapshot.npcs = [copy.copy(npc) for npc in self.npcs]
+        snapshot.clickable_character = copy.copy(self.clickable_character)
+        snapshot.particles = self.particles.frozen()
+        
+        # Task objects are shared: their status is one attribute, the lists are what changes
+        task_manager = snapshot.task_manager = copy.copy(self.task_manager)
+        task_manager.tasks = dict(self.task_manager.tasks)
+        task_manager.active_tasks = list(self.task_manager.active_tasks)
+        task_manager.completed_tasks = list(self.task_manager.completed_tasks)
+        
+        # The typewriter keeps appending rendered runs to its rows
+        dialogue = snapshot.dialogue = copy.copy(self.dialogue)
+        if dialogue.typewriter:
+            dialogue.typewriter = copy.copy(self.dialogue.typewriter)
+            dialogue.typewriter.runs = [list(runs) for runs in self.dialogue.typewriter.runs]
+        return snapshot
+    
+    def render_snapshot(self, snapshot):
+        """Composite a frame_snapshot() (on the pipeline's render thread; the main thread presents it)"""
+        self.profiler.begin_frame()
+        snapshot.draw()
+        self.hud_frame = snapshot.hud_frame
+        self.profiler.end_frame()
+    
+    def stop_pipeline(self):
+        """Finish drawing on the render thread; from here on the main thread draws"""
+        if self.pipeline:
+            self.pipeline.stop()
+            self.pipeline = None
+    
+    def shutdown(self, close_input=True):
+        """Flush background work before the game exits (or hands over to the lection hall)"""
+        # Let the render thread finish its frame
+        self.stop_pipeline()
+        
+        # Finish a capture that is still running
+        self.deep_profiler.stop()
+        
+        # Wait for the last snapshot to hit the disk
+        self.save_manager.close()
+        
+        if self.ai_worker:
+            self.ai_worker.close()
+            self.ai_worker = None
+        if close_input:
+            self.input.close()
+    
+    async def hot_reload_loop(self):
+        """Swap in edited data files between frames (dev builds only)"""
+        while True:
+            self.hot_reloader.update()
+            await self.driver.sleep(self.hot_reloader.watcher.interval)
+    
+    def frame(self, delta_time):
+        """One tick of the main loop, called by the frame driver; returns False to stop"""
+        # A render thread that failed hands drawing back to this loop
+        if self.pipeline and self.pipeline.error:
+            self.pipeline = None
+        
+        # Quality tier from the previous frame's work time (without the idle time);
+        # with the pipeline a frame takes as long as the slower of its two stages
+        frame_ms = self.driver.work_ms
+        if self.pipeline:
+            frame_ms = max(frame_ms, self.pipeline.render_ms)
+        tier = self.quality.tick(frame_ms)
+        if tier:
+            self.apply_quality(tier)
+        
+        # Read input for this tick (recorded/replayed when enabled)
+        events, keys_pressed, delta_time = self.input.next_tick(delta_time)
+        
+        # With the pipeline, the profiled frame is the render thread's
+        if not self.pipeline:
+            self.profiler.begin_frame()
+        
+        running = self.handle_events(events, keys_pressed)
+        self.profiler.mark("events")
+        self.update(delta_time, keys_pressed)
+        
+        if self.pipeline:
+            # Flips the previous frame; this one is drawn on the render
+            # thread while the next tick is simulated
+            self.pipeline.wait()
+            self.prepare_draw()
+            self.pipeline.publish(self.frame_snapshot())
+        else:
+            self.prepare_draw()
+            self.draw()
             
             # Update display
-            pygame.display.flip()
+            self.render_backend.present()
+            self.profiler.mark("flip")
+            self.profiler.end_frame()
+        self.deep_profiler.tick()
+        return running
+    
+    def run(self):
+        """Main game loop"""
+        if self.hot_reloader:
+            self.driver.spawn(self.hot_reload_loop(), "hot-reload")
+        self.driver.run(self.frame)
+        
+        # The lection hall runs a frame driver of its own and exits the process
+        # when it ends, so this scene's background work is finished first
+        if self.teleport_pending:
+            self.shutdown(close_input=False)
+            self.teleport_to_lection()
+        else:
+            self.shutdown()
         
         # Quit game
         pygame.quit()
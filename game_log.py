@@ -0,0 +1,203 @@
+# Lightweight logging for the game loop
+#
+# Replaces bare print() calls. Every module gets its own logger with its own
+# level, repeated messages are deduplicated and rate limited, and the last
+# RING_SIZE records are kept in memory so they can be dumped on demand.
+#
+# Levels can be configured with the ESCAPEN_LOG environment variable, e.g.
+#   ESCAPEN_LOG=warning                       -> everything at WARNING and above
+#   ESCAPEN_LOG=info,task_manager=debug       -> default INFO, task_manager DEBUG
+#
+# Messages use %-style arguments so a disabled call costs one integer compare
+# and never formats its arguments.
+
+import os
+import sys
+import time
+from collections import deque
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+OFF = 100
+
+LEVEL_NAMES = {
+    "debug": DEBUG,
+    "info": INFO,
+    "warning": WARNING,
+    "error": ERROR,
+    "off": OFF,
+}
+
+DEFAULT_LEVEL = INFO
+RING_SIZE = 512             # Records kept in memory for dump_ring()
+DEDUP_INTERVAL = 1.0        # Seconds an identical message stays suppressed
+MAX_PER_SECOND = 20         # Records per logger per second before throttling
+DUMP_PATH = "logs/ring.log" # Where the F12 hotkey dumps the ring buffer
+
+_ring = deque(maxlen=RING_SIZE)
+_loggers = {}
+_module_levels = {}
+_default_level = DEFAULT_LEVEL
+_output = sys.stderr
+
+
+def _parse_level(value):
+    """Convert a level name or number to an int level"""
+    value = value.strip().lower()
+    if value.isdigit():
+        return int(value)
+    return LEVEL_NAMES.get(value, DEFAULT_LEVEL)
+
+
+def configure(spec):
+    """Configure levels from a spec like 'info,task_manager=debug'"""
+    global _default_level
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "=" in part:
+            name, value = part.split("=", 1)
+            set_level(name.strip(), _parse_level(value))
+        else:
+            _default_level = _parse_level(part)
+            for logger in _loggers.values():
+                if logger.name not in _module_levels:
+                    logger.set_level(_default_level)
+
+
+def set_level(name, level):
+    """Set the level for one module's logger"""
+    _module_levels[name] = level
+    if name in _loggers:
+        _loggers[name].set_level(level)
+
+
+def get_logger(name):
+    """Get (or create) the logger for a module"""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = Logger(name, _module_levels.get(name, _default_level))
+        _loggers[name] = logger
+    return logger
+
+
+def get_ring():
+    """Return a copy of the in-memory records as formatted lines"""
+    return list(_ring)
+
+
+def dump_ring(path=None):
+    """Write the in-memory records to a file (or stderr if no path is given)"""
+    lines = get_ring()
+    if path is None:
+        for line in lines:
+            _output.write(line + "\n")
+        _output.flush()
+        return len(lines)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        for line in lines:
+            file.write(line + "\n")
+    return len(lines)
+
+
+def _format(key):
+    """Text of a dedup key: (template, args), or the formatted text itself"""
+    if isinstance(key, str):
+        return key
+    msg, args = key
+    return msg % args if args else msg
+
+
+class Logger:
+    """Per-module logger with level gating, deduplication and rate limiting"""
+
+    def __init__(self, name, level):
+        self.name = name
+        self.set_level(level)
+
+        # Deduplication: (template, args) -> [last emitted time, suppressed count]
+        self._recent = {}
+
+        # Rate limiting window
+        self._window_start = 0.0
+        self._window_count = 0
+        self._throttled = 0
+
+    def set_level(self, level):
+        self.level = level
+
+    def debug(self, msg, *args):
+        if DEBUG >= self.level:
+            self._log(DEBUG, msg, args)
+
+    def info(self, msg, *args):
+        if INFO >= self.level:
+            self._log(INFO, msg, args)
+
+    def warning(self, msg, *args):
+        if WARNING >= self.level:
+            self._log(WARNING, msg, args)
+
+    def error(self, msg, *args):
+        if ERROR >= self.level:
+            self._log(ERROR, msg, args)
+
+    def _log(self, level, msg, args):
+        now = time.monotonic()
+
+        # Drop repeats of the same message within DEDUP_INTERVAL. The key is
+        # the template and its arguments, so messages that only share a
+        # template are not lost; nothing is formatted for a dropped repeat.
+        key = (msg, args)
+        try:
+            recent = self._recent.get(key)
+        except TypeError:  # Unhashable arguments
+            key = msg % args
+            recent = self._recent.get(key)
+        if recent is not None and now - recent[0] < DEDUP_INTERVAL:
+            recent[1] += 1
+            return
+
+        # Throttle loggers that emit too many distinct messages
+        if now - self._window_start >= 1.0:
+            if self._throttled:
+                self._emit(WARNING, "%d messages throttled" % self._throttled, now)
+            # Forget expired messages; suppressed repeats get their summary first
+            recent_messages = {}
+            for seen, value in self._recent.items():
+                if now - value[0] < DEDUP_INTERVAL:
+                    recent_messages[seen] = value
+                elif value[1]:
+                    self._emit(value[2], "%s (repeated %d times)" % (_format(seen), value[1]), now)
+            self._recent = recent_messages
+            recent = recent_messages.get(key)
+            self._window_start = now
+            self._window_count = 0
+            self._throttled = 0
+        self._window_count += 1
+        if self._window_count > MAX_PER_SECOND:
+            self._throttled += 1
+            return
+
+        text = msg % args if args else msg
+        if recent is not None and recent[1]:
+            text += " (repeated %d times)" % recent[1]
+        self._recent[key] = [now, 0, level]  # Last emitted, repeats dropped since, level
+        self._emit(level, text, now)
+
+    def _emit(self, level, text, now):
+        level_name = "DEBUG" if level <= DEBUG else "INFO" if level <= INFO else \
+            "WARNING" if level <= WARNING else "ERROR"
+        line = "%10.3f %-7s %s: %s" % (now, level_name, self.name, text)
+        _ring.append(line)
+        _output.write(line + "\n")
+
+
+configure(os.environ.get("ESCAPEN_LOG", ""))
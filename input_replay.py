@@ -0,0 +1,197 @@
+# Deterministic input recording and replay
+#
+# Game loops read their input through an input source instead of calling
+# pygame.event.get() / pygame.key.get_pressed() directly. Each tick the
+# source returns (events, keys, delta_time):
+# - LiveInput:     reads pygame as before
+# - InputRecorder: reads pygame and appends the tick to a binary log
+# - InputReplayer: feeds a recorded log back through the same code path
+#
+# Per tick the log stores the delta time, a bitmask of the held keys the game
+# polls, the gameplay events (quit, key down, mouse click) and a random seed
+# that `random` is re-seeded with, so a session replays exactly.
+#
+# Select with ESCAPEN_RECORD=<path> or ESCAPEN_REPLAY=<path>. Sources that
+# record or replay are `deterministic`: the game then pins its quality tier,
+# which would otherwise change the simulation with the machine's speed.
+
+import os
+import random
+import struct
+
+import pygame
+
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+MAGIC = b"ESCR"
+LOG_VERSION = 1
+
+# Held keys that update() code polls; their order defines the bitmask
+WATCHED_KEYS = (
+    pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN,
+    pygame.K_a, pygame.K_d, pygame.K_w, pygame.K_s,
+    pygame.K_LSHIFT, pygame.K_RSHIFT, pygame.K_e,
+)
+
+_HEADER = struct.Struct("<4sHIH")    # magic, version, session seed, key count
+_TICK = struct.Struct("<HIIB")       # delta ms, key mask, tick seed, event count
+_EVENT_QUIT = 0
+_EVENT_KEYDOWN = 1
+_EVENT_MOUSEDOWN = 2
+_KEYDOWN = struct.Struct("<I")       # key
+_MOUSEDOWN = struct.Struct("<Bhh")   # button, x, y
+
+
+class ReplayKeys:
+    """Stand-in for pygame.key.get_pressed() built from a key bitmask"""
+
+    __slots__ = ("pressed",)
+
+    def __init__(self, pressed=()):
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+    @classmethod
+    def from_mask(cls, mask, keys=WATCHED_KEYS):
+        return cls(key for bit, key in enumerate(keys) if mask & (1 << bit))
+
+
+def keys_to_mask(keys_pressed, keys=WATCHED_KEYS):
+    """Pack the watched keys of a get_pressed() result into an int"""
+    mask = 0
+    for bit, key in enumerate(keys):
+        if keys_pressed[key]:
+            mask |= 1 << bit
+    return mask
+
+
+class LiveInput:
+    """Reads input straight from pygame"""
+
+    deterministic = False
+
+    def next_tick(self, delta_time):
+        """Return (events, keys, delta_time) for this tick"""
+        events = pygame.event.get()
+        return events, pygame.key.get_pressed(), delta_time
+
+    def close(self):
+        pass
+
+
+class InputRecorder(LiveInput):
+    """Reads input from pygame and records it to a binary log"""
+
+    deterministic = True
+
+    def __init__(self, path, seed=None):
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(32)
+        self.rng = random.Random(self.seed)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, LOG_VERSION, self.seed, len(WATCHED_KEYS)))
+        self.ticks = 0
+        log.info("Recording input to %s (seed %d)", path, self.seed)
+
+    def next_tick(self, delta_time):
+        events, keys, delta_time = super().next_tick(delta_time)
+        # The log stores 16 bits; the game gets the clamped value too, so a
+        # long stall plays back exactly as it ran
+        delta_time = min(delta_time, 0xFFFF)
+
+        payload = []
+        for event in events:
+            if event.type == pygame.QUIT:
+                payload.append(bytes((_EVENT_QUIT,)))
+            elif event.type == pygame.KEYDOWN:
+                payload.append(bytes((_EVENT_KEYDOWN,)) + _KEYDOWN.pack(event.key))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                x, y = event.pos
+                payload.append(bytes((_EVENT_MOUSEDOWN,)) + _MOUSEDOWN.pack(event.button, x, y))
+
+        tick_seed = self.rng.getrandbits(32)
+        random.seed(tick_seed)
+        self.file.write(_TICK.pack(delta_time, keys_to_mask(keys), tick_seed, len(payload)))
+        self.file.write(b"".join(payload))
+        self.ticks += 1
+        return events, keys, delta_time
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            log.info("Recorded %d ticks", self.ticks)
+
+
+class InputReplayer:
+    """Feeds a recorded log back as if it were live input.
+
+    The recorded delta time replaces the measured one. When the log runs
+    out a QUIT event is returned so the game loop ends normally.
+    """
+
+    deterministic = True
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = file.read()
+        magic, version, self.seed, key_count = _HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path} is not an input log (version {LOG_VERSION})")
+        if key_count != len(WATCHED_KEYS):
+            raise ValueError(f"{path} was recorded with {key_count} watched keys, expected {len(WATCHED_KEYS)}")
+        self.offset = _HEADER.size
+        self.ticks = 0
+        self.finished = False
+        log.info("Replaying input from %s (seed %d)", path, self.seed)
+
+    def next_tick(self, delta_time):
+        # Keep the window responsive and let a real close request through
+        interrupted = any(event.type == pygame.QUIT for event in pygame.event.get())
+
+        if interrupted or self.offset + _TICK.size > len(self.data):
+            self.finished = True
+            return [pygame.event.Event(pygame.QUIT)], ReplayKeys(), delta_time
+
+        delta_time, mask, tick_seed, event_count = _TICK.unpack_from(self.data, self.offset)
+        self.offset += _TICK.size
+
+        events = []
+        for _ in range(event_count):
+            kind = self.data[self.offset]
+            self.offset += 1
+            if kind == _EVENT_QUIT:
+                events.append(pygame.event.Event(pygame.QUIT))
+            elif kind == _EVENT_KEYDOWN:
+                (key,) = _KEYDOWN.unpack_from(self.data, self.offset)
+                self.offset += _KEYDOWN.size
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=key))
+            elif kind == _EVENT_MOUSEDOWN:
+                button, x, y = _MOUSEDOWN.unpack_from(self.data, self.offset)
+                self.offset += _MOUSEDOWN.size
+                events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=button, pos=(x, y)))
+            else:
+                raise ValueError(f"Corrupt input log: unknown event {kind} at tick {self.ticks}")
+
+        random.seed(tick_seed)
+        self.ticks += 1
+        return events, ReplayKeys.from_mask(mask), delta_time
+
+    def close(self):
+        pass
+
+
+def create_input_source():
+    """Pick the input source from ESCAPEN_RECORD / ESCAPEN_REPLAY"""
+    replay_path = os.environ.get("ESCAPEN_REPLAY")
+    if replay_path:
+        return InputReplayer(replay_path)
+    record_path = os.environ.get("ESCAPEN_RECORD")
+    if record_path:
+        return InputRecorder(record_path)
+    return LiveInput()
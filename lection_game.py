@@ -1,9 +1,21 @@
 import pygame
 import sys
 import os
-from constants import WIDTH, HEIGHT, BG_WIDTH, BG_HEIGHT, FPS, WHITE, LIGHT_RADIUS, DARKNESS_ALPHA, ANIMATION_SPEED
+from constants import WIDTH, HEIGHT, BG_WIDTH, BG_HEIGHT, FPS, WHITE, LIGHT_RADIUS, ANIMATION_SPEED
 from camera import Camera
+from lighting import LightingEngine, Light
 from npc import NPC
+from input_replay import create_input_source
+from deep_profiler import DeepProfiler
+from frame_profiler import FrameProfiler
+from frame_driver import FrameDriver
+import memory_tracker
+from memory_tracker import track
+import asset_pipeline
+from asset_pipeline import optimize, solid_panel
+from game_log import get_logger
+
+log = get_logger(__name__)
 
 class LectionCharacter:
     def __init__(self, x, y):
@@ -118,13 +130,9 @@ class LectionCharacter:
         
         for px, py in check_points:
             if 0 <= px < mask_width and 0 <= py < mask_height:
-                # Check if pixel is not transparent (obstacle)
-                try:
-                    pixel = collision_mask.get_at((px, py))
-                    if pixel[3] > 128:  # Alpha > 128 means solid obstacle
-                        return True
-                except IndexError:
-                    continue
+                # Set bits are solid obstacles (alpha > 128 in lection_objects.png)
+                if collision_mask.get_at((px, py)):
+                    return True
         
         return False
         
@@ -141,9 +149,9 @@ class LectionCharacter:
                 scale_factor = 2.0  # Increased scaling for better visibility
                 new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
                 sprite = pygame.transform.scale(sprite, new_size)
-                self.standing_sprites.append(sprite)
+                self.standing_sprites.append(track(sprite, "LectionCharacter", sprite_file))
             except pygame.error as e:
-                print(f"Could not load sprite {sprite_path}: {e}")
+                log.error("Could not load sprite %s: %s", sprite_path, e)
     
     def load_walking_sprites(self):
         """Load walking animation sprites"""
@@ -158,9 +166,9 @@ class LectionCharacter:
                 scale_factor = 2.0  # Increased scaling for better visibility
                 new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
                 sprite = pygame.transform.scale(sprite, new_size)
-                self.walking_sprites.append(sprite)
+                self.walking_sprites.append(track(sprite, "LectionCharacter", sprite_file))
             except pygame.error as e:
-                print(f"Could not load sprite {sprite_path}: {e}")
+                log.error("Could not load sprite %s: %s", sprite_path, e)
     
     def load_running_sprites(self):
         """Load running animation sprites"""
@@ -175,9 +183,9 @@ class LectionCharacter:
                 scale_factor = 2.0  # Increased scaling for better visibility
                 new_size = (int(original_size[0] * scale_factor), int(original_size[1] * scale_factor))
                 sprite = pygame.transform.scale(sprite, new_size)
-                self.running_sprites.append(sprite)
+                self.running_sprites.append(track(sprite, "LectionCharacter", sprite_file))
             except pygame.error as e:
-                print(f"Could not load sprite {sprite_path}: {e}")
+                log.error("Could not load sprite %s: %s", sprite_path, e)
     
     def update(self, keys, collision_mask, map_width, map_height):
         """Update character position and animation with collision detection"""
@@ -266,13 +274,9 @@ class LectionCharacter:
         
         for px, py in check_points:
             if 0 <= px < mask_width and 0 <= py < mask_height:
-                # Check if pixel is not transparent (obstacle)
-                try:
-                    pixel = collision_mask.get_at((px, py))
-                    if pixel[3] > 128:  # Alpha > 128 means solid obstacle
-                        return True
-                except IndexError:
-                    continue
+                # Set bits are solid obstacles (alpha > 128 in lection_objects.png)
+                if collision_mask.get_at((px, py)):
+                    return True
         
         return False
     
@@ -292,17 +296,25 @@ class LectionCharacter:
             pygame.draw.rect(screen, (0, 255, 0), (screen_x, screen_y, self.width, self.height))
             return
         
-        # Flip sprite if facing left
+        # Scale to the camera zoom (no-op at zoom 1), then flip if facing left
+        sprite = camera.zoom_sprite(sprite)
         if not self.facing_right:
             sprite = pygame.transform.flip(sprite, True, False)
         
         screen.blit(sprite, (screen_x, screen_y))
 
 class LectionGame:
-    def __init__(self):
+    def __init__(self, input_source=None, owns_input=False):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Escapist Game - Lection Hall")
-        self.clock = pygame.time.Clock()
+        self.driver = FrameDriver(FPS, "lection")
+        
+        memory_tracker.set_scene("lection")
+        
+        # Input source (shared with Game when teleporting so recordings continue;
+        # Game hands it over with owns_input so it is closed when the hall ends)
+        self.owns_input = owns_input or input_source is None
+        self.input = input_source or create_input_source()
         
         # Game state
         self.game_over = False
@@ -313,9 +325,11 @@ class LectionGame:
         self.fade_speed = 3    # Speed of fade-in
         self.fade_surface = pygame.Surface((WIDTH, HEIGHT))
         self.fade_surface.fill((0, 0, 0))  # Black surface
+        track(self.fade_surface, "LectionGame", "fade_surface")
         
-        # Create darkness overlay surface
-        self.darkness_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        # Darkness with a light around the character
+        self.lighting = LightingEngine((WIDTH, HEIGHT))
+        self.player_light = self.lighting.add_light(Light("player", 0, 0, LIGHT_RADIUS))
         
         # Load lection background with smaller scale to make character appear larger
         try:
@@ -324,9 +338,9 @@ class LectionGame:
             smaller_bg_width = int(BG_WIDTH * 0.8)  # 80% of original size
             smaller_bg_height = int(BG_HEIGHT * 0.8)  # 80% of original size
             self.background = pygame.transform.scale(original_lection, (smaller_bg_width, smaller_bg_height))
-            print(f"Lection background loaded and scaled: {self.background.get_size()}")
+            log.info("Lection background loaded and scaled: %s", self.background.get_size())
         except pygame.error as e:
-            print(f"Could not load lection background: {e}")
+            log.error("Could not load lection background: %s", e)
             # Create a dark background as fallback for lection
             smaller_bg_width = int(BG_WIDTH * 0.8)
             smaller_bg_height = int(BG_HEIGHT * 0.8)
@@ -338,9 +352,17 @@ class LectionGame:
             self.objects_layer = pygame.image.load("lection_objects.png")
             # Scale to match background
             self.objects_layer = pygame.transform.scale(self.objects_layer, (smaller_bg_width, smaller_bg_height))
+            # Collision reads a 1-bit mask (alpha > 128 is solid), so the drawn
+            # layer is free to use whatever storage blits fastest
+            self.collision_mask = pygame.mask.from_surface(self.objects_layer, 128)
+            self.objects_layer = optimize(self.objects_layer, "lection_objects.png")
         except pygame.error as e:
-            print(f"Could not load lection_objects.png: {e}")
+            log.error("Could not load lection_objects.png: %s", e)
             self.objects_layer = None
+            self.collision_mask = None
+        
+        track(self.background, "LectionGame", "background")
+        track(self.objects_layer, "LectionGame", "objects_layer")
         
         # Get map dimensions
         self.map_width, self.map_height = smaller_bg_width, smaller_bg_height
@@ -357,6 +379,23 @@ class LectionGame:
         # Create NPCs for lection hall (optional - can be added later)
         # For now, no NPCs in lection hall
         
+        # Deep profiling capture (F8 or ESCAPEN_PROFILE); inactive otherwise
+        self.deep_profiler = DeepProfiler("lection", self.entity_counts)
+        
+        # Frame profiler overlay (F10); markers are no-ops while it's off
+        self.profiler = FrameProfiler()
+        
+        memory_tracker.report("lection")
+        asset_pipeline.report()
+    
+    def entity_counts(self):
+        """Scene size, used to tag profiles and benchmarks"""
+        return {
+            "characters": 1,
+            "map_size": [self.map_width, self.map_height],
+            "collision_layer": self.objects_layer is not None,
+        }
+    
     def restart_game(self):
         """Restart the lection game"""
         self.game_over = False
@@ -377,43 +416,14 @@ class LectionGame:
     
     def apply_horror_lighting(self):
         """Apply horror lighting effect - darkness with light around character"""
-        # Fill darkness surface with semi-transparent black
-        self.darkness_surface.fill((0, 0, 0, DARKNESS_ALPHA))
-        
-        # Get character position on screen
-        char_screen_x, char_screen_y = self.camera.apply(
-            self.character.world_x + self.character.width // 2,  # Center of character
-            self.character.world_y + self.character.height // 2
-        )
-        
-        # Create light circle around character
-        # We'll create a gradient light effect
-        for radius in range(LIGHT_RADIUS, 0, -5):
-            # Calculate alpha for gradient effect (more transparent in center)
-            alpha = int((LIGHT_RADIUS - radius) / LIGHT_RADIUS * DARKNESS_ALPHA)
-            
-            # Create temporary surface for this circle
-            circle_surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(circle_surface, (0, 0, 0, alpha), (radius, radius), radius)
-            
-            # Blit with BLEND_RGBA_SUB to subtract darkness (create light)
-            circle_x = char_screen_x - radius
-            circle_y = char_screen_y - radius
-            
-            # Make sure circle is within screen bounds
-            if (circle_x < WIDTH and circle_x + radius * 2 > 0 and 
-                circle_y < HEIGHT and circle_y + radius * 2 > 0):
-                self.darkness_surface.blit(circle_surface, (circle_x, circle_y), special_flags=pygame.BLEND_RGBA_SUB)
-        
-        # Apply the darkness overlay to the screen
-        self.screen.blit(self.darkness_surface, (0, 0))
+        self.player_light.x = self.character.world_x + self.character.width // 2
+        self.player_light.y = self.character.world_y + self.character.height // 2
+        self.lighting.apply(self.screen, self.camera)
     
     def draw_game_over_screen(self):
         """Draw game over screen"""
         # Create semi-transparent overlay
-        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 180))  # Dark overlay
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(solid_panel((WIDTH, HEIGHT), (0, 0, 0), 180), (0, 0))  # Dark overlay
         
         # Game Over text
         font_large = pygame.font.Font(None, 120)
@@ -434,81 +444,119 @@ class LectionGame:
         restart_rect = restart_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 60))
         self.screen.blit(restart_text, restart_rect)
     
-    def run(self):
-        """Main game loop for lection hall"""
+    def handle_events(self, events):
+        """Process input events; returns False when the game should quit"""
         running = True
-        while running:
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
                     running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        running = False
-                    elif event.key == pygame.K_r and self.game_over:
-                        self.restart_game()
-            
-            # Get pressed keys for continuous input
-            keys_pressed = pygame.key.get_pressed()
-            
-            # Update game objects only if game is not over
-            if not self.game_over:
-                self.character.update(keys_pressed, self.objects_layer, self.map_width, self.map_height)
-                self.camera.update(self.character.world_x, self.character.world_y)
-            else:
-                # Increment game over timer for effects
-                self.game_over_timer += 1
-            
-            # Draw everything
-            # Draw background with camera offset
-            bg_x, bg_y = self.camera.apply(0, 0)
-            self.screen.blit(self.background, (bg_x, bg_y))
-            
-            # Draw objects layer on top of background
-            if self.objects_layer:
-                self.screen.blit(self.objects_layer, (bg_x, bg_y))
-            
-            # Draw character
-            self.character.draw(self.screen, self.camera)
-            
-            # Apply horror lighting effect
-            self.apply_horror_lighting()
-            
-            # Draw UI info (only if game is not over)
-            if not self.game_over:
-                font = pygame.font.Font(None, 36)
-                info_text = f"Pos: ({int(self.character.world_x)}, {int(self.character.world_y)}) | Lection Hall"
-                text_surface = font.render(info_text, True, WHITE)
-                self.screen.blit(text_surface, (10, 10))
-                
-                controls_text = "Controls: WASD/Arrows to move, Shift to run, ESC to quit"
-                controls_surface = font.render(controls_text, True, WHITE)
-                self.screen.blit(controls_surface, (10, 50))
-                
-                # Show lection hall info
-                lection_text = "Welcome to the Lection Hall - No boundaries, free exploration!"
-                lection_surface = font.render(lection_text, True, (200, 255, 200))
-                self.screen.blit(lection_surface, (10, 90))
-            
-            # Draw game over screen if game is over
-            if self.game_over:
-                self.draw_game_over_screen()
+                elif event.key == pygame.K_r and self.game_over:
+                    self.restart_game()
+                elif event.key == pygame.K_F8:
+                    self.deep_profiler.start()
+                elif event.key == pygame.K_F10:
+                    self.profiler.toggle()
+                elif event.key == pygame.K_F11 and self.profiler.enabled:
+                    self.profiler.export_csv()
+        
+        return running
+    
+    def update(self, keys_pressed):
+        """Advance the simulation by one tick"""
+        # Update game objects only if game is not over
+        if not self.game_over:
+            self.character.update(keys_pressed, self.collision_mask, self.map_width, self.map_height)
+            self.camera.update(self.character.world_x, self.character.world_y)
+        else:
+            # Increment game over timer for effects
+            self.game_over_timer += 1
+    
+    def draw(self):
+        """Draw the current frame to the screen (without flipping)"""
+        # Assets drawn from here on are in use and kept over the memory budget
+        memory_tracker.next_frame()
+        
+        # Draw everything
+        # Draw background with camera offset
+        bg_x, bg_y = self.camera.apply(0, 0)
+        self.screen.blit(self.background, (bg_x, bg_y))
+        
+        # Draw objects layer on top of background
+        if self.objects_layer:
+            self.screen.blit(self.objects_layer, (bg_x, bg_y))
+        self.profiler.mark("background")
+        
+        # Draw character
+        self.character.draw(self.screen, self.camera)
+        self.profiler.mark("entities")
+        
+        # Apply horror lighting effect
+        self.apply_horror_lighting()
+        self.profiler.mark("lighting")
+        
+        # Draw UI info (only if game is not over)
+        if not self.game_over:
+            font = pygame.font.Font(None, 36)
+            info_text = f"Pos: ({int(self.character.world_x)}, {int(self.character.world_y)}) | Lection Hall"
+            text_surface = font.render(info_text, True, WHITE)
+            self.screen.blit(text_surface, (10, 10))
             
-            # Apply fade-in effect
-            if self.fade_alpha > 0:
-                self.fade_alpha -= self.fade_speed
-                if self.fade_alpha < 0:
-                    self.fade_alpha = 0
-                
-                self.fade_surface.set_alpha(self.fade_alpha)
-                self.screen.blit(self.fade_surface, (0, 0))
+            controls_text = "Controls: WASD/Arrows to move, Shift to run, ESC to quit"
+            controls_surface = font.render(controls_text, True, WHITE)
+            self.screen.blit(controls_surface, (10, 50))
             
-            # Update display
-            pygame.display.flip()
+            # Show lection hall info
+            lection_text = "Welcome to the Lection Hall - No boundaries, free exploration!"
+            lection_surface = font.render(lection_text, True, (200, 255, 200))
+            self.screen.blit(lection_surface, (10, 90))
+        
+        # Draw game over screen if game is over
+        if self.game_over:
+            self.draw_game_over_screen()
+        
+        # Apply fade-in effect
+        if self.fade_alpha > 0:
+            self.fade_alpha -= self.fade_speed
+            if self.fade_alpha < 0:
+                self.fade_alpha = 0
             
-            # Control frame rate
-            self.clock.tick(FPS)
+            self.fade_surface.set_alpha(self.fade_alpha)
+            self.screen.blit(self.fade_surface, (0, 0))
+        self.profiler.mark("hud")
+        
+        # Frame profiler overlay
+        self.profiler.draw(self.screen)
+        self.profiler.mark("overlay")
+    
+    def frame(self, delta_time):
+        """One tick of the lection hall, called by the frame driver; returns False to stop"""
+        # Read input for this tick (recorded/replayed when enabled)
+        events, keys_pressed, _ = self.input.next_tick(delta_time)
+        
+        self.profiler.begin_frame()
+        running = self.handle_events(events)
+        self.profiler.mark("events")
+        self.update(keys_pressed)
+        self.profiler.mark("update")
+        self.draw()
+        
+        # Update display
+        pygame.display.flip()
+        self.profiler.mark("flip")
+        self.profiler.end_frame()
+        self.deep_profiler.tick()
+        return running
+    
+    def run(self):
+        """Main game loop for lection hall"""
+        self.driver.run(self.frame)
         
         # Quit
+        self.deep_profiler.stop()
+        if self.owns_input:
+            self.input.close()
         pygame.quit()
         sys.exit()
\ No newline at end of file
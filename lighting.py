@@ -0,0 +1,347 @@
+# Multi-light lighting engine
+#
+# Darkness and every light are accumulated in a lightmap at 1/LIGHTMAP_SCALE
+# of the screen resolution. The lightmap holds the light level as gray
+# (255 - darkness alpha): it is filled with the ambient level, each visible
+# light adds its cached "cookie" (a pre-rendered falloff mask) with
+# BLEND_RGB_ADD, and the screen is multiplied by the upscaled result, which
+# gives the same image as alpha-blending black with the darkness alpha.
+#
+# The upscale is a single smoothscale pass per frame, restricted to the
+# lit parts of the lightmap: everywhere else the light level is the flat
+# ambient value, which is just a fill. Lights whose bounds miss the camera
+# view are skipped.
+#
+# Lights marked `occluded` are clipped to their visibility polygon (see
+# visibility.py): the cookie is multiplied by the polygon drawn into a
+# reusable mask at lightmap resolution before it is added.
+#
+# Flicker dims every light at once: the lit parts of the lightmap are
+# multiplied by `gain` (a blit from a flat gray surface) just before they
+# are upscaled, and the ambient fill uses the dimmed level, so it adds no
+# full-resolution pass. FLICKER_NOISE is a precomputed table of flicker
+# amounts that callers step through.
+#
+# With a fog of war (fog_of_war.py), explored areas get a brighter ambient
+# level: the fog fills them in both the lightmap and the output.
+#
+# build() draws only the lightmap; render() adds the upscale. A backend that
+# can stretch the lightmap itself (render_backend.TextureBackend) uses
+# build() and applies `level` as a color modulation instead.
+#
+# Cookies are cached per (shape, lightmap radius, intensity, direction), so
+# steady-state frames allocate nothing. The time spent on each light (and
+# on the upscale) is kept as a rolling average for the profiler overlay.
+
+import math
+import random
+import time
+
+import pygame
+
+from constants import DARKNESS_ALPHA
+from memory_tracker import track
+
+LIGHTMAP_SCALE = 4         # Lightmap is a quarter of the screen resolution
+FALLOFF_RINGS = 30         # Circles the original player light was built from
+FLASHLIGHT_SPREAD = 0.45   # Half-angle of the flashlight cone, radians
+COST_SMOOTHING = 0.1       # Weight of the newest frame in the per-light averages
+MAX_COOKIES = 64
+FLICKER_TABLE_SIZE = 256
+FLICKER_KEY_SPACING = 8    # Table entries between random noise keys
+
+
+class Light:
+    """A light in world space.
+
+    shape is "point" (radial falloff) or "cone" (a flashlight pointing along
+    direction: 1 = right, -1 = left). intensity 1.0 removes the darkness
+    completely at the center. Occluded lights stop at walls.
+    """
+
+    __slots__ = ("name", "x", "y", "radius", "intensity", "shape", "direction", "occluded", "enabled")
+
+    def __init__(self, name, x, y, radius, intensity=1.0, shape="point", direction=1, occluded=False):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.intensity = intensity
+        self.shape = shape
+        self.direction = direction
+        self.occluded = occluded
+        self.enabled = True
+
+
+def falloff(distance):
+    """Fraction of the darkness a light removes at `distance` (0..1 of its radius).
+
+    Matches the original player light, which stacked FALLOFF_RINGS translucent
+    circles: fully lit up to ~74% of the radius, then a quadratic falloff.
+    """
+    return min(1.0, FALLOFF_RINGS / 2 * (1.0 - distance) ** 2)
+
+
+def _ring_step(radius, steps):
+    """Radius step between falloff circles for at most `steps` bands (None = one per pixel)"""
+    return max(1, radius // steps) if steps else 1
+
+
+def _point_cookie(radius, strength, steps=None):
+    """Radial falloff drawn as concentric circles, outermost first"""
+    size = radius * 2
+    cookie = pygame.Surface((size, size))
+    for ring_radius in range(radius, 0, -_ring_step(radius, steps)):
+        level = int(strength * falloff(ring_radius / radius))
+        pygame.draw.circle(cookie, (level, level, level), (radius, radius), ring_radius)
+    return cookie, cookie.get_rect()
+
+
+def _cone_cookie(radius, strength, direction, steps=None):
+    """Flashlight cone with the apex at the center of the cookie"""
+    size = radius * 2
+    cookie = pygame.Surface((size, size))
+    for ring_radius in range(radius, 0, -_ring_step(radius, steps)):
+        level = int(strength * falloff(ring_radius / radius))
+        points = [(radius, radius)]
+        for i in range(9):
+            angle = -FLASHLIGHT_SPREAD + 2 * FLASHLIGHT_SPREAD * i / 8
+            points.append((radius + direction * ring_radius * math.cos(angle),
+                           radius + ring_radius * math.sin(angle)))
+        pygame.draw.polygon(cookie, (level, level, level), points)
+
+    # Only the half the cone points into is lit
+    half_height = math.ceil(radius * math.sin(FLASHLIGHT_SPREAD)) + 1
+    lit = pygame.Rect(radius if direction > 0 else 0, radius - half_height, radius, half_height * 2)
+    return cookie, lit.clip(cookie.get_rect())
+
+
+def _flicker_table(size=FLICKER_TABLE_SIZE, seed=1313):
+    """Looping value noise in 0..1: smooth wobble with occasional dropouts"""
+    rng = random.Random(seed)
+    keys = [rng.random() for _ in range(size // FLICKER_KEY_SPACING)]
+    table = []
+    for i in range(size):
+        key, offset = divmod(i, FLICKER_KEY_SPACING)
+        t = offset / FLICKER_KEY_SPACING
+        t = t * t * (3 - 2 * t)
+        a = keys[key]
+        b = keys[(key + 1) % len(keys)]
+        value = (a + (b - a) * t) ** 2
+        if rng.random() < 0.04:
+            value = 1.0  # Brief blackout
+        table.append(value)
+    return table
+
+
+FLICKER_NOISE = _flicker_table()
+
+
+class LightingEngine:
+    """Accumulates darkness and lights in a reduced-resolution lightmap"""
+
+    def __init__(self, screen_size, darkness_alpha=DARKNESS_ALPHA, scale=LIGHTMAP_SCALE, occluder=None, fog=None):
+        self.screen_size = screen_size
+        self.darkness_alpha = darkness_alpha
+        self.output = track(pygame.Surface(screen_size), "LightingEngine", "output")
+        self.lights = []
+        self.cookies = {}
+        self.masks = {}          # size -> scratch surface for occluded lights
+        self.steps = None        # Gradient bands per cookie (None = one per lightmap pixel)
+        self.occluder = occluder  # VisibilityIndex, or None to ignore walls
+        self.fog = fog            # FogOfWar, or None for uniform darkness
+        self.gain = 1.0          # Brightness of all light (flicker), 0..1
+        self.costs = {}          # name -> rolling average ms
+        self.visible_count = 0
+        self.scale = None
+        self._resize(scale)
+        self.requested_scale = scale
+        self.requested_steps = None
+
+    def set_scale(self, scale):
+        """Change the lightmap resolution (1/scale of the screen) from the next frame on"""
+        self.requested_scale = scale
+
+    def set_steps(self, steps):
+        """Limit the falloff gradient to `steps` bands (None = smoothest) from the next frame on"""
+        self.requested_steps = steps
+
+    def _apply_settings(self):
+        # Settings change between frames only, so a frame being drawn on the
+        # pipeline's render thread never sees the lightmap resized under it
+        if self.requested_scale != self.scale:
+            self._resize(self.requested_scale)
+        if self.requested_steps != self.steps:
+            self.steps = self.requested_steps
+            self.cookies.clear()
+
+    def _resize(self, scale):
+        width, height = self.screen_size
+        self.scale = scale
+        self.lightmap = track(pygame.Surface((-(-width // scale), -(-height // scale))),
+                              "LightingEngine", "lightmap")
+        self.dimmer = track(pygame.Surface(self.lightmap.get_size()), "LightingEngine", "dimmer")
+        self.dimmer_level = None
+        self.cookies.clear()
+        self.masks.clear()
+
+    def add_light(self, light):
+        self.lights.append(light)
+        return light
+
+    def remove_light(self, light):
+        if light in self.lights:
+            self.lights.remove(light)
+        self.costs.pop(light.name, None)
+
+    def cookie(self, shape, radius, intensity, direction):
+        """Return (surface, lit area) for a light, building it on first use"""
+        key = (shape, radius, round(intensity, 2), direction if shape == "cone" else 0)
+        cookie = self.cookies.get(key)
+        if cookie is None:
+            if len(self.cookies) >= MAX_COOKIES:
+                self.cookies.clear()  # Zoom sweeps create many sizes; start over
+            strength = self.darkness_alpha * intensity
+            if shape == "cone":
+                cookie = _cone_cookie(radius, strength, direction, self.steps)
+            else:
+                cookie = _point_cookie(radius, strength, self.steps)
+            self.cookies[key] = cookie
+        return cookie
+
+    def _clip(self, cookie, area, light, camera, position):
+        """Cookie area masked by the light's visibility polygon, or None if unoccluded"""
+        polygon = self.occluder.polygon_at(light.x, light.y, light.radius)
+        if polygon is None:
+            return None
+        mask = self.masks.get(area.size)
+        if mask is None:
+            if len(self.masks) >= MAX_COOKIES:
+                self.masks.clear()
+            mask = self.masks[area.size] = pygame.Surface(area.size)
+
+        scale = self.scale
+        left, top = position
+        points = []
+        for x, y in polygon:
+            screen_x, screen_y = camera.apply(x, y)
+            points.append((screen_x / scale - left, screen_y / scale - top))
+        mask.fill((0, 0, 0))
+        pygame.draw.polygon(mask, (255, 255, 255), points)
+        mask.blit(cookie, (0, 0), area, special_flags=pygame.BLEND_RGB_MULT)
+        return mask
+
+    def record(self, name, elapsed):
+        ms = elapsed * 1000
+        previous = self.costs.get(name)
+        self.costs[name] = ms if previous is None else previous + (ms - previous) * COST_SMOOTHING
+
+    @staticmethod
+    def _merge(rects):
+        """Merge overlapping rects so no area is upscaled twice"""
+        merged = []
+        for rect in rects:
+            index = rect.collidelist(merged)
+            while index != -1:
+                rect = rect.union(merged.pop(index))
+                index = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def build(self, camera):
+        """Draw this frame's low-resolution lightmap; returns the lit rects (lightmap pixels)"""
+        self._apply_settings()
+        timer = time.perf_counter
+        scale = self.scale
+        ambient = 255 - self.darkness_alpha
+        self.lightmap.fill((ambient, ambient, ambient))
+        fog = self.fog
+        if fog is not None:
+            start = timer()
+            explored = 255 - fog.explored_alpha
+            fog.composite(self.lightmap, camera, scale, (explored, explored, explored))
+            self.record("fog", timer() - start)
+        lightmap_bounds = self.lightmap.get_rect()
+
+        # Camera view in world coordinates
+        view_left = camera.x
+        view_top = camera.y
+        view_right = view_left + camera.view_width
+        view_bottom = view_top + camera.view_height
+
+        lit = []
+        for light in self.lights:
+            if not light.enabled:
+                continue
+            radius = light.radius
+            if (light.x + radius < view_left or light.x - radius > view_right or
+                    light.y + radius < view_top or light.y - radius > view_bottom):
+                self.record(light.name, 0.0)
+                continue
+
+            start = timer()
+            screen_x, screen_y = camera.apply(light.x, light.y)
+            lightmap_radius = max(1, round(camera.scale(radius) / scale))
+            cookie, area = self.cookie(light.shape, lightmap_radius, light.intensity, light.direction)
+            position = (round(screen_x / scale) - lightmap_radius + area.x,
+                        round(screen_y / scale) - lightmap_radius + area.y)
+            clipped = None
+            if light.occluded and self.occluder is not None:
+                clipped = self._clip(cookie, area, light, camera, position)
+            if clipped is not None:
+                self.lightmap.blit(clipped, position, special_flags=pygame.BLEND_RGB_ADD)
+            else:
+                self.lightmap.blit(cookie, position, area, special_flags=pygame.BLEND_RGB_ADD)
+            # One ambient pixel of padding keeps the smoothscale edges seamless
+            lit.append(pygame.Rect(position, area.size).inflate(2, 2).clip(lightmap_bounds))
+            self.record(light.name, timer() - start)
+        self.visible_count = len(lit)
+        return lit
+
+    @property
+    def level(self):
+        """Flicker gain as a 0-255 multiplier"""
+        return max(0, min(255, round(self.gain * 255)))
+
+    def render(self, camera):
+        """Build this frame's light levels; multiply the screen by the result"""
+        lit = self.build(camera)
+        timer = time.perf_counter
+        fog = self.fog
+        scale = self.scale
+        ambient = 255 - self.darkness_alpha
+
+        start = timer()
+        level = self.level
+        ambient = ambient * level // 255
+        self.output.fill((ambient, ambient, ambient))
+        if fog is not None:
+            explored = (255 - fog.explored_alpha) * level // 255
+            fog.composite(self.output, camera, 1, (explored, explored, explored))
+        for rect in self._merge(lit):
+            if rect.width and rect.height:
+                if level < 255:
+                    # A multiply blit is much faster than a multiply fill
+                    if level != self.dimmer_level:
+                        self.dimmer.fill((level, level, level))
+                        self.dimmer_level = level
+                    self.lightmap.blit(self.dimmer, rect, rect, special_flags=pygame.BLEND_RGB_MULT)
+                target = pygame.Rect(rect.x * scale, rect.y * scale, rect.width * scale, rect.height * scale)
+                target = target.clip(self.output.get_rect())
+                pygame.transform.smoothscale(self.lightmap.subsurface(rect), target.size,
+                                             self.output.subsurface(target))
+        self.record("upscale", timer() - start)
+        return self.output
+
+    def apply(self, screen, camera):
+        """Darken the screen with this frame's lighting"""
+        screen.blit(self.render(camera), (0, 0), special_flags=pygame.BLEND_RGB_MULT)
+
+    def cost_lines(self, top=6):
+        """Most expensive lights for the profiler overlay"""
+        ranked = sorted(self.costs.items(), key=lambda item: item[1], reverse=True)[:top]
+        lines = [f"lights {self.visible_count}/{len(self.lights)} visible"]
+        lines.extend(f"  {name:<14}{ms:6.3f} ms" for name, ms in ranked)
+        if self.occluder is not None:
+            lines.append(self.occluder.stats_line())
+        return lines
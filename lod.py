@@ -0,0 +1,82 @@
+# Update level of detail for entities
+#
+# Entities far from the camera do not need a full-rate update: nobody sees
+# their animation. The scheduler puts every entity (anything with world_x,
+# world_y, width and height) in one of three bands each tick:
+#
+#   FULL       overlaps the camera view            updated every tick
+#   REDUCED    within LOD_NEAR_MARGIN of the view  updated every LOD_REDUCED_INTERVAL ticks
+#   SUSPENDED  farther away                        not updated
+#
+# Skipped ticks are not lost: due() accumulates them (and their delta time)
+# and hands the total to the next update, so an entity that comes back into
+# view catches up in one step and is where it would have been at full rate.
+# Updates therefore take a tick count or an elapsed time rather than
+# assuming one tick per call.
+#
+# Gameplay-critical entities (a chasing Asselya) must not go through the
+# scheduler at all; the caller updates them directly.
+
+LOD_NEAR_MARGIN = 600        # World pixels around the view updated at the reduced rate
+LOD_REDUCED_INTERVAL = 4     # Ticks between updates in the reduced band
+
+FULL = "full"
+REDUCED = "reduced"
+SUSPENDED = "suspended"
+
+
+class UpdateScheduler:
+    """Decides, per tick, which entities get their update"""
+
+    def __init__(self, near_margin=LOD_NEAR_MARGIN, reduced_interval=LOD_REDUCED_INTERVAL):
+        self.near_margin = near_margin
+        self.reduced_interval = reduced_interval
+        self.pending = {}   # entity -> [skipped ticks, skipped ms]
+        self.view = (0, 0, 0, 0)
+        self.tick = 0
+        self.counts = {FULL: 0, REDUCED: 0, SUSPENDED: 0}
+
+    def begin(self, camera):
+        """Start a tick with the current camera view"""
+        self.view = (camera.x, camera.y, camera.x + camera.view_width, camera.y + camera.view_height)
+        self.tick += 1
+        self.counts = {FULL: 0, REDUCED: 0, SUSPENDED: 0}
+
+    def level(self, entity):
+        left, top, right, bottom = self.view
+        x = entity.world_x
+        y = entity.world_y
+        # Distance from the entity's box to the view (0 when they overlap)
+        gap_x = max(left - (x + entity.width), x - right, 0)
+        gap_y = max(top - (y + entity.height), y - bottom, 0)
+        if not gap_x and not gap_y:
+            return FULL
+        if gap_x <= self.near_margin and gap_y <= self.near_margin:
+            return REDUCED
+        return SUSPENDED
+
+    def due(self, entity, delta_time):
+        """(ticks, elapsed ms) to update the entity by this tick, or None to skip it"""
+        level = self.level(entity)
+        self.counts[level] += 1
+        pending = self.pending.get(entity)
+        # Reduced-rate entities are staggered by identity so they don't all update on the same tick
+        if level == FULL or (level == REDUCED and (self.tick + (id(entity) >> 4)) % self.reduced_interval == 0):
+            if pending is None:
+                return 1, delta_time
+            del self.pending[entity]
+            return pending[0] + 1, pending[1] + delta_time
+        if pending is None:
+            self.pending[entity] = [1, delta_time]
+        else:
+            pending[0] += 1
+            pending[1] += delta_time
+        return None
+
+    def clear(self):
+        """Forget skipped time (after a restart or a load)"""
+        self.pending.clear()
+
+    def stats_line(self):
+        counts = self.counts
+        return "lod %d full, %d reduced, %d suspended" % (counts[FULL], counts[REDUCED], counts[SUSPENDED])
@@ -3,6 +3,9 @@ import pygame
 
 from game import Game
 from starting_page import StartingPage
+from game_log import get_logger
+
+log = get_logger(__name__)
 
 def main():
     try:
@@ -18,7 +21,7 @@ def main():
             game.run()
 
     except Exception as e:
-        print(f"An error occurred: {e}")
+        log.error("An error occurred: %s", e)
     finally:
         pygame.quit()
         # sys.exit(0)  ← удалить
@@ -0,0 +1,216 @@
+# Surface memory accounting
+#
+# Every surface the game loads or allocates is registered with track(), which
+# records its owner, scene and pixel-buffer size (pitch * height). Entries
+# hold a weak reference, so a surface that gets garbage collected drops out
+# of the accounting on its own.
+#
+# When the tracked total goes over the budget (MEMORY_BUDGET_MB, or
+# ESCAPEN_MEMORY_BUDGET in megabytes) a warning is logged and evictable
+# surfaces (cached assets that can be reloaded on demand) are released,
+# least recently used first, until the total is EVICT_TARGET of the budget
+# (the margin keeps the next load from evicting again right away).
+#
+# Scenes call next_frame() once per frame and touch() the assets they draw.
+# An asset touched in this frame or the previous one is in use and is never
+# evicted (all surfaces sharing its evict callback are kept with it). If
+# evicting everything else still would not get under the budget, nothing is
+# evicted: the assets in use would only be reloaded, evicting each other.
+# While over budget, every frame retries with what has fallen out of use.
+#
+# Eviction only runs from next_frame() (and set_budget()), which scenes call
+# on the main thread while nothing is drawing; track() just accounts, since
+# the pipeline's render thread tracks the mip levels it builds. The entries
+# are guarded by a lock (reentrant: evict callbacks untrack their surfaces,
+# and weakref callbacks can run inside any tracker call that allocates).
+
+import os
+import threading
+import weakref
+
+from constants import MEMORY_BUDGET_MB
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+MB = 1024 * 1024
+REPORT_TOP = 12  # Largest entries listed in a report
+EVICT_TARGET = 0.9  # Eviction stops at this fraction of the budget
+IN_USE_FRAMES = 1   # Assets touched this many frames back are still in use
+
+
+class _Entry:
+    __slots__ = ("ref", "owner", "name", "scene", "bytes", "size", "evict", "used")
+
+
+_entries = {}      # id(surface) -> _Entry, in registration order
+_total = 0
+_scene = "global"
+_budget = int(float(os.environ.get("ESCAPEN_MEMORY_BUDGET", MEMORY_BUDGET_MB)) * MB)
+_over_budget = False
+_frame = 0
+_lock = threading.RLock()
+
+
+def surface_bytes(surface):
+    """Bytes used by a surface's pixel buffer"""
+    return surface.get_pitch() * surface.get_height()
+
+
+def set_scene(name):
+    """Tag surfaces tracked from now on with this scene name"""
+    global _scene
+    _scene = name
+
+
+def set_budget(megabytes):
+    global _budget
+    _budget = int(megabytes * MB)
+    enforce_budget()
+
+
+def next_frame():
+    """Start a new frame for touch(); evicts while over budget (main thread, nothing drawing)"""
+    global _frame
+    _frame += 1
+    if _total > _budget:
+        enforce_budget()
+
+
+def touch(surface):
+    """Mark a tracked surface as used in this frame (it will not be evicted)"""
+    entry = _entries.get(id(surface))
+    if entry is not None:
+        entry.used = _frame
+
+
+def _forget(key):
+    global _total
+    with _lock:
+        entry = _entries.pop(key, None)
+        if entry is not None:
+            _total -= entry.bytes
+
+
+def track(surface, owner, name="", evict=None):
+    """Register a surface and return it.
+
+    Args:
+        surface: the pygame Surface (None is passed through)
+        owner: what holds the surface, e.g. "Game" or "Task 3"
+        name: which asset it is, e.g. "background"
+        evict: optional callable that releases the surface so it can be
+            reloaded later; only such surfaces are evicted over budget
+            (by the next next_frame())
+    """
+    global _total
+    if surface is None:
+        return surface
+    key = id(surface)
+
+    entry = _Entry()
+    entry.ref = weakref.ref(surface, lambda ref, key=key: _forget(key))
+    entry.owner = owner
+    entry.name = name
+    entry.scene = _scene
+    entry.bytes = surface_bytes(surface)
+    entry.size = surface.get_size()
+    entry.evict = evict
+    entry.used = _frame  # Loaded for use right now
+    with _lock:
+        _forget(key)  # Same surface registered again, e.g. after a reload
+        _entries[key] = entry
+        _total += entry.bytes
+    return surface
+
+
+def untrack(surface):
+    if surface is not None:
+        _forget(id(surface))
+
+
+def total_bytes(scene=None):
+    if scene is None:
+        return _total
+    with _lock:
+        entries = list(_entries.values())
+    return sum(entry.bytes for entry in entries if entry.scene == scene)
+
+
+def enforce_budget():
+    """Warn and evict cached surfaces while the total is over budget.
+
+    Surfaces belonging to an asset in use (touched or loaded within
+    IN_USE_FRAMES) are left alone.
+    """
+    with _lock:
+        _enforce_budget()
+
+
+def _enforce_budget():
+    global _over_budget
+    if _total <= _budget:
+        _over_budget = False
+        return
+
+    items = list(_entries.items())
+    in_use = {entry.evict for _, entry in items
+              if entry.evict is not None and entry.used >= _frame - IN_USE_FRAMES}
+    candidates = [(key, entry) for key, entry in items
+                  if entry.evict is not None and entry.evict not in in_use]
+    freeable = sum(entry.bytes for _, entry in candidates)
+
+    if not _over_budget:
+        log.warning("Surface memory %.1f MB is over the %.1f MB budget (%.1f MB evictable)",
+                    _total / MB, _budget / MB, freeable / MB)
+        _over_budget = True
+    if _total - freeable > _budget:
+        return
+
+    target = _budget * EVICT_TARGET
+    evicted = 0
+    candidates.sort(key=lambda item: item[1].used)  # Least recently used first
+    for key, entry in candidates:
+        if _total <= target:
+            break
+        if key not in _entries:  # Freed with an earlier surface of the same asset
+            continue
+        before = _total
+        entry.evict()
+        _forget(key)
+        evicted += before - _total
+
+    if evicted:
+        log.info("Evicted %.2f MB of cached surfaces (now %.2f MB)", evicted / MB, _total / MB)
+    if _total <= _budget:
+        _over_budget = False
+
+
+def report(scene=None, top=REPORT_TOP):
+    """Log the largest surfaces and per-owner totals; returns the rows.
+
+    Rows are (owner, name, scene, width, height, bytes), largest first.
+    """
+    rows = []
+    with _lock:
+        entries = list(_entries.values())
+    for entry in entries:
+        if scene is not None and entry.scene != scene:
+            continue
+        rows.append((entry.owner, entry.name, entry.scene, entry.size[0], entry.size[1], entry.bytes))
+    rows.sort(key=lambda row: row[5], reverse=True)
+
+    owners = {}
+    for owner, _, _, _, _, size in rows:
+        owners[owner] = owners.get(owner, 0) + size
+
+    # One multi-line record, so the logger's deduplication keeps every row
+    total = sum(row[5] for row in rows)
+    lines = ["Surface memory%s: %.2f MB in %d surfaces (all scenes %.2f MB, budget %.1f MB)" % (
+        f" [{scene}]" if scene else "", total / MB, len(rows), _total / MB, _budget / MB)]
+    for owner, name, entry_scene, width, height, size in rows[:top]:
+        lines.append("  %8.2f MB  %5dx%-5d %s.%s (%s)" % (size / MB, width, height, owner, name, entry_scene))
+    for owner, size in sorted(owners.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append("  %8.2f MB  total %s" % (size / MB, owner))
+    log.info("\n".join(lines))
+    return rows
@@ -0,0 +1,304 @@
+# Micro-benchmarks for hot functions
+#
+# Each benchmark is a setup function that returns a zero-argument callable.
+# Timing follows timeit's methodology: the call count per repeat is
+# calibrated so one repeat takes at least MIN_REPEAT_TIME, garbage collection
+# is disabled while timing, and the best (minimum) per-call time over REPEATS
+# repeats is what gets compared, since noise only ever adds time.
+#
+# Usage:
+#   python microbench.py                      # run all, compare with baseline
+#   python microbench.py --save               # run all and store as baseline
+#   python microbench.py --filter lighting    # run a subset
+#   python microbench.py --threshold 0.05     # flag regressions above 5%
+#
+# Exit code is 1 if any benchmark regressed past the threshold.
+#
+# No baseline is committed: timings only compare on the same machine and
+# Python/pygame build. Create one before changing the code under test
+# (git stash, or on the base commit) with --save, which writes
+# benchmarks/microbench_baseline.json; then rerun without --save after the
+# change. Without a baseline every benchmark is reported as "new".
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("ESCAPEN_LOG", "warning")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from constants import WIDTH, HEIGHT, BG_WIDTH
+
+BASELINE_PATH = "benchmarks/microbench_baseline.json"
+DEFAULT_THRESHOLD = 0.10  # 10% slower than baseline counts as a regression
+MIN_REPEAT_TIME = 0.05    # Seconds per repeat after calibration
+REPEATS = 7
+
+BENCHMARKS = {}
+_fixtures = {}
+
+
+def benchmark(name):
+    """Register a setup function under a benchmark name"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def fixture(name, factory):
+    """Create an expensive object once and share it between benchmarks"""
+    if name not in _fixtures:
+        _fixtures[name] = factory()
+    return _fixtures[name]
+
+
+def _game():
+    from game import Game
+    game = fixture("game", Game)
+    game.autosave_enabled = False
+    return game
+
+
+def _task_manager():
+    def create():
+        from task_manager import TaskManager
+        manager = TaskManager()
+        for task_id in list(manager.tasks):
+            manager.activate_task(task_id)
+        return manager
+    return fixture("task_manager", create)
+
+
+# Collision
+
+@benchmark("utils.point_in_polygon")
+def bench_point_in_polygon():
+    from utils import point_in_polygon
+    from game import MAP_POLYGON
+    return lambda: point_in_polygon(BG_WIDTH // 2, 1800, MAP_POLYGON)
+
+
+@benchmark("utils.check_polygon_collision")
+def bench_check_polygon_collision():
+    from utils import check_polygon_collision, set_polygon_boundaries
+    from game import MAP_POLYGON
+    set_polygon_boundaries(MAP_POLYGON)
+    return lambda: check_polygon_collision(BG_WIDTH // 2, 1760, 50, 100)
+
+
+@benchmark("LectionCharacter.check_collision")
+def bench_lection_collision():
+    def create():
+        from lection_game import LectionGame
+        return LectionGame()
+    lection = fixture("lection", create)
+    character = lection.character
+    mask = lection.collision_mask
+    return lambda: character.check_collision(character.world_x, character.world_y, mask)
+
+
+# Rendering
+
+@benchmark("Game.apply_horror_lighting")
+def bench_horror_lighting():
+    game = _game()
+    game.camera.update(game.character.world_x, game.character.world_y)
+    return game.apply_horror_lighting
+
+
+@benchmark("Camera.apply")
+def bench_camera_apply():
+    from camera import Camera
+    camera = Camera()
+    camera.update(BG_WIDTH // 2, 1800)
+    return lambda: camera.apply(3200, 1600)
+
+
+# Tasks
+
+@benchmark("TaskManager.check_task_interactions")
+def bench_check_task_interactions():
+    manager = _task_manager()
+    return lambda: manager.check_task_interactions(BG_WIDTH // 2, 1800, 50, 100)
+
+
+@benchmark("TaskManager.draw_tasks_ui")
+def bench_draw_tasks_ui():
+    manager = _task_manager()
+    screen = pygame.display.get_surface()
+    return lambda: manager.draw_tasks_ui(screen)
+
+
+# Sprite loading
+
+@benchmark("load.Character")
+def bench_load_character():
+    from character import Character
+    return lambda: Character(0, 0)
+
+
+@benchmark("load.LectionCharacter")
+def bench_load_lection_character():
+    from lection_game import LectionCharacter
+    return lambda: LectionCharacter(0, 0)
+
+
+@benchmark("load.NPC")
+def bench_load_npc():
+    from npc import NPC
+    return lambda: NPC(0, 0, "npc/bakhredin/bahr", 90, 7)
+
+
+@benchmark("load.Asselya")
+def bench_load_asselya():
+    from asselya import Asselya
+    return lambda: Asselya(0, 0, "./asselya")
+
+
+@benchmark("load.ClickableCharacter")
+def bench_load_clickable_character():
+    from clickable_character import ClickableCharacter
+    return lambda: ClickableCharacter(0, 0, "sprites/blink.png")
+
+
+@benchmark("load.Task")
+def bench_load_task():
+    manager = _task_manager()
+    task = manager.tasks["1"]
+    return task.load_sprites
+
+
+def measure(func, repeats=REPEATS, min_time=MIN_REPEAT_TIME):
+    """Return per-call times (seconds) for each repeat"""
+    timer = time.perf_counter
+
+    # Calibrate: grow the call count until one repeat takes long enough
+    number = 1
+    while True:
+        start = timer()
+        for _ in range(number):
+            func()
+        elapsed = timer() - start
+        if elapsed >= min_time:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        results = []
+        for _ in range(repeats):
+            start = timer()
+            for _ in range(number):
+                func()
+            results.append((timer() - start) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return results, number
+
+
+def run(names):
+    """Run the named benchmarks; returns {name: stats}"""
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    for name in names:
+        func = BENCHMARKS[name]()
+        times, number = measure(func)
+        results[name] = {
+            "best_us": round(min(times) * 1e6, 3),
+            "median_us": round(statistics.median(times) * 1e6, 3),
+            "calls": number,
+        }
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Build report rows; returns (rows, regressed names)"""
+    rows = []
+    regressed = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, stats["best_us"], None, None, "new"))
+            continue
+        change = stats["best_us"] / base["best_us"] - 1.0
+        if change > threshold:
+            status = "REGRESSED"
+            regressed.append(name)
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append((name, stats["best_us"], base["best_us"], change, status))
+    return rows, regressed
+
+
+def load_baseline(path):
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)["results"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, results):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    payload = {
+        "python": sys.version.split()[0],
+        "pygame": pygame.version.ver,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(payload, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for hot functions")
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="store results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--json", help="also write raw results to this file")
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    results = run(names)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"Saved {len(results)} results to {args.baseline}")
+
+    baseline = load_baseline(args.baseline)
+    if not baseline and not args.save:
+        print(f"No baseline at {args.baseline}; create one with --save")
+    rows, regressed = compare(results, baseline, args.threshold)
+    print(f"{'benchmark':40} {'best us':>12} {'baseline':>12} {'change':>8}  status")
+    for name, best, base, change, status in rows:
+        base_text = f"{base:12.3f}" if base is not None else f"{'-':>12}"
+        change_text = f"{change:+7.1%}" if change is not None else f"{'-':>7}"
+        print(f"{name:40} {best:12.3f} {base_text} {change_text}   {status}")
+
+    pygame.quit()
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
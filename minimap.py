@@ -0,0 +1,92 @@
+# Minimap widget
+#
+# The base image is a copy of the map downscaled once, when the minimap is
+# created; it is never rescaled afterwards. Each frame the markers (player,
+# Asselya, NPCs, active tasks and the camera view) are converted to minimap
+# pixels and compared with the previous frame. Only when one of them lands
+# on a different pixel is the composite rebuilt: a base blit plus one blit
+# of a pre-rendered dot per marker. Otherwise drawing is a single blit of
+# the cached composite (the border is part of it).
+
+import time
+
+import pygame
+
+from constants import WIDTH, HEIGHT, WHITE, RED, ORANGE
+from memory_tracker import track
+
+MINIMAP_SCALE = 24   # World pixels per minimap pixel (6144x3072 -> 256x128)
+MINIMAP_MARGIN = 20
+BORDER = 2
+BORDER_COLOR = (90, 90, 90)
+VIEW_COLOR = (160, 160, 160)
+
+# kind -> (color, radius)
+MARKERS = {
+    "player": ((80, 200, 255), 3),
+    "asselya": (RED, 3),
+    "npc": (WHITE, 2),
+    "task": (ORANGE, 2),
+}
+
+
+class Minimap:
+    """Downscaled map with entity markers in a screen corner"""
+
+    def __init__(self, background, scale=MINIMAP_SCALE, position=None):
+        self.scale = scale
+        width, height = background.get_size()
+        size = (max(1, width // scale), max(1, height // scale))
+        self.base = track(pygame.transform.smoothscale(background, size).convert(), "Minimap", "base")
+
+        # Composite = border + base + markers
+        self.surface = track(pygame.Surface((size[0] + BORDER * 2, size[1] + BORDER * 2)).convert(),
+                             "Minimap", "composite")
+        self.surface.fill(BORDER_COLOR)
+        self.map_area = self.surface.subsurface(pygame.Rect(BORDER, BORDER, size[0], size[1]))
+        self.position = position or (WIDTH - self.surface.get_width() - MINIMAP_MARGIN,
+                                     HEIGHT - self.surface.get_height() - MINIMAP_MARGIN)
+        self.dots = {kind: self._dot(color, radius) for kind, (color, radius) in MARKERS.items()}
+        self.visible = True
+        self.markers = None
+        self.redraws = 0
+        self.last_ms = 0.0
+
+    @staticmethod
+    def _dot(color, radius):
+        """Marker stamp: (surface with a colorkey, offset from the marker position)"""
+        dot = pygame.Surface((radius * 2 + 1, radius * 2 + 1)).convert()
+        dot.fill((0, 0, 0))
+        pygame.draw.circle(dot, color, (radius, radius), radius)
+        dot.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return dot, radius
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def draw(self, screen, camera, gather_entities):
+        """Draw the minimap; gather_entities() returns (world x, world y, kind) tuples
+
+        It is called here so that last_ms covers gathering the markers too.
+        """
+        start = time.perf_counter()
+        entities = gather_entities()
+        scale = self.scale
+        markers = (
+            (int(camera.x // scale), int(camera.y // scale),
+             int(camera.view_width // scale), int(camera.view_height // scale)),
+            tuple((int(x // scale), int(y // scale), kind) for x, y, kind in entities),
+        )
+        if markers != self.markers:
+            self.markers = markers
+            self.redraws += 1
+            area = self.map_area
+            area.blit(self.base, (0, 0))
+            pygame.draw.rect(area, VIEW_COLOR, markers[0], 1)
+            dots = self.dots
+            for x, y, kind in markers[1]:
+                dot, radius = dots[kind]
+                area.blit(dot, (x - radius, y - radius))
+
+        screen.blit(self.surface, self.position)
+        self.last_ms = (time.perf_counter() - start) * 1000
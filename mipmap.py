@@ -0,0 +1,145 @@
+# Precomputed mip levels for zoomed drawing
+#
+# Scaling the full 6144x3072 map (or every sprite) each frame is far too
+# slow. A MipChain keeps the image at 1, 1/2, 1/4 and 1/8 size; for a given
+# zoom the nearest level at or above the target resolution is picked and
+# only the visible part of it gets a small residual scale (between 1/2 and
+# 1 when zooming out).
+#
+# Levels are built on first use, so nothing is allocated while the camera
+# stays at zoom 1. They are registered with the memory tracker and can be
+# evicted under memory pressure unless they were just drawn; they are
+# rebuilt when needed again.
+#
+# Sprite chains (zoom_sprite) are cached per sprite in a WeakKeyDictionary
+# and only hold a weak reference to their sprite, so a sprite that is
+# dropped (e.g. an evicted task sprite) takes its chain and levels with it.
+
+import math
+import weakref
+
+import pygame
+
+from memory_tracker import track, untrack, touch
+
+MIP_FACTORS = (1, 2, 4, 8)
+
+
+def _downscale(surface, size):
+    # smoothscale only handles 24/32-bit surfaces (palettized sprites exist)
+    if surface.get_bitsize() >= 24:
+        return pygame.transform.smoothscale(surface, size)
+    return pygame.transform.scale(surface, size)
+
+
+class MipChain:
+    """An image with lazily built 1/2, 1/4 and 1/8 size copies"""
+
+    def __init__(self, surface, name="", factors=MIP_FACTORS, weak=False):
+        # A weak chain must not keep its source alive (see zoom_sprite)
+        self.source_ref = weakref.ref(surface) if weak else None
+        self.source = None if weak else surface
+        self.name = name
+        self.factors = factors
+        self.levels = None          # [(factor, surface)] of the reduced levels, built on first use
+        self.scaled_zoom = None     # Last whole-image result (for sprites)
+        self.scaled = None
+        self.region_buffer = None   # Reused destination for map regions
+
+    @property
+    def surface(self):
+        return self.source if self.source_ref is None else self.source_ref()
+
+    def build(self):
+        self.levels = []
+        current = self.surface
+        width, height = self.surface.get_size()
+        for factor in self.factors[1:]:
+            size = (max(1, width // factor), max(1, height // factor))
+            # Each level is made from the previous one (a cheap box filter)
+            current = _downscale(current, size)
+            self.levels.append((factor, track(current, "MipChain", f"{self.name} 1/{factor}", self.release)))
+
+    def release(self):
+        """Drop the reduced levels; they are rebuilt on next use"""
+        if self.levels:
+            for _, level in self.levels:
+                untrack(level)
+        self.levels = None
+        self.scaled_zoom = None
+        self.scaled = None
+        self.region_buffer = None
+
+    def level_for(self, zoom):
+        """Return (factor, surface) of the smallest level still at or above `zoom`"""
+        if self.levels is None:
+            self.build()
+        chosen = (1, self.surface)
+        for factor, level in self.levels:
+            if 1.0 / factor >= zoom:
+                chosen = (factor, level)
+        touch(chosen[1])
+        return chosen
+
+    def get_scaled(self, zoom):
+        """Whole image at `zoom` (cached until the zoom changes)"""
+        if zoom == 1.0:
+            return self.surface
+        if self.levels:
+            touch(self.levels[-1][1])  # The cached result is made from the levels
+        if zoom != self.scaled_zoom or self.scaled is None:
+            factor, level = self.level_for(zoom)
+            width, height = self.surface.get_size()
+            size = (max(1, round(width * zoom)), max(1, round(height * zoom)))
+            # The source itself is never cached here (a weak chain would pin it)
+            self.scaled = level if factor > 1 and level.get_size() == size else pygame.transform.scale(level, size)
+            self.scaled_zoom = zoom
+        return self.scaled
+
+    def draw(self, screen, camera, world_x=0, world_y=0):
+        """Draw the part of the image visible through `camera`"""
+        if camera.zoom == 1.0:
+            screen.blit(self.surface, camera.apply(world_x, world_y))
+            return
+
+        width, height = self.surface.get_size()
+        left = max(0, math.floor(camera.x - world_x))
+        top = max(0, math.floor(camera.y - world_y))
+        right = min(width, math.ceil(camera.x - world_x + camera.view_width))
+        bottom = min(height, math.ceil(camera.y - world_y + camera.view_height))
+        if right <= left or bottom <= top:
+            return
+
+        factor, level = self.level_for(camera.zoom)
+        level_width, level_height = level.get_size()
+        src_left = left // factor
+        src_top = top // factor
+        src = pygame.Rect(src_left, src_top,
+                          min(level_width, -(-right // factor)) - src_left,
+                          min(level_height, -(-bottom // factor)) - src_top)
+        if src.width <= 0 or src.height <= 0:
+            return
+
+        # Residual scale of the visible region only
+        residual = camera.zoom * factor
+        size = (max(1, round(src.width * residual)), max(1, round(src.height * residual)))
+        if self.region_buffer is None or self.region_buffer.get_size() != size:
+            self.region_buffer = pygame.Surface(size, 0, level)
+        pygame.transform.scale(level.subsurface(src), size, self.region_buffer)
+        screen.blit(self.region_buffer, camera.apply(world_x + src.x * factor, world_y + src.y * factor))
+
+
+_sprite_chains = weakref.WeakKeyDictionary()  # sprite -> MipChain (weak, see header)
+
+
+def zoom_sprite(sprite, zoom):
+    """Sprite scaled to `zoom` through its (cached) mip chain"""
+    if zoom == 1.0:
+        return sprite
+    chain = _sprite_chains.get(sprite)
+    if chain is None:
+        chain = _sprite_chains[sprite] = MipChain(sprite, "sprite", weak=True)
+        # The tracker holds chain.release as the levels' evict callback;
+        # untracking them when the sprite goes lets the chain go too
+        weakref.finalize(sprite, chain.release)
+    return chain.get_scaled(zoom)
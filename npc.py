@@ -1,6 +1,7 @@
 import pygame
 import os
 from constants import ANIMATION_SPEED
+from memory_tracker import track
 
 class NPC:
     def __init__(self, x, y, sprite_prefix, target_width=50, frame_count=4):
@@ -32,25 +33,25 @@ class NPC:
                 scale_factor = self.width / original_size[0]
                 new_height = int(original_size[1] * scale_factor)
                 sprite = pygame.transform.scale(sprite, (self.width, new_height))
-                self.sprites.append(sprite)
+                self.sprites.append(track(sprite, "NPC", sprite_path))
                 # Update height based on actual sprite proportions
                 if i == 1:  # Set height based on first sprite
                     self.height = new_height
     
-    def update(self):
-        """Update NPC animation"""
-        self.animation_counter += 1
+    def update(self, ticks=1):
+        """Update NPC animation by `ticks` frames (more than one when catching up)"""
+        self.animation_counter += ticks
         if self.animation_counter >= ANIMATION_SPEED * 2:  # Slower animation
-            self.animation_counter = 0
+            steps, self.animation_counter = divmod(self.animation_counter, ANIMATION_SPEED * 2)
             if self.sprites:
-                self.current_frame = (self.current_frame + 1) % len(self.sprites)
+                self.current_frame = (self.current_frame + steps) % len(self.sprites)
     
     def draw(self, screen, camera):
         """Draw NPC on screen"""
         screen_x, screen_y = camera.apply(self.world_x, self.world_y)
         
         if self.sprites:
-            sprite = self.sprites[self.current_frame % len(self.sprites)]
+            sprite = camera.zoom_sprite(self.sprites[self.current_frame % len(self.sprites)])
             
             # Flip sprite if facing left
             if not self.facing_right:
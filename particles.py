@@ -0,0 +1,225 @@
+# Pooled particle system
+#
+# Particles are not objects: each Emitter owns preallocated parallel NumPy
+# arrays for position, velocity, life and color, sized to its hard cap.
+# Live particles are kept packed at the front of the arrays. An update
+# integrates all of them with whole-array operations and then compacts the
+# survivors to the front (one fancy-indexing pass per array, only on ticks
+# where some particle died). Emitting past the cap drops the new particles
+# (counted in `dropped`); the cap can be lowered at runtime (`limit`)
+# without reallocating. Bursts still draw from the `random` module, which
+# input replays seed, so replays see the same particles.
+#
+# Drawing uses cached sprites, one small surface per (color, fade step);
+# sprite indices and positions are computed for all live particles at once
+# and every particle of an emitter goes to the screen in a single
+# Surface.blits() call.
+#
+# Emitters can be attached to an entity (anything with world_x / world_y)
+# and then emit from it while `emitting` is set, at `rate` particles per
+# second. Screen-space emitters ignore the camera (full-screen effects).
+
+import copy
+import math
+import random
+import time
+
+import numpy as np
+import pygame
+
+FADE_STEPS = 4   # Sprite alpha levels a particle fades through
+
+
+class Emitter:
+    """Fixed-capacity pool of particles sharing one look and motion model.
+
+    Speeds are in pixels per millisecond, gravity in pixels per ms^2,
+    lifetimes in milliseconds and angles in radians (0 = right, pi/2 = down).
+    """
+
+    def __init__(self, name, capacity, colors, size=3, lifetime=(400, 800), speed=(0.02, 0.08),
+                 angle=(0.0, 2 * math.pi), gravity=0.0, rate=0.0, screen_space=False):
+        self.name = name
+        self.capacity = capacity
+        self.limit = capacity   # Live particles allowed (at most the capacity)
+        self.lifetime = lifetime
+        self.speed = speed
+        self.angle = angle
+        self.gravity = gravity
+        self.rate = rate
+        self.screen_space = screen_space
+
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.life = np.zeros(capacity, np.float32)
+        self.max_life = np.zeros(capacity, np.float32)
+        self.color = np.zeros(capacity, np.uint8)
+        self.count = 0
+        self.dropped = 0
+
+        self.sprites = [sprite for color in colors for sprite in self._fade_sprites(color, size)]
+        self.colors = len(colors)
+        self.half = size // 2
+
+        self.entity = None
+        self.offset = (0, 0)
+        self.emitting = False
+        self.pending = 0.0  # Fractional particles carried over between ticks
+
+    @staticmethod
+    def _fade_sprites(color, size):
+        """Sprites of one color, from faintest to fully opaque"""
+        sprites = []
+        for step in range(FADE_STEPS):
+            sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+            alpha = 255 * (step + 1) // FADE_STEPS
+            pygame.draw.circle(sprite, (*color, alpha), (size / 2, size / 2), size / 2)
+            sprites.append(sprite)
+        return sprites
+
+    def attach(self, entity, offset_x=0, offset_y=0):
+        """Emit from entity.world_x / world_y plus the offset"""
+        self.entity = entity
+        self.offset = (offset_x, offset_y)
+
+    def clear(self):
+        self.count = 0
+        self.pending = 0.0
+
+    def burst(self, amount, x=None, y=None, spread_x=0, spread_y=0, angle=None):
+        """Emit `amount` particles around (x, y), or from the attached entity"""
+        if x is None:
+            x = self.entity.world_x + self.offset[0]
+            y = self.entity.world_y + self.offset[1]
+        first_angle, last_angle = angle or self.angle
+        slow, fast = self.speed
+        short, long = self.lifetime
+
+        free = max(0, self.limit - self.count)
+        if amount > free:
+            self.dropped += amount - free
+            amount = free
+        if not amount:
+            return
+        # Drawn per particle in the same order as always, so seeded runs repeat
+        uniform = random.uniform
+        rows = []
+        for _ in range(amount):
+            direction = uniform(first_angle, last_angle)
+            speed = uniform(slow, fast)
+            rows.append((x + uniform(-spread_x, spread_x), y + uniform(-spread_y, spread_y),
+                         math.cos(direction) * speed, math.sin(direction) * speed,
+                         uniform(short, long), random.randrange(self.colors)))
+        new_x, new_y, new_vx, new_vy, new_life, new_color = zip(*rows)
+        start, end = self.count, self.count + amount
+        self.x[start:end] = new_x
+        self.y[start:end] = new_y
+        self.vx[start:end] = new_vx
+        self.vy[start:end] = new_vy
+        self.life[start:end] = self.max_life[start:end] = new_life
+        self.color[start:end] = new_color
+        self.count = end
+
+    def update(self, delta_time):
+        """Emit from the attached entity and advance every live particle"""
+        if self.emitting and self.rate and self.entity is not None:
+            self.pending += self.rate * delta_time / 1000
+            amount = int(self.pending)
+            if amount:
+                self.pending -= amount
+                self.burst(amount)
+
+        count = self.count
+        if not count:
+            return
+        life = self.life[:count]
+        life -= delta_time
+        vy = self.vy[:count]
+        vy += self.gravity * delta_time
+        self.x[:count] += self.vx[:count] * delta_time
+        self.y[:count] += vy * delta_time
+
+        # Keep live particles packed at the front
+        alive = np.flatnonzero(life > 0)
+        if len(alive) < count:
+            count = len(alive)
+            for values in (self.x, self.y, self.vx, self.vy, self.life, self.max_life, self.color):
+                values[:count] = values[alive]
+            self.count = count
+
+    def frozen(self):
+        """Copy of the live particles that can be drawn while this emitter keeps updating"""
+        emitter = copy.copy(self)
+        count = self.count
+        emitter.x = self.x[:count].copy()
+        emitter.y = self.y[:count].copy()
+        emitter.life = self.life[:count].copy()
+        emitter.max_life = self.max_life[:count].copy()
+        emitter.color = self.color[:count].copy()
+        emitter.count = count
+        return emitter
+
+    def draw(self, screen, camera=None):
+        """Blit every live particle in one batch"""
+        if not self.count:
+            return
+        if self.screen_space or camera is None:
+            left = top = 0
+            zoom = 1.0
+        else:
+            left, top, zoom = camera.x, camera.y, camera.zoom
+        count = self.count
+        half = self.half
+        fade = (self.life[:count] * FADE_STEPS / (self.max_life[:count] + 1)).astype(np.intp)
+        indices = self.color[:count].astype(np.intp) * FADE_STEPS + fade
+        positions = zip(((self.x[:count] - left) * zoom - half).tolist(),
+                        ((self.y[:count] - top) * zoom - half).tolist())
+        screen.blits(list(zip(map(self.sprites.__getitem__, indices.tolist()), positions)), doreturn=False)
+
+
+class ParticleSystem:
+    """All emitters of a scene, updated and drawn together"""
+
+    def __init__(self):
+        self.emitters = []
+        self.update_ms = 0.0
+
+    def add(self, emitter):
+        self.emitters.append(emitter)
+        return emitter
+
+    def clear(self):
+        for emitter in self.emitters:
+            emitter.clear()
+
+    def count(self):
+        return sum(emitter.count for emitter in self.emitters)
+
+    def frozen(self):
+        """Copy of all live particles, for drawing on another thread"""
+        system = copy.copy(self)
+        system.emitters = [emitter.frozen() for emitter in self.emitters]
+        return system
+
+    def set_cap(self, fraction):
+        """Allow each emitter `fraction` of its capacity (live particles over it just expire)"""
+        for emitter in self.emitters:
+            emitter.limit = max(1, int(emitter.capacity * fraction))
+
+    def update(self, delta_time):
+        start = time.perf_counter()
+        for emitter in self.emitters:
+            emitter.update(delta_time)
+        self.update_ms = (time.perf_counter() - start) * 1000
+
+    def draw_world(self, screen, camera):
+        for emitter in self.emitters:
+            if not emitter.screen_space:
+                emitter.draw(screen, camera)
+
+    def draw_screen(self, screen):
+        for emitter in self.emitters:
+            if emitter.screen_space:
+                emitter.draw(screen)
@@ -0,0 +1,114 @@
+# Two-stage simulation / render pipeline
+#
+# Optional (ESCAPEN_PIPELINE=1). The main thread keeps input, the
+# simulation and the flip; a render thread composites the previous tick.
+# After each update the game publishes a snapshot of everything the next
+# tick would move (Game.frame_snapshot: copies of the camera, entities, task
+# lists, particles and dialogue, sharing sprites and caches) and goes on
+# with tick N+1 while the render thread composites tick N into the display
+# surface: background, sprites, lighting and HUD. That work is mostly pygame
+# blits and scaling, which run without the GIL, so the two stages overlap.
+#
+# SDL wants its video calls on the main thread (macOS and Windows insist),
+# so publish() first waits for the previous composite, flips it from the
+# main thread and only then hands over the new snapshot. The hand-off
+# replaces a single (sequence, snapshot) attribute, which is atomic; an
+# Event wakes the render thread and another one reports its frame done.
+#
+# The render stage only reads game state. What drawing changes (the fog of
+# war, reloading evicted task sprites, memory budget eviction) happens in
+# Game.prepare_draw() on the main thread, after wait() has let the render
+# thread finish the previous snapshot. Otherwise what the stages share is
+# either read-only for both (sprites, fonts, the map) or used by the render
+# stage alone (lighting, the HUD text cache, the display surface).
+# Lighting settings changed by the quality controller take effect at the
+# start of the next lightmap. The frame profiler follows the render thread
+# while the pipeline runs. The memory tracker is locked, since the render
+# thread tracks the mip levels it builds.
+#
+# Needs the surface backend: an SDL renderer (the texture backend) must be
+# used from the thread that created it.
+
+import os
+import threading
+import time
+
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+PIPELINE_ENABLED = os.environ.get("ESCAPEN_PIPELINE") == "1"
+STOP_TIMEOUT = 1.0     # Seconds to wait for the render thread to finish its frame
+
+
+class FramePipeline:
+    """Render thread drawing the snapshots published by the simulation"""
+
+    def __init__(self, render, present):
+        self.render = render            # Composites one snapshot (render thread)
+        self.present = present          # Shows the composite (main thread)
+        self.published = (0, None)      # (sequence, snapshot), replaced as a whole
+        self.sequence = 0
+        self.drawn = 0                  # Sequence of the last snapshot drawn
+        self.render_ms = 0.0
+        self.error = None
+        self.running = True
+        self.wake = threading.Event()
+        self.frame_done = threading.Event()
+        self.thread = threading.Thread(target=self._loop, name="render", daemon=True)
+        self.thread.start()
+        log.info("Render pipeline started")
+
+    @classmethod
+    def create(cls, backend, render):
+        """Start the render thread, or return None (draw on the main thread) if the backend can't use it"""
+        if backend.name != "surface":
+            log.warning("Render pipeline needs the surface backend, drawing on the main thread")
+            return None
+        return cls(render, backend.present)
+
+    def wait(self):
+        """Wait until the render thread is done with the last snapshot (and touches no shared state)"""
+        while self.drawn != self.sequence and self.error is None:
+            self.frame_done.wait()
+            self.frame_done.clear()
+
+    def publish(self, snapshot):
+        """Present the previous composite, then hand a snapshot to the render thread (main thread only)"""
+        self.wait()
+        if self.drawn and self.error is None:
+            self.present()
+        self.sequence += 1
+        self.published = (self.sequence, snapshot)
+        self.wake.set()
+
+    def _loop(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if not self.running:
+                break
+            sequence, snapshot = self.published
+            if sequence == self.drawn:
+                continue
+            start = time.perf_counter()
+            try:
+                self.render(snapshot)
+            except Exception as e:
+                log.error("Render thread failed, drawing on the main thread: %s", e)
+                self.error = e
+                self.frame_done.set()
+                return
+            self.render_ms = (time.perf_counter() - start) * 1000
+            self.drawn = sequence
+            self.frame_done.set()
+
+    def stop(self):
+        """Let the render thread finish its frame and exit"""
+        self.running = False
+        self.wake.set()
+        self.thread.join(timeout=STOP_TIMEOUT)
+        log.info("Render pipeline stopped")
+
+    def stats_line(self, sim_ms):
+        return "pipeline sim %.1f ms, render %.1f ms" % (sim_ms, self.render_ms)
@@ -0,0 +1,136 @@
+# Adaptive quality tiers
+#
+# QualityController watches the rolling frame time and steps through
+# QUALITY_TIERS (best first) to hold the FPS target: one tier down when the
+# average over a full window exceeds the frame budget by DEGRADE_MARGIN,
+# one tier up when it stays under RESTORE_MARGIN of the budget for a longer
+# window. Hysteresis against oscillation:
+#
+#   - the two thresholds are far apart, so a frame time between them keeps
+#     the current tier;
+#   - after any change the samples are dropped and the controller waits a
+#     full window before judging the new tier;
+#   - a restore that has to be undone within the restore window doubles the
+#     time the controller waits before trying that tier again.
+#
+# Frame times are the work time of a frame (FrameDriver.work_ms: the frame
+# function without the idle wait until the next frame), not the frame
+# length: at the FPS cap every frame is exactly one budget long, which would
+# hide the headroom.
+#
+# ESCAPEN_QUALITY=<tier name> pins a tier and disables the controller.
+# Tiers change particle caps and entity update rates based on wall-clock
+# time, so while input is recorded or replayed (input_replay) the tier is
+# pinned too: to ESCAPEN_QUALITY if set, else the best tier. Record and
+# replay a session with the same ESCAPEN_QUALITY.
+
+import os
+from collections import deque
+
+from constants import FPS
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+QUALITY_OVERRIDE = os.environ.get("ESCAPEN_QUALITY")
+QUALITY_WINDOW = 90        # Frames averaged before degrading
+RESTORE_WINDOW = 300       # Frames of headroom needed before restoring
+DEGRADE_MARGIN = 1.1       # Degrade above 110% of the frame budget
+RESTORE_MARGIN = 0.6       # Restore below 60% of the frame budget
+MAX_BACKOFF = 8            # Largest multiplier of the restore window
+
+
+class QualityTier:
+    """Settings of one quality level"""
+
+    __slots__ = ("name", "light_steps", "render_scale", "hud_interval", "lod_margin", "lod_interval",
+                 "particle_cap")
+
+    def __init__(self, name, light_steps, render_scale, hud_interval, lod_margin, lod_interval, particle_cap):
+        self.name = name
+        self.light_steps = light_steps      # Falloff bands per light (None = one per lightmap pixel)
+        self.render_scale = render_scale    # Lightmap is 1/render_scale of the screen
+        self.hud_interval = hud_interval    # Frames between HUD text refreshes
+        self.lod_margin = lod_margin        # World pixels around the view updated at the reduced rate
+        self.lod_interval = lod_interval    # Ticks between reduced-rate entity updates
+        self.particle_cap = particle_cap    # Fraction of each emitter's capacity in use
+
+
+QUALITY_TIERS = (
+    QualityTier("high", None, 4, 1, 600, 4, 1.0),
+    QualityTier("medium", 24, 6, 3, 300, 6, 0.6),
+    QualityTier("low", 12, 8, 6, 0, 8, 0.3),
+)
+
+
+class QualityController:
+    """Chooses the quality tier from recent frame times"""
+
+    def __init__(self, tiers=QUALITY_TIERS, target_fps=FPS, window=QUALITY_WINDOW,
+                 restore_window=RESTORE_WINDOW, override=QUALITY_OVERRIDE):
+        self.tiers = tiers
+        self.budget = 1000 / target_fps
+        self.window = window
+        self.restore_window = restore_window
+        self.samples = deque(maxlen=restore_window)
+        self.index = 0
+        self.backoff = [1] * len(tiers)     # Restore window multiplier per tier
+        self.frames_since_change = 0
+        self.restored = False               # Last change was a restore
+        self.pinned = False
+        if override:
+            names = [tier.name for tier in tiers]
+            if override in names:
+                self.index = names.index(override)
+                self.pinned = True
+            else:
+                log.warning("Unknown quality tier %r (expected one of %s)", override, ", ".join(names))
+
+    @property
+    def tier(self):
+        return self.tiers[self.index]
+
+    def pin(self, reason):
+        """Keep the current tier from now on"""
+        if not self.pinned:
+            self.pinned = True
+            log.info("Quality pinned to %s (%s)", self.tier.name, reason)
+
+    def _average(self, count):
+        recent = list(self.samples)[-count:]
+        return sum(recent) / len(recent)
+
+    def tick(self, frame_ms):
+        """Record a frame; returns the new tier when it changes, else None"""
+        if self.pinned:
+            return None
+        self.samples.append(frame_ms)
+        self.frames_since_change += 1
+        count = len(self.samples)
+
+        if count >= self.window and self.index + 1 < len(self.tiers) and \
+                self._average(self.window) > self.budget * DEGRADE_MARGIN:
+            if self.restored and self.frames_since_change < self.restore_window:
+                # The tier we just restored could not hold the target: wait longer next time
+                self.backoff[self.index] = min(MAX_BACKOFF, self.backoff[self.index] * 2)
+            return self._change(self.index + 1)
+
+        if self.index and count >= self.restore_window and \
+                self.frames_since_change >= self.restore_window * self.backoff[self.index - 1] and \
+                self._average(self.restore_window) < self.budget * RESTORE_MARGIN:
+            return self._change(self.index - 1)
+        return None
+
+    def _change(self, index):
+        log.info("Quality %s -> %s (%.1f ms average, budget %.1f ms)", self.tier.name,
+                 self.tiers[index].name, self._average(self.window), self.budget)
+        self.restored = index < self.index
+        self.index = index
+        self.samples.clear()
+        self.frames_since_change = 0
+        return self.tier
+
+    def status_line(self):
+        recent = self._average(self.window) if self.samples else 0.0
+        mode = "pinned" if self.pinned else "auto"
+        return "quality %s (%s), %.1f / %.1f ms" % (self.tier.name, mode, recent, self.budget)
@@ -0,0 +1,178 @@
+# Render backends
+#
+# A game frame is drawn in layers: background, world sprites, lighting,
+# then HUD. The backend decides how those layers reach the window:
+#
+#   SurfaceBackend  software blits into the display surface (the default,
+#                   and what every scene did before backends existed)
+#   TextureBackend  SDL's renderer through pygame._sdl2.video. The map is a
+#                   static texture drawn through the camera's source rect
+#                   (zoom is renderer scaling, no mip levels needed), and
+#                   the lightmap is uploaded at its low resolution and
+#                   stretched over the frame with a modulate blend, with
+#                   the flicker gain as its color modulation. Sprites and
+#                   HUD are still drawn with Surface calls into a
+#                   transparent layer, which is uploaded and composited
+#                   once below the lighting and once above it.
+#
+# Both expose `screen` (the Surface that sprites and HUD are drawn into),
+# so drawing code outside the game loop does not change. The texture
+# backend also sets a hidden display mode: convert() and convert_alpha()
+# need one, and assets keep the display pixel format.
+#
+# Selected at startup with ESCAPEN_RENDERER=surface|texture; the texture
+# backend works with SDL's software renderer too (SDL_VIDEODRIVER=dummy),
+# and falls back to the surface backend if it cannot be created.
+
+import math
+import os
+
+import pygame
+
+from constants import BLACK
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+RENDER_BACKEND = os.environ.get("ESCAPEN_RENDERER", "surface")
+
+BLEND_ALPHA = 1      # SDL_BLENDMODE_BLEND
+BLEND_MODULATE = 4   # SDL_BLENDMODE_MOD
+
+
+class SurfaceBackend:
+    """Software blits into the display surface"""
+
+    name = "surface"
+
+    def __init__(self, size, title):
+        self.screen = pygame.display.set_mode(size)
+        pygame.display.set_caption(title)
+
+    def begin_frame(self):
+        self.screen.fill(BLACK)
+
+    def draw_background(self, mips, camera):
+        mips.draw(self.screen, camera)
+
+    def draw_lighting(self, lighting, camera):
+        lighting.apply(self.screen, camera)
+
+    def present(self):
+        pygame.display.flip()
+
+    def close(self):
+        pass
+
+
+class TextureBackend:
+    """SDL renderer: background and lighting as textures, sprites and HUD as an uploaded layer"""
+
+    name = "texture"
+
+    def __init__(self, size, title):
+        from pygame._sdl2.video import Window, Renderer, Texture
+        self.texture_class = Texture
+
+        # Only for pixel formats (convert / convert_alpha); never shown
+        pygame.display.set_mode(size, pygame.HIDDEN)
+        self.window = Window(title, size)
+        self.renderer = Renderer(self.window)
+        self.size = size
+
+        self.screen = pygame.Surface(size, pygame.SRCALPHA)
+        self.layers = [self._streaming(size, BLEND_ALPHA), self._streaming(size, BLEND_ALPHA)]
+        self.layer_index = 0
+        self.layer_dirty = False
+        self.backgrounds = {}   # id(surface) -> (surface, texture)
+        self.lightmap = None
+        log.info("Texture render backend ready (%dx%d)", *size)
+
+    def _streaming(self, size, blend_mode):
+        texture = self.texture_class(self.renderer, size, streaming=True)
+        texture.blend_mode = blend_mode
+        return texture
+
+    def begin_frame(self):
+        self.renderer.draw_color = (*BLACK, 255)
+        self.renderer.clear()
+        self.screen.fill((0, 0, 0, 0))
+        self.layer_index = 0
+        self.layer_dirty = True
+
+    def _flush_layer(self):
+        """Composite what was drawn into `screen` so far and start an empty layer"""
+        if not self.layer_dirty:
+            return
+        texture = self.layers[self.layer_index]
+        texture.update(self.screen)
+        texture.draw()
+        self.layer_index = (self.layer_index + 1) % len(self.layers)
+        self.screen.fill((0, 0, 0, 0))
+        self.layer_dirty = False
+
+    def _background_texture(self, surface):
+        entry = self.backgrounds.get(id(surface))
+        if entry is None or entry[0] is not surface:
+            entry = (surface, self.texture_class.from_surface(self.renderer, surface))
+            self.backgrounds[id(surface)] = entry
+            log.info("Background uploaded as a %dx%d texture", *surface.get_size())
+        return entry[1]
+
+    def draw_background(self, mips, camera):
+        surface = mips.surface
+        width, height = surface.get_size()
+        left = max(0, math.floor(camera.x))
+        top = max(0, math.floor(camera.y))
+        right = min(width, math.ceil(camera.x + camera.view_width))
+        bottom = min(height, math.ceil(camera.y + camera.view_height))
+        if right <= left or bottom <= top:
+            return
+        screen_x, screen_y = camera.apply(left, top)
+        self._background_texture(surface).draw(
+            srcrect=(left, top, right - left, bottom - top),
+            dstrect=(round(screen_x), round(screen_y),
+                     round(camera.scale(right - left)), round(camera.scale(bottom - top))))
+
+    def draw_lighting(self, lighting, camera):
+        # Sprites drawn so far are lit; everything drawn after this is not
+        self._flush_layer()
+        self.layer_dirty = True
+        lighting.build(camera)
+        if self.lightmap is None or (self.lightmap.width, self.lightmap.height) != lighting.lightmap.get_size():
+            # Filtered stretch, like the smoothscale of the surface path (SDL reads the hint per texture)
+            quality = os.environ.get("SDL_RENDER_SCALE_QUALITY")
+            os.environ["SDL_RENDER_SCALE_QUALITY"] = "linear"
+            self.lightmap = self._streaming(lighting.lightmap.get_size(), BLEND_MODULATE)
+            if quality is None:
+                del os.environ["SDL_RENDER_SCALE_QUALITY"]
+            else:
+                os.environ["SDL_RENDER_SCALE_QUALITY"] = quality
+        self.lightmap.update(lighting.lightmap)
+        level = lighting.level
+        self.lightmap.color = (level, level, level)
+        self.lightmap.draw(dstrect=(0, 0, *self.size))
+
+    def present(self):
+        self._flush_layer()
+        self.renderer.present()
+
+    def close(self):
+        self.backgrounds.clear()
+        self.layers = []
+        self.lightmap = None
+        self.renderer = None
+        self.window.destroy()
+
+
+def create_backend(size, title, name=None):
+    """Backend selected by `name` (default: ESCAPEN_RENDERER), falling back to surfaces"""
+    name = name or RENDER_BACKEND
+    if name == "texture":
+        try:
+            return TextureBackend(size, title)
+        except (ImportError, pygame.error, RuntimeError) as e:  # _sdl2 raises its own RuntimeError
+            log.warning("Texture render backend unavailable, using surfaces: %s", e)
+    elif name != "surface":
+        log.warning("Unknown render backend %r, using surfaces", name)
+    return SurfaceBackend(size, title)
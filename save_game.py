@@ -0,0 +1,119 @@
+# Save-game snapshots
+#
+# Only mutable runtime state (task statuses, users, money, timers, positions)
+# is saved, never the static task definitions in tasks.json. The main thread
+# just collects a small dict of plain values; JSON encoding and disk I/O
+# happen on a background thread, and every file is written to a temp file
+# and atomically renamed so a crash can never leave a half-written save.
+
+import json
+import os
+import tempfile
+import threading
+
+from game_log import get_logger
+
+log = get_logger(__name__)
+
+SAVE_VERSION = 1
+
+
+def atomic_write(path, data):
+    """Write bytes to path via a temp file in the same directory plus rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def encode_snapshot(snapshot):
+    """Serialize a snapshot dict to compact JSON bytes"""
+    payload = {"version": SAVE_VERSION, "state": snapshot}
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def load_snapshot(path):
+    """Load a snapshot written by SaveManager, or None if missing/invalid"""
+    try:
+        with open(path, "rb") as file:
+            payload = json.loads(file.read().decode("utf-8"))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        log.error("Could not read save %s: %s", path, e)
+        return None
+
+    if payload.get("version") != SAVE_VERSION:
+        log.warning("Ignoring save %s with version %s", path, payload.get("version"))
+        return None
+    return payload.get("state")
+
+
+class SaveManager:
+    """Writes snapshots on a background thread.
+
+    Only the newest pending snapshot is kept: if the writer is still busy
+    when another save is requested, the older pending one is replaced, so
+    the main loop never blocks and never builds up a backlog.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._pending = None
+        self._condition = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self.saves_written = 0
+        self._thread = threading.Thread(target=self._worker, name="save-writer", daemon=True)
+        self._thread.start()
+
+    def request_save(self, snapshot):
+        """Queue a snapshot for writing; returns immediately"""
+        with self._condition:
+            self._pending = snapshot
+            self._condition.notify()
+
+    def flush(self, timeout=5.0):
+        """Block until all queued snapshots are written (used on shutdown)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending is None and not self._busy, timeout)
+
+    def close(self, timeout=5.0):
+        """Write any pending snapshot and stop the writer thread"""
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                snapshot = self._pending
+                self._pending = None
+                self._busy = True
+
+            try:
+                atomic_write(self.path, encode_snapshot(snapshot))
+                self.saves_written += 1
+                log.debug("Snapshot saved to %s", self.path)
+            except Exception as e:
+                log.error("Could not write save %s: %s", self.path, e)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
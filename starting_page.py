@@ -1,21 +1,29 @@
 import pygame
 import sys
 from constants import WIDTH, HEIGHT
+from frame_driver import FrameDriver
+from game_log import get_logger
+import memory_tracker
+from memory_tracker import track
+
+log = get_logger(__name__)
 
 class StartingPage:
     def __init__(self):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Escapist Game")
-        self.clock = pygame.time.Clock()
+        self.driver = FrameDriver(60, "start")
+        self.result = "quit"
+        memory_tracker.set_scene("start")
         
         # Load background image
         try:
             self.background = pygame.image.load("starting.png")
             # Scale to fit screen if needed
             self.background = pygame.transform.scale(self.background, (WIDTH, HEIGHT))
-            print("Starting background loaded successfully")
+            log.info("Starting background loaded successfully")
         except pygame.error as e:
-            print(f"Could not load starting.png: {e}")
+            log.error("Could not load starting.png: %s", e)
             # Create a fallback background
             self.background = pygame.Surface((WIDTH, HEIGHT))
             self.background.fill((50, 50, 50))
@@ -23,9 +31,9 @@ class StartingPage:
         # Load button image for reference (but make it invisible)
         try:
             self.button_image = pygame.image.load("button.png")
-            print("Button image loaded successfully")
+            log.info("Button image loaded successfully")
         except pygame.error as e:
-            print(f"Could not load button.png: {e}")
+            log.error("Could not load button.png: %s", e)
             # Create a fallback button
             self.button_image = pygame.Surface((200, 80))
             self.button_image.fill((100, 100, 100))
@@ -33,6 +41,8 @@ class StartingPage:
             text = font.render("START", True, (255, 255, 255))
             text_rect = text.get_rect(center=self.button_image.get_rect().center)
             self.button_image.blit(text, text_rect)
+        track(self.background, "StartingPage", "background")
+        track(self.button_image, "StartingPage", "button_image")
         
         # Button properties (invisible clickable area)
         # Create rectangle button area: from (645, 459) to (1288, 704)
@@ -43,6 +53,7 @@ class StartingPage:
         # Create invisible button surface
         self.invisible_button = pygame.Surface((button_width, button_height))
         self.invisible_button.set_alpha(0)  # Make it completely transparent
+        track(self.invisible_button, "StartingPage", "invisible_button")
         
         # Button state
         self.button_hovered = False
@@ -77,18 +88,18 @@ class StartingPage:
         # Update display
         pygame.display.flip()
     
+    def frame(self, delta_time):
+        """One frame of the starting page, called by the frame driver; returns False to stop"""
+        result = self.handle_events()
+        
+        if result == "quit" or result == "start_game":
+            self.result = result
+            return False
+        
+        self.draw()
+        return True
+    
     def run(self):
         """Run the starting page loop"""
-        running = True
-        while running:
-            result = self.handle_events()
-            
-            if result == "quit":
-                return "quit"
-            elif result == "start_game":
-                return "start_game"
-            
-            self.draw()
-            self.clock.tick(60)
-        
-        return "quit"
\ No newline at end of file
+        self.driver.run(self.frame)
+        return self.result
\ No newline at end of file
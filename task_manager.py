@@ -15,6 +15,13 @@ import pygame
 import json
 import os
 from constants import WHITE, GREEN, GOLD, GRAY, LIGHT_GRAY
+from save_game import atomic_write
+from data_cache import load_tasks_data
+from game_log import get_logger
+from memory_tracker import track, untrack, touch
+from asset_pipeline import optimize, solid_panel
+
+log = get_logger(__name__)
 
 class TaskStatus:
     """Константы статусов заданий"""
@@ -33,6 +40,32 @@ class Task:
             task_data (dict): Данные задания из JSON
         """
         self.id = task_data["id"]
+        self.status = task_data["status"]
+        self.interaction_radius = 100  # Увеличиваем радиус взаимодействия
+        self.apply_definition(task_data)
+        
+        # Спрайты загружаются лениво: неактивное задание не тратит
+        # ни памяти на пиксели, ни времени на декодирование
+        self.sprite_before = None
+        self.sprite_after = None
+        self.current_sprite = None
+        self.sprites_loaded = False
+        if self.status != TaskStatus.INACTIVE:
+            self.load_sprites()
+    
+    def apply_definition(self, task_data):
+        """
+        Применение статических полей задания из JSON (статус не меняется)
+        
+        Args:
+            task_data (dict): Данные задания из JSON
+            
+        Returns:
+            bool: True если изменились размер или пути спрайтов
+        """
+        old_visuals = (getattr(self, "sprite_before_path", None), getattr(self, "sprite_after_path", None),
+                       getattr(self, "width", None), getattr(self, "height", None))
+        
         self.title = task_data["title"]
         self.description = task_data["description"]
         self.sprite_before_path = task_data["sprite_before"]
@@ -43,31 +76,32 @@ class Task:
         self.height = task_data["height"]
         self.reward_users = task_data["reward_users"]
         self.reward_money = task_data["reward_money"]
-        self.status = task_data["status"]
         self.is_social = task_data.get("is_social", False)
         
-        # Загрузка спрайтов
-        self.sprite_before = None
-        self.sprite_after = None
-        self.current_sprite = None
-        self.load_sprites()
-        
         # Увеличиваем область взаимодействия для удобства
-        self.interaction_radius = 100  # Увеличиваем радиус взаимодействия
         self.rect = pygame.Rect(
             self.world_x - self.interaction_radius,
             self.world_y - self.interaction_radius,
             self.width + self.interaction_radius * 2,
             self.height + self.interaction_radius * 2
         )
+        
+        return old_visuals != (self.sprite_before_path, self.sprite_after_path, self.width, self.height)
+    
+    def reload_sprites(self):
+        """Перезагрузка спрайтов, если они уже были загружены"""
+        if self.sprites_loaded:
+            self.load_sprites()
     
     def load_sprites(self):
         """Загрузка спрайтов для задания"""
+        self.sprites_loaded = True
         try:
             # Загружаем спрайт "до выполнения"
             if os.path.exists(self.sprite_before_path):
                 self.sprite_before = pygame.image.load(self.sprite_before_path)
                 self.sprite_before = pygame.transform.scale(self.sprite_before, (self.width, self.height))
+                self.sprite_before = optimize(self.sprite_before, self.sprite_before_path)
             else:
                 # Создаем заглушку если файл не найден
                 self.sprite_before = pygame.Surface((self.width, self.height))
@@ -77,25 +111,49 @@ class Task:
             if os.path.exists(self.sprite_after_path):
                 self.sprite_after = pygame.image.load(self.sprite_after_path)
                 self.sprite_after = pygame.transform.scale(self.sprite_after, (self.width, self.height))
+                self.sprite_after = optimize(self.sprite_after, self.sprite_after_path)
             else:
                 # Создаем заглушку если файл не найден
                 self.sprite_after = pygame.Surface((self.width, self.height))
                 self.sprite_after.fill((100, 150, 100))  # Серо-зеленый
                 
             # Устанавливаем текущий спрайт в зависимости от статуса
+            self.track_sprites()
             self.update_current_sprite()
             
         except pygame.error as e:
-            print(f"Ошибка загрузки спрайтов для задания {self.id}: {e}")
+            log.error("Ошибка загрузки спрайтов для задания %s: %s", self.id, e)
             # Создаем заглушки
             self.sprite_before = pygame.Surface((self.width, self.height))
             self.sprite_before.fill((100, 100, 150))
             self.sprite_after = pygame.Surface((self.width, self.height))
             self.sprite_after.fill((100, 150, 100))
+            self.track_sprites()
             self.update_current_sprite()
     
+    def track_sprites(self):
+        """Учет спрайтов в бюджете памяти; при превышении их можно выгрузить"""
+        track(self.sprite_before, f"Task {self.id}", "sprite_before", self.unload_sprites)
+        track(self.sprite_after, f"Task {self.id}", "sprite_after", self.unload_sprites)
+    
+    def unload_sprites(self):
+        """Выгрузка спрайтов; они загрузятся снова, когда задание попадет на экран"""
+        untrack(self.sprite_before)
+        untrack(self.sprite_after)
+        self.sprite_before = None
+        self.sprite_after = None
+        self.current_sprite = None
+        self.sprites_loaded = False
+    
     def update_current_sprite(self):
         """Обновление текущего спрайта в зависимости от статуса"""
+        if self.status == TaskStatus.INACTIVE:
+            self.current_sprite = None
+            return
+        if not self.sprites_loaded:
+            # Первая активация - загружаем спрайты (load_sprites сам вызовет нас снова)
+            self.load_sprites()
+            return
         if self.status == TaskStatus.COMPLETED:
             self.current_sprite = self.sprite_after
         else:
@@ -112,9 +170,9 @@ class Task:
             old_status = self.status
             self.status = new_status
             self.update_current_sprite()
-            print(f"Задание '{self.title}' изменило статус: {old_status} -> {new_status}")
+            log.debug("Задание '%s' изменило статус: %s -> %s", self.title, old_status, new_status)
         else:
-            print(f"Неизвестный статус: {new_status}")
+            log.warning("Неизвестный статус: %s", new_status)
     
     def draw(self, screen, camera):
         """
@@ -173,7 +231,7 @@ class Task:
         # Проверяем, находится ли игрок в радиусе взаимодействия
         can_interact = distance <= self.interaction_radius
         if can_interact:
-            print(f"Можно взаимодействовать с заданием '{self.title}' (дистанция: {int(distance)})")
+            log.debug("Можно взаимодействовать с заданием '%s' (дистанция: %d)", self.title, distance)
         return can_interact
 
 class TaskManager:
@@ -211,8 +269,8 @@ class TaskManager:
     def load_tasks(self):
         """Загрузка заданий из JSON файла"""
         try:
-            with open(self.tasks_file, 'r', encoding='utf-8') as file:
-                data = json.load(file)
+            # Проверка по схеме и кэш скомпилированных данных
+            data = load_tasks_data(self.tasks_file)
                 
             for task_data in data["tasks"]:
                 task = Task(task_data)
@@ -224,14 +282,16 @@ class TaskManager:
                 elif task.status == TaskStatus.COMPLETED:
                     self.completed_tasks.append(task.id)
             
-            print(f"Загружено {len(self.tasks)} заданий из {self.tasks_file}")
+            log.info("Загружено %d заданий из %s", len(self.tasks), self.tasks_file)
             
         except FileNotFoundError:
-            print(f"Файл заданий {self.tasks_file} не найден!")
+            log.error("Файл заданий %s не найден!", self.tasks_file)
         except json.JSONDecodeError as e:
-            print(f"Ошибка парсинга JSON: {e}")
+            log.error("Ошибка парсинга JSON: %s", e)
+        except ValueError as e:
+            log.error("Ошибка схемы заданий: %s", e)
         except Exception as e:
-            print(f"Ошибка загрузки заданий: {e}")
+            log.error("Ошибка загрузки заданий: %s", e)
     
     def save_tasks(self):
         """Сохранение текущего состояния заданий в JSON"""
@@ -255,15 +315,132 @@ class TaskManager:
                     "reward_money": task.reward_money,
                     "status": task.status
                 }
+                if task.is_social:
+                    task_data["is_social"] = True
                 tasks_data["tasks"].append(task_data)
             
-            with open(self.tasks_file, 'w', encoding='utf-8') as file:
-                json.dump(tasks_data, file, ensure_ascii=False, indent=2)
+            # Пишем во временный файл и переименовываем, чтобы не повредить tasks.json
+            data = json.dumps(tasks_data, ensure_ascii=False, indent=2)
+            atomic_write(self.tasks_file, data.encode('utf-8'))
             
-            print(f"Состояние заданий сохранено в {self.tasks_file}")
+            log.info("Состояние заданий сохранено в %s", self.tasks_file)
             
         except Exception as e:
-            print(f"Ошибка сохранения заданий: {e}")
+            log.error("Ошибка сохранения заданий: %s", e)
+    
+    def get_runtime_state(self):
+        """
+        Получение изменяемого состояния заданий для сохранения
+        
+        Returns:
+            dict: Статусы заданий и таймеры социальных заданий
+        """
+        return {
+            "statuses": {task.id: task.status for task in self.tasks.values()},
+            "active_tasks": list(self.active_tasks),
+            "completed_tasks": list(self.completed_tasks),
+            "social_timer": self.social_timer,
+            "social_warning_timer": self.social_warning_timer,
+            "social_tasks_active": self.social_tasks_active,
+            "social_warning_active": self.social_warning_active
+        }
+    
+    def apply_runtime_state(self, state):
+        """
+        Восстановление состояния заданий из сохранения
+        
+        Args:
+            state (dict): Данные из get_runtime_state()
+        """
+        for task_id, status in state.get("statuses", {}).items():
+            if task_id in self.tasks:
+                self.tasks[task_id].set_status(status)
+        
+        # Задания, которых больше нет в tasks.json, пропускаем
+        self.active_tasks = [t for t in state.get("active_tasks", []) if t in self.tasks]
+        self.completed_tasks = [t for t in state.get("completed_tasks", []) if t in self.tasks]
+        self.social_timer = state.get("social_timer", 0)
+        self.social_warning_timer = state.get("social_warning_timer", 0)
+        self.social_tasks_active = state.get("social_tasks_active", False)
+        self.social_warning_active = state.get("social_warning_active", False)
+    
+    def reload_definitions(self):
+        """
+        Горячая перезагрузка tasks.json с сохранением статусов заданий
+        
+        Перестраиваются только изменившиеся задания; новые задания
+        добавляются, удаленные - убираются из всех списков.
+        
+        Returns:
+            list: ID заданий, которые были изменены, добавлены или удалены
+        """
+        try:
+            data = load_tasks_data(self.tasks_file)
+        except (OSError, ValueError) as e:
+            # Во время редактирования файл может быть временно невалидным
+            log.warning("Не удалось перезагрузить %s: %s", self.tasks_file, e)
+            return []
+        
+        changed = []
+        new_ids = set()
+        for task_data in data["tasks"]:
+            task_id = task_data["id"]
+            new_ids.add(task_id)
+            task = self.tasks.get(task_id)
+            if task is None:
+                task = Task(task_data)
+                self.tasks[task_id] = task
+                if task.status == TaskStatus.ACTIVE:
+                    self.active_tasks.append(task_id)
+                elif task.status == TaskStatus.COMPLETED:
+                    self.completed_tasks.append(task_id)
+                changed.append(task_id)
+            elif {k: v for k, v in task_data.items() if k != "status"} != self._task_definition(task):
+                if task.apply_definition(task_data):
+                    task.reload_sprites()
+                changed.append(task_id)
+        
+        for task_id in [t for t in self.tasks if t not in new_ids]:
+            del self.tasks[task_id]
+            if task_id in self.active_tasks:
+                self.active_tasks.remove(task_id)
+            if task_id in self.completed_tasks:
+                self.completed_tasks.remove(task_id)
+            changed.append(task_id)
+        
+        return changed
+    
+    def reload_sprite_file(self, path):
+        """
+        Перезагрузка спрайтов заданий, которые используют указанный файл
+        
+        Returns:
+            list: ID заданий, спрайты которых были перезагружены
+        """
+        path = os.path.normpath(path)
+        reloaded = []
+        for task in self.tasks.values():
+            if path in (os.path.normpath(task.sprite_before_path), os.path.normpath(task.sprite_after_path)):
+                task.reload_sprites()
+                reloaded.append(task.id)
+        return reloaded
+    
+    def _task_definition(self, task):
+        """Статические поля задания в формате tasks.json (без статуса)"""
+        return {
+            "id": task.id,
+            "title": task.title,
+            "description": task.description,
+            "sprite_before": task.sprite_before_path,
+            "sprite_after": task.sprite_after_path,
+            "world_x": task.world_x,
+            "world_y": task.world_y,
+            "width": task.width,
+            "height": task.height,
+            "reward_users": task.reward_users,
+            "reward_money": task.reward_money,
+            "is_social": task.is_social
+        }
     
     def activate_task(self, task_id):
         """
@@ -276,7 +453,7 @@ class TaskManager:
             bool: True если задание успешно активировано
         """
         if task_id not in self.tasks:
-            print(f"Задание с ID '{task_id}' не найдено!")
+            log.warning("Задание с ID '%s' не найдено!", task_id)
             return False
         
         task = self.tasks[task_id]
@@ -284,13 +461,13 @@ class TaskManager:
         if task.status == TaskStatus.INACTIVE:
             task.set_status(TaskStatus.ACTIVE)
             self.active_tasks.append(task_id)
-            print(f"Задание '{task.title}' активировано!")
+            log.info("Задание '%s' активировано!", task.title)
             return True
         elif task.status == TaskStatus.ACTIVE:
-            print(f"Задание '{task.title}' уже активно!")
+            log.debug("Задание '%s' уже активно!", task.title)
             return False
         elif task.status == TaskStatus.COMPLETED:
-            print(f"Задание '{task.title}' уже завершено!")
+            log.debug("Задание '%s' уже завершено!", task.title)
             return False
     
     def complete_task(self, task_id):
@@ -304,11 +481,11 @@ class TaskManager:
             dict: Награды за задание {"users": int, "money": int} или None
         """
         if task_id not in self.tasks:
-            print(f"Задание с ID '{task_id}' не найдено!")
+            log.warning("Задание с ID '%s' не найдено!", task_id)
             return None
         
         task = self.tasks[task_id]
-        print(f"Попытка выполнить задание: {task.title} (статус: {task.status})")
+        log.debug("Попытка выполнить задание: %s (статус: %s)", task.title, task.status)
         
         if task.status == TaskStatus.ACTIVE:
             task.set_status(TaskStatus.COMPLETED)
@@ -319,12 +496,12 @@ class TaskManager:
             if task_id not in self.completed_tasks:
                 self.completed_tasks.append(task_id)
             
-            print(f"Задание '{task.title}' выполнено!")
-            print(f"Награды: Пользователи: {task.reward_users}, Деньги: {task.reward_money}")
+            log.info("Задание '%s' выполнено!", task.title)
+            log.debug("Награды: Пользователи: %d, Деньги: %d", task.reward_users, task.reward_money)
             
             # Если это социальное задание, проверяем все ли выполнены
             if task.is_social and self.check_all_social_completed():
-                print("Все социальные задания выполнены!")
+                log.info("Все социальные задания выполнены!")
                 self.social_warning_active = False
                 self.social_tasks_active = False
                 self.social_timer = 0
@@ -334,7 +511,7 @@ class TaskManager:
                 "money": task.reward_money
             }
         else:
-            print(f"Нельзя выполнить задание '{task.title}' - оно не активно!")
+            log.debug("Нельзя выполнить задание '%s' - оно не активно!", task.title)
             return None
     
     def get_task_status(self, task_id):
@@ -369,6 +546,23 @@ class TaskManager:
         """
         return [self.tasks[task_id] for task_id in self.completed_tasks if task_id in self.tasks]
     
+    def prepare_visible(self, camera, screen_width, screen_height):
+        """
+        Подготовка видимых заданий к отрисовке (в основном потоке, до draw_tasks)
+        
+        Выгруженные из-за бюджета памяти спрайты загружаем снова, когда задание видно;
+        спрайты видимых заданий помечаются как используемые, чтобы их не выгрузили.
+        Сама отрисовка (возможно, в потоке рендера) спрайты только читает.
+        """
+        for task in self.tasks.values():
+            if task.status in [TaskStatus.ACTIVE, TaskStatus.COMPLETED]:
+                screen_x, screen_y = camera.apply(task.world_x, task.world_y)
+                if (-camera.scale(task.width) < screen_x < screen_width
+                        and -camera.scale(task.height) < screen_y < screen_height):
+                    if not task.sprites_loaded:
+                        task.update_current_sprite()
+                    touch(task.current_sprite)
+    
     def draw_tasks(self, screen, camera):
         """
         Отрисовка всех активных и завершенных заданий на карте
@@ -382,16 +576,16 @@ class TaskManager:
                 # Получаем экранные координаты
                 screen_x, screen_y = camera.apply(task.world_x, task.world_y)
                 
-                # Отрисовываем спрайт
+                # Отрисовываем спрайт (с учетом масштаба камеры)
                 if task.current_sprite:
-                    screen.blit(task.current_sprite, (screen_x, screen_y))
+                    screen.blit(camera.zoom_sprite(task.current_sprite), (screen_x, screen_y))
                 
                 # Если задание активно, показываем область взаимодействия
                 if task.status == TaskStatus.ACTIVE:
                     pygame.draw.circle(screen, (255, 255, 0, 128),
-                                     (int(screen_x + task.width/2),
-                                      int(screen_y + task.height/2)),
-                                     task.interaction_radius, 2)
+                                     (int(screen_x + camera.scale(task.width / 2)),
+                                      int(screen_y + camera.scale(task.height / 2))),
+                                     int(camera.scale(task.interaction_radius)), 2)
     
     def draw_tasks_ui(self, screen):
         """
@@ -410,10 +604,8 @@ class TaskManager:
         task_height = 60
         panel_height = len(self.active_tasks) * task_height + 40
         
-        # Фон панели
-        panel_surface = pygame.Surface((panel_width, panel_height), pygame.SRCALPHA)
-        panel_surface.fill((0, 0, 0, 180))  # Полупрозрачный черный
-        screen.blit(panel_surface, (panel_x, panel_y))
+        # Фон панели (однотонный, кэшируется по размеру)
+        screen.blit(solid_panel((panel_width, panel_height), (0, 0, 0), 180), (panel_x, panel_y))
         
         # Рамка панели
         pygame.draw.rect(screen, WHITE, (panel_x, panel_y, panel_width, panel_height), 2)
@@ -475,7 +667,7 @@ class TaskManager:
         
         self.active_tasks.clear()
         self.completed_tasks.clear()
-        print("Все задания сброшены в неактивное состояние")
+        log.info("Все задания сброшены в неактивное состояние")
     
     def get_task_info(self, task_id):
         """
@@ -516,7 +708,7 @@ class TaskManager:
             # Обновляем основной таймер
             self.social_timer += delta_time
             if self.social_timer >= self.SOCIAL_TIMER_MAX:
-                print("Активация социальных заданий!")
+                log.info("Активация социальных заданий!")
                 self.activate_social_tasks()
                 self.social_timer = 0
                 self.social_warning_timer = 0
@@ -527,10 +719,10 @@ class TaskManager:
             self.social_warning_timer += delta_time
             if self.social_warning_timer >= self.SOCIAL_WARNING_MAX:
                 if not self.check_all_social_completed():
-                    print("Время вышло! Задания не выполнены!")
+                    log.info("Время вышло! Задания не выполнены!")
                     self.trigger_asselya_chase()
                 else:
-                    print("Все социальные задания выполнены вовремя!")
+                    log.info("Все социальные задания выполнены вовремя!")
                 self.deactivate_social_tasks()
     
     def activate_social_tasks(self):
@@ -541,7 +733,7 @@ class TaskManager:
                 if task.id not in self.active_tasks:
                     self.active_tasks.append(task.id)
         self.social_tasks_active = True
-        print("Социальные задания активированы! У вас есть 30 секунд!")
+        log.info("Социальные задания активированы! У вас есть 30 секунд!")
     
     def deactivate_social_tasks(self):
         """Деактивация всех социальных заданий"""
@@ -554,7 +746,7 @@ class TaskManager:
                     self.completed_tasks.remove(task.id)
         self.social_tasks_active = False
         self.social_warning_active = False
-        print("Социальные задания деактивированы!")
+        log.info("Социальные задания деактивированы!")
     
     def check_all_social_completed(self):
         """Проверка выполнения всех социальных заданий"""
@@ -562,16 +754,16 @@ class TaskManager:
         for task in self.tasks.values():
             if task.is_social and task.status != TaskStatus.COMPLETED:
                 completed = False
-                print(f"Задание {task.id} не выполнено!")
+                log.debug("Задание %s не выполнено!", task.id)
         return completed
     
     def trigger_asselya_chase(self):
         """Активация погони Асели"""
         if self.asselya:
             self.asselya.start_chase()
-            print("Время вышло! Аселя начинает погоню!")
+            log.info("Время вышло! Аселя начинает погоню!")
         else:
-            print("Ошибка: объект Асели не установлен!")
+            log.error("Ошибка: объект Асели не установлен!")
         self.social_warning_active = False
         self.social_tasks_active = False
     
@@ -0,0 +1,24 @@
+import gc
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("ESCAPEN_LOG", "warning")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+import memory_tracker
+import mipmap
+
+
+def test_zoomed_sprite_chain_is_dropped_with_its_sprite():
+    sprite = pygame.Surface((64, 64))
+    tracked = memory_tracker.total_bytes()
+    mipmap.zoom_sprite(sprite, 0.3)
+    assert len(mipmap._sprite_chains) == 1
+    assert memory_tracker.total_bytes() > tracked
+
+    del sprite
+    gc.collect()
+    assert len(mipmap._sprite_chains) == 0
+    assert memory_tracker.total_bytes() == tracked
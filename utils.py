@@ -1,5 +1,9 @@
 # Utility functions for collision detection and polygon operations
 
+from game_log import get_logger
+
+log = get_logger(__name__)
+
 # Polygon collision system
 POLYGON_COORDINATES = []
 
@@ -46,4 +50,4 @@ def set_polygon_boundaries(coordinates):
     """Set the polygon coordinates for movement boundaries"""
     global POLYGON_COORDINATES
     POLYGON_COORDINATES = coordinates
-    print(f"Polygon boundaries set with {len(coordinates)} points")
\ No newline at end of file
+    log.info("Polygon boundaries set with %d points", len(coordinates))
\ No newline at end of file
@@ -0,0 +1,130 @@
+# Visibility polygons for light occlusion
+#
+# A light inside the walkable area must not shine through the walls around
+# it. VisibilityIndex.compute() finds the region visible from a point with
+# an angular sweep: the boundary edges near the point come from a grid
+# index, a ray is cast towards every edge endpoint (and a hair to either
+# side of it, to slip past corners) plus a fixed ring of angles that bounds
+# the result to the light radius, and the nearest hit along each ray, in
+# angle order, forms the polygon.
+#
+# Lights move every frame, so results are cached per grid cell: the polygon
+# is computed once from the center of a CACHE_CELL-sized cell and reused for
+# any position inside it. The error is at most half a cell, about two
+# lightmap pixels.
+
+import math
+import time
+from collections import OrderedDict
+
+from utils import point_in_polygon
+
+INDEX_CELL = 256     # Edge index grid, world pixels
+CACHE_CELL = 16      # Visibility cache grid, world pixels
+CACHE_SIZE = 512     # Cached polygons (oldest dropped first)
+RING_RAYS = 32       # Rays bounding the polygon to the light radius
+CORNER_ANGLE = 1e-4  # Extra rays either side of an endpoint, radians
+
+
+class VisibilityIndex:
+    """Boundary edges of a polygon, indexed for visibility queries"""
+
+    def __init__(self, polygon, index_cell=INDEX_CELL, cache_cell=CACHE_CELL, cache_size=CACHE_SIZE):
+        self.polygon = polygon
+        self.index_cell = index_cell
+        self.cache_cell = cache_cell
+        self.cache_size = cache_size
+        self.cache = OrderedDict()   # (cell x, cell y, radius) -> polygon or None
+        self.hits = 0
+        self.misses = 0
+        self.compute_ms = 0.0        # Time spent in compute() since the last reset
+
+        # Edges as (x, y, dx, dy), bucketed into every index cell their bounds touch
+        self.edges = []
+        self.grid = {}
+        count = len(polygon)
+        for i in range(count):
+            x1, y1 = polygon[i]
+            x2, y2 = polygon[(i + 1) % count]
+            self.edges.append((x1, y1, x2 - x1, y2 - y1))
+            for cell_x in range(int(min(x1, x2) // index_cell), int(max(x1, x2) // index_cell) + 1):
+                for cell_y in range(int(min(y1, y2) // index_cell), int(max(y1, y2) // index_cell) + 1):
+                    self.grid.setdefault((cell_x, cell_y), []).append(i)
+
+    def edges_near(self, x, y, radius):
+        """Edges whose index cells overlap the square around (x, y)"""
+        cell = self.index_cell
+        found = set()
+        for cell_x in range(int((x - radius) // cell), int((x + radius) // cell) + 1):
+            for cell_y in range(int((y - radius) // cell), int((y + radius) // cell) + 1):
+                found.update(self.grid.get((cell_x, cell_y), ()))
+        return [self.edges[i] for i in found]
+
+    def compute(self, x, y, radius):
+        """Visible region from (x, y) within `radius`, as a list of world points"""
+        start = time.perf_counter()
+        edges = self.edges_near(x, y, radius)
+
+        angles = [2 * math.pi * i / RING_RAYS - math.pi for i in range(RING_RAYS)]
+        limit = radius * radius
+        for ex, ey, dx, dy in edges:
+            for px, py in ((ex, ey), (ex + dx, ey + dy)):
+                if (px - x) ** 2 + (py - y) ** 2 <= limit:
+                    angle = math.atan2(py - y, px - x)
+                    angles.extend((angle - CORNER_ANGLE, angle, angle + CORNER_ANGLE))
+        angles.sort()
+
+        points = []
+        for angle in angles:
+            ray_x = math.cos(angle)
+            ray_y = math.sin(angle)
+            nearest = radius
+            for ex, ey, dx, dy in edges:
+                denom = ray_x * dy - ray_y * dx
+                if -1e-12 < denom < 1e-12:
+                    continue  # Parallel
+                wx = ex - x
+                wy = ey - y
+                distance = (wx * dy - wy * dx) / denom
+                if 0 <= distance < nearest:
+                    along = (wx * ray_y - wy * ray_x) / denom
+                    if 0 <= along <= 1:
+                        nearest = distance
+            points.append((x + ray_x * nearest, y + ray_y * nearest))
+
+        self.compute_ms += (time.perf_counter() - start) * 1000
+        return points
+
+    def polygon_at(self, x, y, radius):
+        """Cached visibility polygon for a light at (x, y); None outside the polygon"""
+        cell = self.cache_cell
+        key = (int(x // cell), int(y // cell), radius)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return self.cache[key]
+
+        self.misses += 1
+        center_x = (key[0] + 0.5) * cell
+        center_y = (key[1] + 0.5) * cell
+        if point_in_polygon(center_x, center_y, self.polygon):
+            result = self.compute(center_x, center_y, radius)
+        elif point_in_polygon(x, y, self.polygon):
+            # Cell straddles a wall: exact result, not shared with the cell
+            return self.compute(x, y, radius)
+        else:
+            result = None
+
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def stats_line(self):
+        """Cache hit rate and compute time since the last call"""
+        total = self.hits + self.misses
+        line = "visibility %d%% hits, %.2f ms computing" % (
+            100 * self.hits // total if total else 100, self.compute_ms)
+        self.hits = self.misses = 0
+        self.compute_ms = 0.0
+        return line